@@ -1,5 +1,8 @@
+import numpy as np
 import pandas as pd
 from statsmodels.tsa.stattools import adfuller
+from statsmodels.tsa.adfvalues import mackinnonp
+from kalman import stack_series
 
 def perform_adf_test(data):
     """
@@ -40,3 +43,192 @@ def perform_adf_test(data):
     }
 
     return pd.DataFrame([result])
+
+def adf_test_batch(series_list):
+    """
+    Perform the ADF test (constant, lag selected by AIC) on many series at once.
+
+    This is the vectorised counterpart of statsmodels' adfuller with its default settings: the
+    regressions of every candidate lag of every series are solved together through one batched
+    singular value decomposition, on the common sample of the longest lag, and the selected lag
+    is then refitted on its own sample.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+
+    Returns:
+        dict: ADF statistic, p-value, selected lag and number of observations of each series
+        (NaN statistic and p-value where the series is too short or constant).
+    """
+    values = stack_series(series_list, 0, align_end=False)
+    n_series = len(values)
+    lengths = (~np.isnan(values)).sum(axis=1)
+    max_lags = np.minimum(np.ceil(12 * (lengths / 100) ** 0.25).astype(int), lengths // 2 - 2)
+    statistics = np.full(n_series, np.nan)
+    if not n_series or max_lags.max() < 0:
+        return {'statistic': statistics, 'p-value': statistics.copy(), 'lags': np.zeros(n_series, dtype=int), 'nobs': np.zeros(n_series, dtype=int)}
+
+    # Regression of the difference at t on the level at t, the previous differences and a constant
+    largest_lag = int(max_lags.max())
+    differences = np.diff(values, axis=1)
+    rows = np.arange(differences.shape[1])
+    lagged = [np.pad(differences, ((0, 0), (lag, 0)), constant_values=np.nan)[:, :len(rows)] for lag in range(1, largest_lag + 1)]
+    design = np.stack([values[:, :-1]] + lagged + [np.ones_like(differences)], axis=2)
+    columns = np.arange(largest_lag + 2)
+
+    def solve(lags, first_row):
+        used_rows = (rows[None, :] >= first_row[..., None]) & (rows[None, :] <= lengths[:, None] - 2)
+        used_columns = (columns <= lags[..., None]) | (columns == largest_lag + 1)
+        masked = np.where(used_rows[..., None] & used_columns[..., None, :], np.nan_to_num(design), 0)
+        target = np.where(used_rows, np.nan_to_num(differences), 0)
+        # Pseudo-inverse solution with the same cutoff as statsmodels' OLS
+        left, singular, right = np.linalg.svd(masked, full_matrices=False)
+        inverse_singular = np.where(singular > 1e-15 * singular.max(axis=-1, keepdims=True), 1 / np.where(singular > 0, singular, 1), 0)
+        projected = (left * target[..., None]).sum(axis=-2) * inverse_singular
+        coefficients = (right * projected[..., None]).sum(axis=-2)
+        residuals = target - (masked * coefficients[..., None, :]).sum(axis=-1)
+        # First diagonal element of (X'X)^+, for the standard error of the level coefficient
+        level_variance = ((right[..., :, 0] * inverse_singular) ** 2).sum(axis=-1)
+        return coefficients, (residuals ** 2).sum(axis=-1), used_rows.sum(axis=-1), level_variance
+
+    candidates = np.arange(largest_lag + 1)[:, None] * np.ones(n_series, dtype=int)
+    _, sum_squares, nobs, _ = solve(candidates, max_lags[None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aic = nobs * (np.log(2 * np.pi * sum_squares / nobs) + 1) + 2 * (candidates + 2)
+    aic = np.where((candidates <= max_lags) & np.isfinite(aic), aic, np.inf)
+    best_lags = np.argmin(aic, axis=0)
+
+    coefficients, sum_squares, nobs, level_variance = solve(best_lags, best_lags)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = sum_squares / (nobs - best_lags - 2) * level_variance
+        statistics = coefficients[:, 0] / np.sqrt(variance)
+    statistics = np.where((max_lags >= 0) & np.isfinite(statistics) & (variance > 0), statistics, np.nan)
+    p_values = np.array([mackinnonp(statistic, regression='c', N=1) if np.isfinite(statistic) else np.nan for statistic in statistics])
+    return {'statistic': statistics, 'p-value': p_values, 'lags': best_lags, 'nobs': nobs}
+
+def kpss_test_batch(series_list):
+    """
+    Perform the KPSS test of level stationarity on many series at once.
+
+    This is the vectorised counterpart of statsmodels' kpss with its default settings, including
+    the automatic bandwidth of Hobijn et al. (1998).
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+
+    Returns:
+        dict: KPSS statistic, p-value (interpolated between 0.01 and 0.10) and number of lags of
+        each series (NaN statistic and p-value where the series is too short or constant).
+    """
+    values = stack_series(series_list, 0, align_end=False)
+    lengths = (~np.isnan(values)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        residuals = np.nan_to_num(values - np.nansum(values, axis=1, keepdims=True) / lengths[:, None])
+        eta = (residuals.cumsum(axis=1) ** 2).sum(axis=1) / lengths ** 2
+
+        def autocovariance(lag):
+            return (residuals[:, lag:] * residuals[:, :residuals.shape[1] - lag]).sum(axis=1)
+
+        sum_squares = (residuals ** 2).sum(axis=1)
+        cov_lags = np.floor(lengths ** (2 / 9)).astype(int)
+        s0 = sum_squares / lengths
+        s1 = np.zeros(len(values))
+        for lag in range(1, int(cov_lags.max(initial=0)) + 1):
+            product = np.where(lag <= cov_lags, autocovariance(lag) / (lengths / 2), 0)
+            s0 += product
+            s1 += lag * product
+        gamma = 1.1447 * ((s1 / s0) ** 2) ** (1 / 3)
+        lags = np.minimum(np.floor(np.nan_to_num(gamma * lengths ** (1 / 3))).astype(int), lengths - 1)
+
+        long_run = sum_squares.copy()
+        for lag in range(1, int(lags.max(initial=0)) + 1):
+            long_run += np.where(lag <= lags, 2 * autocovariance(lag) * (1 - lag / (lags + 1)), 0)
+        statistics = eta / (long_run / lengths)
+
+    statistics = np.where((lengths > 1) & np.isfinite(statistics), statistics, np.nan)
+    p_values = np.where(np.isnan(statistics), np.nan, np.interp(np.nan_to_num(statistics), [0.347, 0.463, 0.574, 0.739], [0.10, 0.05, 0.025, 0.01]))
+    return {'statistic': statistics, 'p-value': p_values, 'lags': lags}
+
+def seasonal_strength(series_list, seasonal_period):
+    """
+    Measure the strength of seasonality of many series at once.
+
+    The series are detrended with a centred moving average of the seasonal period, and the
+    strength is max(0, 1 - Var(remainder) / Var(season + remainder)) (Wang, Smith and Hyndman, 2006).
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        seasonal_period (int): Seasonal period.
+
+    Returns:
+        np.ndarray: Strength in [0, 1] of each series, 0 where the series is shorter than two periods.
+    """
+    values = stack_series(series_list, 0, align_end=False)
+    lengths = (~np.isnan(values)).sum(axis=1)
+    if seasonal_period < 2 or values.shape[1] < 2 * seasonal_period:
+        return np.zeros(len(values))
+
+    # Centred moving average, 2 x m for an even period
+    weights = np.ones(seasonal_period) / seasonal_period if seasonal_period % 2 else np.r_[0.5, np.ones(seasonal_period - 1), 0.5] / seasonal_period
+    trend = np.full_like(values, np.nan)
+    trend[:, len(weights) // 2:values.shape[1] - len(weights) // 2] = np.lib.stride_tricks.sliding_window_view(values, len(weights), axis=1) @ weights
+    detrended = values - trend
+
+    n_cycles = -(-values.shape[1] // seasonal_period)
+    cycles = np.pad(detrended, ((0, 0), (0, n_cycles * seasonal_period - values.shape[1])), constant_values=np.nan).reshape(len(values), n_cycles, seasonal_period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        season = np.nan_to_num(np.nansum(cycles, axis=1) / (~np.isnan(cycles)).sum(axis=1))
+        season -= season.mean(axis=1, keepdims=True)
+        remainder = detrended - np.tile(season, n_cycles)[:, :values.shape[1]]
+
+        def variance(data):
+            count = (~np.isnan(data)).sum(axis=1)
+            mean = np.nansum(data, axis=1) / count
+            return np.nansum((data - mean[:, None]) ** 2, axis=1) / count
+
+        strength = 1 - variance(remainder) / variance(detrended)
+    return np.where((lengths >= 2 * seasonal_period) & np.isfinite(strength), np.clip(strength, 0, 1), 0)
+
+def select_differencing(series_list, max_d=2, seasonal_period=0, alpha=0.05, strength_threshold=0.64):
+    """
+    Select the differencing orders d and D of many series with a battery of unit-root tests.
+
+    D is 1 when the seasonality is strong (seasonal_strength above strength_threshold). The
+    (seasonally differenced) series are then differenced while the ADF test does not reject a
+    unit root and the KPSS test rejects level stationarity, up to max_d times. Both tests run on
+    all series still being differenced at once.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        max_d (int): Maximum order of differencing.
+        seasonal_period (int): Seasonal period, 0 for no seasonal differencing.
+        alpha (float): Significance level of both tests.
+        strength_threshold (float): Seasonal strength above which the series are seasonally differenced.
+
+    Returns:
+        pd.DataFrame: d, D, seasonal strength and the ADF and KPSS p-values at the selected d of each series.
+    """
+    n_series = len(series_list)
+    strength = seasonal_strength(series_list, seasonal_period) if seasonal_period > 1 else np.zeros(n_series)
+    seasonal_d = (strength > strength_threshold).astype(int)
+    series_list = [np.asarray(series, dtype=float)[seasonal_period:] - np.asarray(series, dtype=float)[:-seasonal_period] if D else np.asarray(series, dtype=float)
+                   for series, D in zip(series_list, seasonal_d)]
+
+    d = np.zeros(n_series, dtype=int)
+    adf_p_values = np.full(n_series, np.nan)
+    kpss_p_values = np.full(n_series, np.nan)
+    undecided = np.arange(n_series)
+    for order in range(max_d + 1):
+        if not len(undecided):
+            break
+        differenced = [np.diff(series_list[position], order) for position in undecided]
+        adf_p_values[undecided] = adf_test_batch(differenced)['p-value']
+        kpss_p_values[undecided] = kpss_test_batch(differenced)['p-value']
+        with np.errstate(invalid='ignore'):
+            unit_root = (adf_p_values[undecided] > alpha) & (kpss_p_values[undecided] < alpha)
+        if order == max_d:
+            break
+        undecided = undecided[unit_root]
+        d[undecided] += 1
+
+    return pd.DataFrame({'d': d, 'D': seasonal_d, 'Seasonal Strength': strength, 'ADF p-value': adf_p_values, 'KPSS p-value': kpss_p_values})
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from statsmodels.iolib.table import SimpleTable
+from kalman import stack_series
+
+def build_lagged_design(values, max_lag):
+    """
+    Build the lagged design matrices of many series at once.
+
+    Every row regresses one value on a constant and its previous max_lag values. Rows where the
+    value or any of its lags is missing are zeroed, so they do not take part in the fit.
+
+    Args:
+        values (np.ndarray): Series, one row per series, padded with NaN at the start.
+        max_lag (int): Number of lags.
+
+    Returns:
+        tuple: Design matrices (series, rows, constant and lags), targets (series, rows) and mask of the used rows.
+    """
+    n_series, n_periods = values.shape
+    n_rows = max(n_periods - max_lag, 0)
+    target = values[:, max_lag:max_lag + n_rows]
+    lags = np.stack([values[:, max_lag - lag:max_lag - lag + n_rows] for lag in range(1, max_lag + 1)], axis=2) if max_lag else np.zeros((n_series, n_rows, 0))
+    design = np.concatenate([np.ones((n_series, n_rows, 1)), lags], axis=2)
+    used = ~np.isnan(target) & ~np.isnan(lags).any(axis=2)
+    return np.where(used[:, :, None], design, 0), np.where(used, target, 0), used
+
+def fit_ar_ols(series_list, lags, criterion='aic'):
+    """
+    Fit autoregressions of several lag lengths to many series with one batched least-squares solve.
+
+    The design matrix of each (lag, series) pair is the full max-lag design with the columns of
+    the unused lags zeroed, so every candidate is fitted on the same rows and the information
+    criteria are comparable. All pairs are solved together through one batched pseudo-inverse.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        lags (list): Candidate numbers of lags, 0 for a constant mean.
+        criterion (str): Information criterion selecting the lag, 'aic' or 'bic'.
+
+    Returns:
+        dict: Selected lag, coefficients (constant then lags, padded with zeros), innovation
+        variance, log-likelihood, AIC, BIC and number of observations of each series.
+    """
+    lags = np.array(sorted(set(lags)))
+    max_lag = int(lags.max())
+    values = stack_series(series_list, 0)
+    design, target, used = build_lagged_design(values, max_lag)
+
+    columns = np.arange(max_lag + 1)
+    stacked = design[None] * (columns[None, :] <= lags[:, None])[:, None, None, :]
+    coefficients = np.einsum('lnkr,nr->lnk', np.linalg.pinv(stacked), target)
+    residuals = target[None] - np.einsum('lnrk,lnk->lnr', stacked, coefficients)
+
+    nobs = used.sum(axis=1)
+    n_params = lags[:, None] + 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = (residuals ** 2).sum(axis=2) / nobs
+        llf = -nobs / 2 * (np.log(2 * np.pi * sigma2) + 1)
+    aic = -2 * llf + 2 * n_params
+    bic = -2 * llf + np.log(np.maximum(nobs, 1)) * n_params
+    information = np.where((nobs > n_params) & (sigma2 > 0) & np.isfinite(llf), aic if criterion == 'aic' else bic, np.inf)
+
+    best = np.argmin(information, axis=0)
+    series_index = np.arange(len(series_list))
+    return {
+        'lag': np.where(np.isfinite(information[best, series_index]), lags[best], -1),
+        'coefficients': coefficients[best, series_index],
+        'sigma2': sigma2[best, series_index],
+        'llf': llf[best, series_index],
+        'aic': aic[best, series_index],
+        'bic': bic[best, series_index],
+        'nobs': nobs
+    }
+
+def forecast_ar_ols(series_list, coefficients, sigma2, steps, alpha=0.05):
+    """
+    Forecast many autoregressions at once, with their confidence intervals.
+
+    The forecasts are computed recursively for all series together, and the forecast error
+    variance from the psi weights of each autoregression.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        coefficients (np.ndarray): Constant then lag coefficients of each series, padded with zeros.
+        sigma2 (np.ndarray): Innovation variance of each series.
+        steps (int): Number of steps to forecast.
+        alpha (float): Significance level of the confidence intervals.
+
+    Returns:
+        tuple: Forecasts, lower bounds and upper bounds, one row per series and one column per step.
+    """
+    max_lag = coefficients.shape[1] - 1
+    values = stack_series(series_list, 0)
+    history = np.zeros((len(series_list), max_lag))
+    if max_lag and values.shape[1]:
+        recent = values[:, -max_lag:][:, ::-1]
+        history[:, :recent.shape[1]] = np.nan_to_num(recent)
+
+    forecasts = np.zeros((len(series_list), steps))
+    psi = np.zeros((len(series_list), steps))
+    for step in range(steps):
+        forecasts[:, step] = coefficients[:, 0] + (coefficients[:, 1:] * history).sum(axis=1)
+        history = np.concatenate([forecasts[:, step:step + 1], history[:, :-1]], axis=1) if max_lag else history
+
+        # psi_h = sum_j phi_j psi_(h-j), with psi_0 = 1
+        previous = psi[:, max(step - max_lag, 0):step][:, ::-1]
+        psi[:, step] = 1 if step == 0 else (coefficients[:, 1:previous.shape[1] + 1] * previous).sum(axis=1)
+
+    width = norm.ppf(1 - alpha / 2) * np.sqrt(sigma2[:, None] * np.cumsum(psi ** 2, axis=1))
+    return forecasts, forecasts - width, forecasts + width
+
+def optimize_ar_ols_models(df, selected_countries, variable, p_range, start_year, end_year, criterion='aic'):
+    """
+    Fit autoregressions by least squares to every selected country at once, selecting the lag by information criterion.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        selected_countries (list): List of selected countries.
+        variable (str): Variable to model.
+        p_range (list): Candidate numbers of lags, 0 for a constant mean.
+        start_year (int): Start year for the data.
+        end_year (int): End year for the data.
+        criterion (str): Information criterion selecting the lag, 'aic' or 'bic'.
+
+    Returns:
+        dict: Lean result of each country (parameters ending with the innovation variance), or the error message.
+    """
+    ar_ols_results = {}
+    series = {}
+    lags = sorted(set(p_range))
+
+    subset = df[df['Country'].isin(selected_countries) & (df['Date'] >= start_year) & (df['Date'] <= end_year) & df[variable].notna()]
+    country_data = {country: data[variable].reset_index(drop=True).astype(float) for country, data in subset.groupby('Country', sort=False)}
+    for country in selected_countries:
+        data_series = country_data.get(country, pd.Series(dtype=float))
+        if len(data_series) < 2 * max(lags) + 3:
+            ar_ols_results[country] = {'error': 'Insufficient data for modeling.'}
+        else:
+            series[country] = data_series
+
+    if series:
+        fit = fit_ar_ols(list(series.values()), lags, criterion)
+        for position, (country, data_series) in enumerate(series.items()):
+            lag = int(fit['lag'][position])
+            if lag < 0:
+                ar_ols_results[country] = {'error': 'Model optimization failed.'}
+                continue
+            ar_ols_results[country] = {
+                'params': np.append(fit['coefficients'][position, :lag + 1], fit['sigma2'][position]),
+                'aic': float(fit['aic'][position]),
+                'bic': float(fit['bic'][position]),
+                'llf': float(fit['llf'][position]),
+                'nobs': int(fit['nobs'][position]),
+                'order': (lag, 0, 0),
+                'variable': variable,
+                'endog': data_series
+            }
+
+    return {country: ar_ols_results[country] for country in selected_countries}
+
+def get_model_summary(result):
+    """
+    Build the summary table of an AR-OLS result.
+
+    Args:
+        result (dict): AR-OLS result of one country.
+
+    Returns:
+        SimpleTable: Coefficients and fit statistics.
+    """
+    params = result['params']
+    names = ['const'] + [f"ar.L{lag}" for lag in range(1, len(params) - 1)] + ['sigma2']
+    rows = [[name, f"{value:.4f}"] for name, value in zip(names, params)]
+    rows += [[name, f"{result[name]:.3f}"] for name in ['llf', 'aic', 'bic']] + [['nobs', f"{result['nobs']}"]]
+    return SimpleTable(rows, headers=['', 'AR-OLS'], title=f"AR-OLS {result['order']} - {result['variable']}")
+
+def forecast_future(ar_ols_results, df, start_year, forecast_until_year=2100, replace_negative_forecast=False):
+    """
+    Forecast every fitted AR-OLS model at once.
+
+    Args:
+        ar_ols_results (dict): AR-OLS results, keyed by country.
+        df (pd.DataFrame): Data frame containing the data.
+        start_year (int): Start year for the data.
+        forecast_until_year (int): Last forecast year.
+        replace_negative_forecast (bool): Whether to replace negative forecasts with 0.
+
+    Returns:
+        dict: Forecast results, in the same format as the other models.
+    """
+    fitted = {country: result for country, result in ar_ols_results.items() if 'error' not in result}
+    if not fitted:
+        return {}
+
+    last_years = df[df['Country'].isin(list(fitted)) & (df['Date'] >= start_year)].groupby('Country')['Date'].max()
+    max_lag = max(len(result['params']) - 2 for result in fitted.values())
+    coefficients = np.zeros((len(fitted), max_lag + 1))
+    for position, result in enumerate(fitted.values()):
+        coefficients[position, :len(result['params']) - 1] = result['params'][:-1]
+    sigma2 = np.array([result['params'][-1] for result in fitted.values()])
+
+    steps = max(int(forecast_until_year - last_years.min()), 0)
+    forecasts, lower, upper = forecast_ar_ols([result['endog'] for result in fitted.values()], coefficients, sigma2, steps)
+
+    forecast_results = {}
+    for position, (country, result) in enumerate(fitted.items()):
+        last_data_year = int(last_years[country])
+        forecast_years = pd.Index(range(last_data_year + 1, forecast_until_year + 1))
+        horizon = len(forecast_years)
+        forecast_values = pd.Series(forecasts[position, :horizon], index=forecast_years, name='predicted_mean')
+        forecast_ci = pd.DataFrame({'mean_ci_lower': lower[position, :horizon], 'mean_ci_upper': upper[position, :horizon]}, index=forecast_years)
+
+        if replace_negative_forecast:
+            forecast_values[forecast_values < 0] = 0
+
+        forecast_key = f"{country} ({forecast_until_year}) - AR-OLS {result['order']}"
+        forecast_results[forecast_key] = {
+            'forecast_values': forecast_values,
+            'forecast_ci': forecast_ci,
+            'country': country,
+            'model': 'AROLS',
+            'variable': result['variable'],
+            'order': result['order'],
+            'forecast_until_year': forecast_until_year
+        }
+
+    return forecast_results
@@ -1,8 +1,42 @@
 import numpy as np
 import pandas as pd
 from statsmodels.tsa.arima.model import ARIMA
+from kalman import score_orders
 
-def optimize_arima(series, p_range, d_range, q_range):
+def lean_result(results):
+
+    return {
+        'params': np.asarray(results.params, dtype=float),
+        'aic': results.aic,
+        'bic': results.bic,
+        'llf': results.llf,
+        'nobs': results.nobs
+    }
+
+def rebuild_model(result):
+
+    model = ARIMA(result['endog'], order=result['order'])
+    return model.filter(result['params'])
+
+def get_model_object(result):
+
+    return result['model_object'] if 'model_object' in result else rebuild_model(result)
+
+def get_model_summary(result):
+
+    return result['model_summary'] if 'model_summary' in result else rebuild_model(result).summary()
+
+def score_candidate(series, order):
+
+    try:
+        model = ARIMA(series, order=order)
+        params = model.fit(return_params=True)
+        aic = -2 * model.loglike(params) + 2 * len(params)
+        return aic if np.isfinite(aic) else np.inf
+    except Exception:
+        return np.inf
+
+def optimize_arima(series, p_range, d_range, q_range, lean=False):
 
     best_aic = np.inf
     best_order = None
@@ -11,34 +45,63 @@ def optimize_arima(series, p_range, d_range, q_range):
     for p in p_range:
         for d in d_range:
             for q in q_range:
-                try:
-                    temp_model = ARIMA(series, order=(p, d, q))
-                    results = temp_model.fit()
-                    if results.aic < best_aic:
-                        best_aic = results.aic
-                        best_order = (p, d, q)
-                        best_mdl = results
-                except:
-                    continue
+                aic = score_candidate(series, (p, d, q))
+                if aic < best_aic:
+                    best_aic = aic
+                    best_order = (p, d, q)
+
+    best_mdl = fit_winner(series, best_order, lean)
     return best_aic, best_order, best_mdl
 
-def optimize_arima_models(df, selected_countries, p_range, d_range, q_range, start_year, end_year):
+def fit_winner(series, order, lean=False, start_params=None):
+
+    if order is None:
+        return None
+    try:
+        results = ARIMA(series, order=order).fit(start_params=start_params)
+        return lean_result(results) if lean else results
+    except Exception:
+        return None
+
+def optimize_arima_models(df, selected_countries, variable, p_range, d_range, q_range, start_year, end_year, lean=False, batched=False):
 
     arima_results = {}
+    series = {}
 
     for country in selected_countries:
-        data_series = df[(df['Country'] == country) & (df['Date'] >= start_year) & (df['Date'] <= end_year) & (df.iloc[:, 2].notna())].iloc[:, 2]
+        data_series = df[(df['Country'] == country) & (df['Date'] >= start_year) & (df['Date'] <= end_year) & (df[variable].notna())][variable].reset_index(drop=True)
 
         if data_series.empty or len(data_series) < max(p_range) + max(d_range) + max(q_range) + 1:
             arima_results[country] = {'error': 'Insufficient data for modeling.'}
             continue
+        series[country] = data_series
+
+    # Batched mode scores every order for all countries at once and fits only the winners with statsmodels
+    orders = [(p, d, q) for p in p_range for d in d_range for q in q_range]
+    if batched and series:
+        scores, params = score_orders(list(series.values()), orders)
 
+    for position, (country, data_series) in enumerate(series.items()):
         try:
-            aic, order, model = optimize_arima(data_series, p_range, d_range, q_range)
-            if model is not None:
+            if batched:
+                best = int(np.argmin(scores[position]))
+                order = orders[best] if np.isfinite(scores[position, best]) else None
+                model = fit_winner(data_series, order, lean, params[best][position] if order is not None else None)
+                aic = model['aic'] if lean and model is not None else getattr(model, 'aic', np.inf)
+            else:
+                aic, order, model = optimize_arima(data_series, p_range, d_range, q_range, lean)
+            if model is not None and lean:
+                arima_results[country] = {
+                    **model,
+                    'order': order,
+                    'variable': variable,
+                    'endog': data_series.astype(float)
+                }
+            elif model is not None:
                 arima_results[country] = {
                     'aic': aic,
                     'order': order,
+                    'variable': variable,
                     'model_summary': model.summary(),
                     'model_object': model
                 }
@@ -47,14 +110,14 @@ def optimize_arima_models(df, selected_countries, p_range, d_range, q_range, sta
         except Exception as e:
             arima_results[country] = {'error': str(e)}
 
-    return arima_results
+    return {country: arima_results[country] for country in selected_countries if country in arima_results}
 
 def forecast_future(arima_results, df, start_year, forecast_until_year=2100, replace_negative_forecast=False):
 
     forecast_results = {}
 
     for country, result in arima_results.items():
-        if 'model_object' in result:
+        if 'error' not in result:
             filtered_data = df[(df['Country'] == country) & (df['Date'] >= start_year)]
             last_data_year = filtered_data['Date'].max()
 
@@ -63,7 +126,7 @@ def forecast_future(arima_results, df, start_year, forecast_until_year=2100, rep
 
             forecast_years = pd.date_range(start=pd.to_datetime(str(int(last_data_year) + 1)), end=pd.to_datetime(str(forecast_until_year + 1)), freq='YE').year
             steps_to_forecast_until = len(forecast_years)
-            model = result['model_object']
+            model = get_model_object(result)
             forecast = model.get_forecast(steps=steps_to_forecast_until)
             forecast_values = forecast.predicted_mean
             forecast_ci = forecast.conf_int(alpha=0.05)
@@ -80,6 +143,7 @@ def forecast_future(arima_results, df, start_year, forecast_until_year=2100, rep
                 'forecast_ci': forecast_ci,
                 'country': country,
                 'model': 'AR',
+                'variable': result['variable'],
                 'order': result['order'],
                 'forecast_until_year': forecast_until_year
             }
@@ -0,0 +1,221 @@
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from statsmodels.tsa.arima.model import ARIMA
+from executor import run_tasks
+from seasonality import detect_seasonal_periods
+from sarimax import get_candidate_orders
+
+def get_origins(years, min_train_size):
+    """
+    Get the forecast origins of a rolling-origin backtest.
+
+    Args:
+        years (array-like): Sorted years of the series.
+        min_train_size (int): Minimum number of observations before the first origin.
+
+    Returns:
+        list: Years used as forecast origins.
+    """
+    years = list(years)
+    return years[min_train_size - 1:len(years) - 1] if len(years) > min_train_size else []
+
+def split_origins(origins, origins_per_task):
+    """
+    Split the forecast origins into contiguous chunks.
+
+    Args:
+        origins (list): Forecast origins.
+        origins_per_task (int): Number of origins handled by one task.
+
+    Returns:
+        list: Chunks of origins.
+    """
+    return [origins[i:i + origins_per_task] for i in range(0, len(origins), origins_per_task)]
+
+def build_model(endog, model_name, order, seasonal_order):
+    """
+    Build an unfitted model of the given type.
+
+    Args:
+        endog (np.ndarray): Training data.
+        model_name (str): "SARIMAX" or "ARIMA".
+        order (tuple): (p, d, q) order.
+        seasonal_order (tuple): (P, D, Q, m) seasonal order, only used by SARIMAX.
+
+    Returns:
+        MLEModel: statsmodels state-space model.
+    """
+    if model_name == "SARIMAX":
+        return SARIMAX(endog, order=order, seasonal_order=seasonal_order, enforce_stationarity=False, enforce_invertibility=False)
+    return ARIMA(endog, order=order)
+
+def fit_model(endog, model_name, order, seasonal_order):
+    """
+    Fit a model of the given type.
+
+    Args:
+        endog (np.ndarray): Training data.
+        model_name (str): "SARIMAX" or "ARIMA".
+        order (tuple): (p, d, q) order.
+        seasonal_order (tuple): (P, D, Q, m) seasonal order, only used by SARIMAX.
+
+    Returns:
+        MLEResults: Fitted results.
+    """
+    model = build_model(endog, model_name, order, seasonal_order)
+    return model.fit(disp=False) if model_name == "SARIMAX" else model.fit()
+
+def backtest_origins(country, values, years, origins, model_name, order, seasonal_order, horizon, window, window_size):
+    """
+    Backtest one model order over a chunk of contiguous forecast origins.
+
+    The model is fitted once at the first origin. Later origins reuse the fitted parameters and
+    update the state with the new observations (append for expanding windows, apply for sliding
+    windows) instead of refitting.
+
+    Args:
+        country (str): Country name.
+        values (np.ndarray): Values of the series.
+        years (np.ndarray): Years of the series.
+        origins (list): Forecast origins of this chunk.
+        model_name (str): "SARIMAX" or "ARIMA".
+        order (tuple): (p, d, q) order.
+        seasonal_order (tuple): (P, D, Q, m) seasonal order.
+        horizon (int): Number of years forecast from each origin.
+        window (str): "Expanding" or "Sliding".
+        window_size (int): Number of observations of the sliding window.
+
+    Returns:
+        dict: Forecast errors of the chunk, or the error message if the model failed.
+    """
+    errors = []
+    actuals = []
+    results = None
+    last_position = None
+
+    try:
+        for origin in origins:
+            position = int(np.searchsorted(years, origin, side='right'))
+            start = max(0, position - window_size) if window == "Sliding" else 0
+
+            if results is None:
+                results = fit_model(values[start:position], model_name, order, seasonal_order)
+            elif window == "Sliding":
+                results = results.apply(values[start:position], refit=False)
+            else:
+                results = results.append(values[last_position:position], refit=False)
+            last_position = position
+
+            actual = values[position:position + horizon]
+            forecast = np.asarray(results.forecast(steps=len(actual)))
+            errors.append(forecast - actual)
+            actuals.append(actual)
+    except Exception as e:
+        return {'country': country, 'order': order, 'seasonal_order': seasonal_order, 'error': str(e)}
+
+    return {
+        'country': country,
+        'order': order,
+        'seasonal_order': seasonal_order,
+        'errors': np.concatenate(errors) if errors else np.array([]),
+        'actuals': np.concatenate(actuals) if actuals else np.array([])
+    }
+
+def compute_metrics(errors, actuals):
+    """
+    Compute MAE, MAPE and RMSE of forecast errors.
+
+    Observations equal to zero are left out of the MAPE.
+
+    Args:
+        errors (np.ndarray): Forecast minus actual values.
+        actuals (np.ndarray): Actual values.
+
+    Returns:
+        dict: MAE, MAPE (in percent) and RMSE.
+    """
+    nonzero = actuals != 0
+    return {
+        'MAE': np.mean(np.abs(errors)),
+        'MAPE': np.mean(np.abs(errors[nonzero] / actuals[nonzero])) * 100 if nonzero.any() else np.nan,
+        'RMSE': np.sqrt(np.mean(errors ** 2))
+    }
+
+def backtest_models(df, selected_countries, variable, model_name, p_range, d_range, q_range, seasonal_period, enable_seasonality, start_year, end_year,
+                    horizon=1, window="Expanding", window_size=20, min_train_size=15, origins_per_task=10, max_workers=None):
+    """
+    Run a rolling-origin backtest for every country and candidate order of the grid search.
+
+    SARIMAX models are backtested over the same (order, seasonal order) candidates as the
+    SARIMAX grid search (see get_candidate_orders), ARIMA models over the (p, d, q) orders.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        selected_countries (list): List of selected countries.
+        variable (str): Variable to backtest.
+        model_name (str): "SARIMAX" or "ARIMA".
+        p_range (range): Range of p values.
+        d_range (range): Range of d values.
+        q_range (range): Range of q values.
+        seasonal_period (int): Seasonal period of the SARIMAX candidates, None to detect the period of each
+            country with detect_seasonal_periods (no seasonal terms without a significant period).
+        enable_seasonality (bool): Whether the SARIMAX candidates have seasonal terms.
+        start_year (int): Start year for the data.
+        end_year (int): End year for the data.
+        horizon (int): Number of years forecast from each origin.
+        window (str): "Expanding" or "Sliding".
+        window_size (int): Number of observations of the sliding window.
+        min_train_size (int): Minimum number of observations before the first origin.
+        origins_per_task (int): Number of origins handled by one parallel task.
+        max_workers (int): Number of worker processes, None to use all cores.
+
+    Returns:
+        pd.DataFrame: MAE, MAPE and RMSE for each country, order and seasonal order (SARIMAX only).
+    """
+    tasks = []
+    failed = []
+
+    country_series = {}
+    for country in selected_countries:
+        country_data = df[(df['Country'] == country) & (df['Date'] >= start_year) & (df['Date'] <= end_year) & (df[variable].notna())].sort_values('Date')
+        country_series[country] = (country_data['Date'].to_numpy(), country_data[variable].to_numpy(dtype=float))
+
+    seasonal = model_name == "SARIMAX" and enable_seasonality
+    periods = {country: seasonal_period for country in selected_countries}
+    if seasonal and seasonal_period is None:
+        detected = detect_seasonal_periods([values for _, values in country_series.values()])
+        periods = {country: int(period) for country, period in zip(country_series, detected)}
+
+    for country, (years, values) in country_series.items():
+        origins = get_origins(years, min_train_size)
+
+        if not origins:
+            failed.append({'Country': country, 'Error': 'Insufficient data for backtesting.'})
+            continue
+
+        for order, seasonal_order in get_candidate_orders(p_range, d_range, q_range, periods[country], seasonal and bool(periods[country])):
+            for chunk in split_origins(origins, origins_per_task):
+                tasks.append((country, values, years, chunk, model_name, order, seasonal_order, horizon, window, window_size))
+
+    chunk_results = run_tasks(backtest_origins, tasks, max_workers)
+
+    grouped = {}
+    for result in chunk_results:
+        key = (result['country'], result['order'], result['seasonal_order'] if model_name == "SARIMAX" else None)
+        if 'error' in result:
+            grouped[key] = result
+        elif 'error' not in grouped.get(key, {}):
+            previous = grouped.get(key, {'errors': [], 'actuals': []})
+            grouped[key] = {'errors': previous['errors'] + [result['errors']], 'actuals': previous['actuals'] + [result['actuals']]}
+
+    rows = []
+    for (country, order, seasonal_order), result in grouped.items():
+        if 'error' in result:
+            rows.append({'Country': country, 'Order': order, 'Seasonal Order': seasonal_order, 'Error': result['error']})
+            continue
+        errors = np.concatenate(result['errors'])
+        actuals = np.concatenate(result['actuals'])
+        rows.append({'Country': country, 'Order': order, 'Seasonal Order': seasonal_order, 'Forecasts': len(errors), **compute_metrics(errors, actuals)})
+
+    return pd.DataFrame(rows + failed, columns=['Country', 'Order', 'Seasonal Order', 'Forecasts', 'MAE', 'MAPE', 'RMSE', 'Error'])
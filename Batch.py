@@ -0,0 +1,98 @@
+import pandas as pd
+from sarimax import optimize_sarimax_models, forecast_future as forecast_future_sarimax
+from arima import optimize_arima_models, forecast_future as forecast_future_arima
+from executor import run_tasks
+from prescreen import screen_series
+
+def slice_country_data(df, selected_countries, start_year):
+    """
+    Slice the data of every selected country once.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        selected_countries (list): List of selected countries.
+        start_year (int): Start year for the data.
+
+    Returns:
+        dict: Data frame of each country from the start year on.
+    """
+    subset = df[df['Country'].isin(selected_countries) & (df['Date'] >= start_year)]
+    return {country: country_data for country, country_data in subset.groupby('Country', sort=False)}
+
+def run_batch_task(country, variable, model_name, country_data, settings):
+    """
+    Fit and forecast one (country, variable, model) combination.
+
+    Args:
+        country (str): Country name.
+        variable (str): Variable to forecast.
+        model_name (str): "SARIMAX" or "ARIMA".
+        country_data (pd.DataFrame): Data of the country.
+        settings (dict): Model ranges, year range and forecast settings.
+
+    Returns:
+        dict: Forecast keys and forecast results, or the error message if the model failed.
+    """
+    try:
+        if model_name == "SARIMAX":
+            adf_results = pd.DataFrame({'Country': [country], 'Variable': [variable]})
+            model_results = optimize_sarimax_models(adf_results, country_data, [country], settings['p_range'], settings['d_range'], settings['q_range'],
+                                                    settings['seasonal_period'], settings['start_year'], settings['end_year'], settings['enable_seasonality'], lean=True,
+                                                    auto_differencing=settings.get('auto_differencing', False))
+            forecast_results, forecast_errors = forecast_future_sarimax(model_results, country_data, settings['start_year'], settings['forecast_until_year'], settings['replace_negative_forecast'])
+        else:
+            model_results = optimize_arima_models(country_data, [country], variable, settings['p_range'], settings['d_range'], settings['q_range'],
+                                                  settings['start_year'], settings['end_year'], lean=True)
+            forecast_results = forecast_future_arima(model_results, country_data, settings['start_year'], settings['forecast_until_year'], settings['replace_negative_forecast'])
+            forecast_errors = {}
+    except Exception as e:
+        return {'error': str(e)}
+
+    if 'error' in model_results[country]:
+        return {'error': model_results[country]['error']}
+    if country in forecast_errors:
+        return {'error': forecast_errors[country]}
+    forecast_key, forecast = next(iter(forecast_results.items()))
+    return {'forecast_key': forecast_key, 'forecast': forecast}
+
+def run_batch_forecast(df, selected_countries, variables, models, settings, max_workers=None):
+    """
+    Forecast every selected variable of every selected country with every selected model.
+
+    The data of each country is sliced once and all combinations share one process pool.
+    Constant, too short and mostly missing series are skipped without fitting.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        selected_countries (list): List of selected countries.
+        variables (list): List of variables to forecast.
+        models (list): List of models ("SARIMAX", "ARIMA").
+        settings (dict): Model ranges, year range and forecast settings.
+        max_workers (int): Number of worker processes, None to use all cores.
+
+    Returns:
+        dict: Batch result of each (country, variable, model).
+    """
+    country_data = slice_country_data(df, selected_countries, settings['start_year'])
+    empty_data = df.iloc[0:0]
+
+    skipped = {}
+    for variable in variables:
+        screen = screen_series(df, selected_countries, variable, settings['start_year'], settings['end_year'])
+        for country, status, reason in screen[screen['Status'] != "Valid"][['Country', 'Status', 'Reason']].itertuples(index=False):
+            skipped[(country, variable)] = {'error': f"Skipped ({status}): {reason}"}
+
+    batch_results = {}
+    keys = []
+    tasks = []
+    for country in selected_countries:
+        for variable in variables:
+            for model_name in models:
+                if (country, variable) in skipped:
+                    batch_results[(country, variable, model_name)] = skipped[(country, variable)]
+                    continue
+                keys.append((country, variable, model_name))
+                tasks.append((country, variable, model_name, country_data.get(country, empty_data)[['Country', 'Date', variable]], settings))
+
+    batch_results.update(zip(keys, run_tasks(run_batch_task, tasks, max_workers)))
+    return batch_results
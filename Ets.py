@@ -0,0 +1,336 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from statsmodels.iolib.table import SimpleTable
+from kalman import stack_series, maximize_batch
+from seasonality import detect_seasonal_periods
+
+trend_types = ['N', 'A', 'Ad']
+
+def sigmoid(values):
+    """
+    Map unconstrained values to (0, 1).
+
+    Args:
+        values (np.ndarray): Unconstrained values.
+
+    Returns:
+        np.ndarray: Values in (0, 1).
+    """
+    return 1 / (1 + np.exp(-values))
+
+def smoothing_parameters(params, trend, seasonal):
+    """
+    Map unconstrained parameters to the smoothing parameters of an additive ETS model.
+
+    The parameters satisfy the usual bounds: 0 < alpha < 1, 0 < beta < alpha,
+    0 < gamma < 1 - alpha and 0.8 < phi < 0.98 for a damped trend.
+
+    Args:
+        params (np.ndarray): Unconstrained parameters, one row per series.
+        trend (str): Trend type, 'N', 'A' or 'Ad' (damped).
+        seasonal (bool): Whether the model is seasonal.
+
+    Returns:
+        tuple: alpha, beta, gamma and phi of each series.
+    """
+    columns = iter(range(params.shape[1]))
+    alpha = sigmoid(params[:, next(columns)])
+    beta = alpha * sigmoid(params[:, next(columns)]) if trend != 'N' else np.zeros(len(params))
+    gamma = (1 - alpha) * sigmoid(params[:, next(columns)]) if seasonal else np.zeros(len(params))
+    phi = 0.8 + 0.18 * sigmoid(params[:, next(columns)]) if trend == 'Ad' else np.ones(len(params))
+    return alpha, beta, gamma, phi
+
+def initial_states(values, trend, seasonal_period):
+    """
+    Set the initial level, trend and seasonal states of many series with the usual heuristics.
+
+    Args:
+        values (np.ndarray): Series, one row per series, starting in the first column.
+        trend (str): Trend type, 'N', 'A' or 'Ad'.
+        seasonal_period (int): Seasonal period, 0 for no seasonality.
+
+    Returns:
+        tuple: Level, trend and seasonal states (one row per series, one column per season).
+    """
+    n_series = len(values)
+    if seasonal_period:
+        first = np.nanmean(values[:, :seasonal_period], axis=1)
+        second = np.nanmean(values[:, seasonal_period:2 * seasonal_period], axis=1)
+        slope = (second - first) / seasonal_period if trend != 'N' else np.zeros(n_series)
+        season = values[:, :seasonal_period] - first[:, None]
+        return first, slope, np.nan_to_num(season - np.nanmean(season, axis=1, keepdims=True))
+
+    observations = (~np.isnan(values)).sum(axis=1)
+    span = np.clip(np.minimum(4, observations - 1), 1, None)
+    slope = (values[np.arange(n_series), np.minimum(span, values.shape[1] - 1)] - values[:, 0]) / span if trend != 'N' else np.zeros(n_series)
+    slope = np.nan_to_num(slope)
+    return values[:, 0] - slope, slope, np.zeros((n_series, 0))
+
+def ets_filter(values, alpha, beta, gamma, phi, level, slope, season):
+    """
+    Run the additive ETS recursions over many series at once.
+
+    Missing values (the padding at the end of shorter series) leave the states unchanged, so
+    the final states are those after the last observation of each series.
+
+    Args:
+        values (np.ndarray): Series, one row per series, starting in the first column.
+        alpha (np.ndarray): Level smoothing parameter of each series.
+        beta (np.ndarray): Trend smoothing parameter of each series.
+        gamma (np.ndarray): Seasonal smoothing parameter of each series.
+        phi (np.ndarray): Damping parameter of each series.
+        level (np.ndarray): Initial level of each series.
+        slope (np.ndarray): Initial trend of each series.
+        season (np.ndarray): Initial seasonal states, the first column being the season of the first period.
+
+    Returns:
+        tuple: Sum of squared errors, number of observations, final level, trend and seasonal states.
+    """
+    sum_squares = np.zeros(len(values))
+    observations = np.zeros(len(values))
+    for period in range(values.shape[1]):
+        observed = ~np.isnan(values[:, period])
+        current_season = season[:, 0] if season.shape[1] else 0
+        error = np.where(observed, values[:, period] - (level + phi * slope + current_season), 0)
+
+        level = np.where(observed, level + phi * slope + alpha * error, level)
+        slope = np.where(observed, phi * slope + beta * error, slope)
+        if season.shape[1]:
+            rotated = np.concatenate([season[:, 1:], (current_season + gamma * error)[:, None]], axis=1)
+            season = np.where(observed[:, None], rotated, season)
+        sum_squares += error ** 2
+        observations += observed
+    return sum_squares, observations, level, slope, season
+
+def concentrated_loglike(sum_squares, observations):
+    """
+    Compute the Gaussian log-likelihood with the error variance concentrated out.
+
+    Args:
+        sum_squares (np.ndarray): Sum of squared one-step errors of each series.
+        observations (np.ndarray): Number of observations of each series.
+
+    Returns:
+        np.ndarray: Log-likelihood of each series.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return -observations / 2 * (np.log(2 * np.pi * sum_squares / observations) + 1)
+
+def fit_ets_batch(series_list, trend, seasonal_period=0, max_iterations=100):
+    """
+    Fit one additive ETS model to many series at once.
+
+    The initial states are set by initial_states and the smoothing parameters maximize the
+    likelihood of all series together through the batched BFGS of the Kalman module.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        trend (str): Trend type, 'N', 'A' or 'Ad' (damped).
+        seasonal_period (int): Seasonal period, 0 for no seasonality.
+        max_iterations (int): Maximum number of BFGS iterations.
+
+    Returns:
+        dict: Parameters (alpha, beta, gamma, phi, initial level, initial trend, initial seasons,
+        error variance), log-likelihood, AIC, BIC and number of observations of each series.
+    """
+    values = stack_series(series_list, 0, align_end=False)
+    n_series = len(values)
+    level, slope, season = initial_states(values, trend, seasonal_period)
+    n_free = 1 + (trend != 'N') + bool(seasonal_period) + (trend == 'Ad')
+
+    def loglike(params):
+        repeats = len(params) // max(n_series, 1)
+        alpha, beta, gamma, phi = smoothing_parameters(params, trend, bool(seasonal_period))
+        sum_squares, observations, *_ = ets_filter(np.tile(values, (repeats, 1)), alpha, beta, gamma, phi,
+                                                   np.tile(level, repeats), np.tile(slope, repeats), np.tile(season, (repeats, 1)))
+        llf = concentrated_loglike(sum_squares, observations)
+        return np.where(np.isfinite(llf), llf, -1e10)
+
+    params = maximize_batch(loglike, np.zeros((n_series, n_free)), max_iterations) if n_series else np.zeros((0, n_free))
+    alpha, beta, gamma, phi = smoothing_parameters(params, trend, bool(seasonal_period))
+    sum_squares, observations, *_ = ets_filter(values, alpha, beta, gamma, phi, level, slope, season)
+
+    # Smoothing parameters, initial states and error variance, as in the usual ETS parameter count
+    n_params = n_free + 1 + (trend != 'N') + seasonal_period + 1
+    llf = concentrated_loglike(sum_squares, observations)
+    failed = ~np.isfinite(llf) | ~(sum_squares > 0) | (observations <= n_params) | (observations < 2 * seasonal_period)
+    llf = np.where(failed, np.nan, llf)
+    return {
+        'params': np.column_stack([alpha, beta, gamma, phi, level, slope, season, sum_squares / np.maximum(observations, 1)]),
+        'llf': llf,
+        'aic': -2 * llf + 2 * n_params,
+        'bic': -2 * llf + np.log(np.maximum(observations, 1)) * n_params,
+        'nobs': observations.astype(int)
+    }
+
+def forecast_ets(series_list, params, steps, alpha=0.05):
+    """
+    Forecast many fitted additive ETS models at once, with closed-form prediction intervals.
+
+    The h-step variance is sigma2 * (1 + sum over j < h of c_j^2), with
+    c_j = alpha + beta * (phi + ... + phi^j) + gamma when j is a multiple of the seasonal period.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        params (np.ndarray): Parameters of each series, as returned by fit_ets_batch. All rows have the same seasonal period.
+        steps (int): Number of steps to forecast.
+        alpha (float): Significance level of the prediction intervals.
+
+    Returns:
+        tuple: Forecasts, lower bounds and upper bounds, one row per series and one column per step.
+    """
+    seasonal_period = params.shape[1] - 7
+    smoothing, level, slope, season, sigma2 = params[:, :4], params[:, 4], params[:, 5], params[:, 6:-1], params[:, -1]
+    _, _, level, slope, season = ets_filter(stack_series(series_list, 0, align_end=False), *smoothing.T, level, slope, season)
+
+    horizons = np.arange(1, steps + 1)
+    damping = np.cumsum(smoothing[:, 3:4] ** horizons[None, :], axis=1)
+    forecasts = level[:, None] + damping * slope[:, None]
+    if seasonal_period:
+        forecasts += season[:, (horizons - 1) % seasonal_period]
+
+    seasonal_step = (horizons % seasonal_period == 0) if seasonal_period else np.zeros(steps, dtype=bool)
+    weights = smoothing[:, 0:1] + smoothing[:, 1:2] * damping + smoothing[:, 2:3] * seasonal_step[None, :]
+    variance = sigma2[:, None] * (1 + np.concatenate([np.zeros((len(params), 1)), np.cumsum(weights[:, :-1] ** 2, axis=1)], axis=1))[:, :steps]
+    width = norm.ppf(1 - alpha / 2) * np.sqrt(variance)
+    return forecasts, forecasts - width, forecasts + width
+
+def optimize_ets_models(df, selected_countries, variable, seasonal_period, start_year, end_year, enable_seasonality=True):
+    """
+    Fit additive ETS models to every selected country at once, selecting the trend and seasonality by AIC.
+
+    Every configuration (no, additive or damped trend, with and without seasonality) is fitted to
+    all countries together by fit_ets_batch, and each country keeps the configuration with the
+    lowest AIC. Seasonal configurations are fitted to the countries sharing each seasonal period.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        selected_countries (list): List of selected countries.
+        variable (str): Variable to model.
+        seasonal_period (int): Seasonal period, None to detect it for each country.
+        start_year (int): Start year for the data.
+        end_year (int): End year for the data.
+        enable_seasonality (bool): Whether to try seasonal models.
+
+    Returns:
+        dict: Lean result of each country, or the error message.
+    """
+    ets_results = {}
+    series = {}
+
+    subset = df[df['Country'].isin(selected_countries) & (df['Date'] >= start_year) & (df['Date'] <= end_year) & df[variable].notna()]
+    country_data = {country: data[variable].reset_index(drop=True).astype(float) for country, data in subset.groupby('Country', sort=False)}
+    for country in selected_countries:
+        data_series = country_data.get(country, pd.Series(dtype=float))
+        if len(data_series) < 5:
+            ets_results[country] = {'error': 'Insufficient data for modeling.'}
+        else:
+            series[country] = data_series
+
+    if not enable_seasonality:
+        periods = np.zeros(len(series), dtype=int)
+    elif seasonal_period is None:
+        periods = detect_seasonal_periods(list(series.values()))
+    else:
+        periods = np.full(len(series), seasonal_period)
+    groups = {0: list(series)}
+    for country, period in zip(series, periods):
+        if period > 1:
+            groups.setdefault(int(period), []).append(country)
+
+    best = {}
+    for period, members in groups.items():
+        for trend in trend_types:
+            fit = fit_ets_batch([series[country] for country in members], trend, period)
+            for position, country in enumerate(members):
+                aic = fit['aic'][position]
+                if np.isfinite(aic) and (country not in best or aic < best[country][0]):
+                    best[country] = (aic, ('A', trend, 'A' if period else 'N'), {name: fit[name][position] for name in ['params', 'llf', 'aic', 'bic', 'nobs']})
+
+    for country, data_series in series.items():
+        if country not in best:
+            ets_results[country] = {'error': 'Model optimization failed.'}
+            continue
+        _, order, fit = best[country]
+        ets_results[country] = {
+            'params': fit['params'],
+            'aic': float(fit['aic']),
+            'bic': float(fit['bic']),
+            'llf': float(fit['llf']),
+            'nobs': int(fit['nobs']),
+            'order': order,
+            'variable': variable,
+            'endog': data_series
+        }
+
+    return {country: ets_results[country] for country in selected_countries}
+
+def get_model_summary(result):
+    """
+    Build the summary table of an ETS result.
+
+    Args:
+        result (dict): ETS result of one country.
+
+    Returns:
+        SimpleTable: Parameters, initial states and fit statistics.
+    """
+    params = result['params']
+    names = ['alpha', 'beta', 'gamma', 'phi', 'initial_level', 'initial_trend'] + [f"initial_seasonal.{lag}" for lag in range(len(params) - 7)] + ['sigma2']
+    rows = [[name, f"{value:.4f}"] for name, value in zip(names, params)]
+    rows += [[name, f"{result[name]:.3f}"] for name in ['llf', 'aic', 'bic']] + [['nobs', f"{result['nobs']}"]]
+    return SimpleTable(rows, headers=['', 'ETS'], title=f"ETS({','.join(result['order'])}) - {result['variable']}")
+
+def forecast_future(ets_results, df, start_year, forecast_until_year=2100, replace_negative_forecast=False):
+    """
+    Forecast every fitted ETS model, all models with the same seasonal period at once.
+
+    Args:
+        ets_results (dict): ETS results, keyed by country.
+        df (pd.DataFrame): Data frame containing the data.
+        start_year (int): Start year for the data.
+        forecast_until_year (int): Last forecast year.
+        replace_negative_forecast (bool): Whether to replace negative forecasts with 0.
+
+    Returns:
+        dict: Forecast results, in the same format as the other models.
+    """
+    fitted = {country: result for country, result in ets_results.items() if 'error' not in result}
+    if not fitted:
+        return {}
+
+    last_years = df[df['Country'].isin(list(fitted)) & (df['Date'] >= start_year)].groupby('Country')['Date'].max()
+    steps = max(int(forecast_until_year - last_years.min()), 0)
+
+    groups = {}
+    for country, result in fitted.items():
+        groups.setdefault(len(result['params']), []).append(country)
+
+    entries = {}
+    for countries in groups.values():
+        params = np.array([fitted[country]['params'] for country in countries])
+        forecasts, lower, upper = forecast_ets([fitted[country]['endog'] for country in countries], params, steps)
+
+        for position, country in enumerate(countries):
+            result = fitted[country]
+            forecast_years = pd.Index(range(int(last_years[country]) + 1, forecast_until_year + 1))
+            horizon = len(forecast_years)
+            forecast_values = pd.Series(forecasts[position, :horizon], index=forecast_years, name='predicted_mean')
+            forecast_ci = pd.DataFrame({'mean_ci_lower': lower[position, :horizon], 'mean_ci_upper': upper[position, :horizon]}, index=forecast_years)
+
+            if replace_negative_forecast:
+                forecast_values[forecast_values < 0] = 0
+
+            forecast_key = f"{country} ({forecast_until_year}) - ETS({','.join(result['order'])})"
+            entries[country] = forecast_key, {
+                'forecast_values': forecast_values,
+                'forecast_ci': forecast_ci,
+                'country': country,
+                'model': 'ETS',
+                'variable': result['variable'],
+                'order': result['order'],
+                'forecast_until_year': forecast_until_year
+            }
+
+    return dict(entries[country] for country in fitted)
@@ -0,0 +1,424 @@
+import os
+import time
+import queue
+import pickle
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.managers import BaseManager
+
+def get_max_workers(max_workers=None):
+    """
+    Get the number of worker processes to use.
+
+    Args:
+        max_workers (int): Requested number of workers, None to use all cores.
+
+    Returns:
+        int: Number of worker processes.
+    """
+    return max_workers if max_workers else (os.cpu_count() or 1)
+
+def run_tasks(func, tasks, max_workers=None, initializer=None, initargs=(), progress=None):
+    """
+    Run a function over a list of tasks in a process pool.
+
+    Tasks run in the calling process when there is a single worker or a single task.
+
+    Args:
+        func (callable): Module level function to run.
+        tasks (list): List of argument tuples, one per call.
+        max_workers (int): Number of worker processes, None to use all cores.
+        initializer (callable): Module level function run once per worker, e.g. to share large inputs.
+        initargs (tuple): Arguments of the initializer.
+        progress (callable): Called with (finished tasks, total tasks) after each task.
+
+    Returns:
+        list: Results in the same order as the tasks.
+    """
+    max_workers = min(get_max_workers(max_workers), len(tasks))
+    if max_workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        results = []
+        for task in tasks:
+            results.append(func(*task))
+            if progress is not None:
+                progress(len(results), len(tasks))
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=initializer, initargs=initargs) as executor:
+        futures = [executor.submit(func, *task) for task in tasks]
+        if progress is not None:
+            for finished, _ in enumerate(as_completed(futures), 1):
+                progress(finished, len(tasks))
+        return [future.result() for future in futures]
+
+class LocalBackend:
+    """
+    Execution backend running the tasks in a process pool of this machine.
+
+    Args:
+        max_workers (int): Number of worker processes, None to use all cores.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+    def map(self, func, tasks, progress=None):
+        """
+        Run a function over a list of tasks.
+
+        Args:
+            func (callable): Module level function to run.
+            tasks (list): List of argument tuples, one per call.
+            progress (callable): Called with (finished tasks, total tasks) after each task.
+
+        Returns:
+            list: Results in the same order as the tasks.
+        """
+        return run_tasks(func, tasks, self.max_workers, progress=progress)
+
+broker_queues = {}
+
+def get_task_queue():
+    """
+    Get the task queue of the broker process.
+
+    Returns:
+        queue.Queue: Queue of (job id, task id, pickled function and arguments) items.
+    """
+    return broker_queues.setdefault('tasks', queue.Queue())
+
+class JobResults:
+    """
+    Result queues of the jobs of a broker, one per job, so that several clients can share a broker.
+
+    A queue only exists between the open and release calls of its job. Results of other jobs
+    (released, failed or abandoned) are dropped, and workers skip the remaining tasks of
+    released jobs.
+    """
+
+    def __init__(self):
+        self.queues = {}
+        self.released = set()
+        self.lock = threading.Lock()
+
+    def open(self, job_id):
+        """
+        Create the result queue of a new job.
+
+        Args:
+            job_id (str): Id of the job.
+        """
+        with self.lock:
+            self.queues[job_id] = queue.Queue()
+
+    def put(self, job_id, item):
+        """
+        Add a result to the queue of its job, dropping it if the job is not open.
+
+        Args:
+            job_id (str): Id of the job.
+            item (tuple): (job id, task id, succeeded, pickled result or error message).
+        """
+        with self.lock:
+            result_queue = self.queues.get(job_id)
+        if result_queue is not None:
+            result_queue.put(item)
+
+    def get(self, job_id, timeout):
+        """
+        Take the next result of a job.
+
+        Args:
+            job_id (str): Id of the job.
+            timeout (float): Seconds to wait for a result.
+
+        Returns:
+            tuple: (job id, task id, succeeded, pickled result or error message).
+
+        Raises:
+            queue.Empty: If no result arrives within the timeout.
+        """
+        return self.queues[job_id].get(timeout=timeout)
+
+    def is_released(self, job_id):
+        """
+        Tell whether a job was released.
+
+        Args:
+            job_id (str): Id of the job.
+
+        Returns:
+            bool: True if the tasks of the job no longer need to run.
+        """
+        return job_id in self.released
+
+    def release(self, job_id):
+        """
+        Drop the result queue of a finished job.
+
+        Args:
+            job_id (str): Id of the job.
+        """
+        with self.lock:
+            self.queues.pop(job_id, None)
+            self.released.add(job_id)
+
+def get_job_results():
+    """
+    Get the job results of the broker process.
+
+    Returns:
+        JobResults: Result queues of the jobs.
+    """
+    return broker_queues.setdefault('results', JobResults())
+
+class BrokerManager(BaseManager):
+    """
+    Manager serving the task queue and job results shared by the clients and the workers.
+    """
+
+BrokerManager.register('get_task_queue', callable=get_task_queue)
+BrokerManager.register('get_job_results', callable=get_job_results)
+
+def start_broker(authkey, address=('localhost', 0)):
+    """
+    Start a task broker in a background process.
+
+    The broker only stores pickled payloads, so it does not need the modeling code. Workers
+    run any payload the broker hands them, so the key must be kept secret and the broker only
+    listens on this machine unless another address is given.
+
+    Args:
+        authkey (bytes): Key shared by the broker, the clients and the workers.
+        address (tuple): (host, port) to listen on, port 0 to pick a free port.
+
+    Returns:
+        BrokerManager: Started manager, its address attribute holds the actual address. Call shutdown() to stop it.
+    """
+    manager = BrokerManager(address=address, authkey=authkey)
+    manager.start()
+    return manager
+
+def connect_broker(address, authkey):
+    """
+    Connect to a running task broker.
+
+    Args:
+        address (tuple): (host, port) of the broker.
+        authkey (bytes): Key of the broker.
+
+    Returns:
+        BrokerManager: Connected manager.
+    """
+    manager = BrokerManager(address=address, authkey=authkey)
+    manager.connect()
+    return manager
+
+def run_worker(address, authkey):
+    """
+    Run tasks from a broker until a stop item (None) is received.
+
+    Args:
+        address (tuple): (host, port) of the broker.
+        authkey (bytes): Key of the broker.
+    """
+    manager = connect_broker(address, authkey)
+    tasks = manager.get_task_queue()
+    results = manager.get_job_results()
+
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+        job_id, task_id, payload = item
+        if results.is_released(job_id):
+            continue
+        try:
+            func, args = pickle.loads(payload)
+            results.put(job_id, (job_id, task_id, True, pickle.dumps(func(*args))))
+        except Exception as e:
+            results.put(job_id, (job_id, task_id, False, f"{type(e).__name__}: {e}"))
+
+def start_workers(address, authkey, processes=None):
+    """
+    Start worker processes on this machine for a broker.
+
+    Args:
+        address (tuple): (host, port) of the broker.
+        authkey (bytes): Key of the broker.
+        processes (int): Number of worker processes, None to use all cores.
+
+    Returns:
+        list: Started processes.
+    """
+    workers = [multiprocessing.Process(target=run_worker, args=(address, authkey), daemon=True) for _ in range(get_max_workers(processes))]
+    for worker in workers:
+        worker.start()
+    return workers
+
+def stop_workers(address, authkey, processes=1):
+    """
+    Send one stop item per worker to a broker.
+
+    Args:
+        address (tuple): (host, port) of the broker.
+        authkey (bytes): Key of the broker.
+        processes (int): Number of workers to stop.
+    """
+    tasks = connect_broker(address, authkey).get_task_queue()
+    for _ in range(processes):
+        tasks.put(None)
+
+class QueueBackend:
+    """
+    Execution backend sending the tasks to a broker queue served by workers on any number of machines.
+
+    Failed tasks are sent again up to max_retries times, and tasks without a result after
+    task_timeout seconds (e.g. because their worker died) are sent again too. A job receiving
+    no result at all for idle_timeout seconds (e.g. because no worker is running) fails.
+
+    Args:
+        address (tuple): (host, port) of the broker.
+        authkey (bytes): Key of the broker.
+        max_retries (int): Number of times a task is sent again after failing.
+        task_timeout (float): Seconds before a task without a result is sent again, None to wait forever.
+        idle_timeout (float): Seconds without any result before the job fails, None to wait forever.
+    """
+
+    def __init__(self, address, authkey, max_retries=2, task_timeout=None, idle_timeout=600):
+        self.address = address
+        self.authkey = authkey
+        self.max_retries = max_retries
+        self.task_timeout = task_timeout
+        self.idle_timeout = idle_timeout
+
+    def map(self, func, tasks, progress=None):
+        """
+        Run a function over a list of tasks on the broker workers.
+
+        Args:
+            func (callable): Module level function to run, importable by the workers.
+            tasks (list): List of argument tuples, one per call.
+            progress (callable): Called with (finished tasks, total tasks) after each task.
+
+        Returns:
+            list: Results in the same order as the tasks.
+
+        Raises:
+            RuntimeError: If the broker refuses the key, a task still fails after max_retries
+                retries, or no result arrives for idle_timeout seconds.
+        """
+        try:
+            manager = connect_broker(self.address, self.authkey)
+        except multiprocessing.AuthenticationError as e:
+            raise RuntimeError(f"The broker refused the key: {e}") from e
+        job_id = f"{os.getpid()}-{time.time_ns()}"
+        task_queue = manager.get_task_queue()
+        job_results = manager.get_job_results()
+        job_results.open(job_id)
+        try:
+            return self.collect(func, tasks, progress, job_id, task_queue, job_results)
+        finally:
+            job_results.release(job_id)
+
+    def collect(self, func, tasks, progress, job_id, task_queue, job_results):
+        """
+        Send the tasks of a job and wait for their results.
+
+        Args:
+            func (callable): Module level function to run, importable by the workers.
+            tasks (list): List of argument tuples, one per call.
+            progress (callable): Called with (finished tasks, total tasks) after each task.
+            job_id (str): Id of the job.
+            task_queue (queue.Queue): Task queue of the broker.
+            job_results (JobResults): Job results of the broker, with the queue of the job open.
+
+        Returns:
+            list: Results in the same order as the tasks.
+        """
+
+        payloads = [pickle.dumps((func, args)) for args in tasks]
+        attempts = {}
+        sent_at = {}
+        for task_id, payload in enumerate(payloads):
+            task_queue.put((job_id, task_id, payload))
+            attempts[task_id] = 1
+            sent_at[task_id] = time.monotonic()
+
+        results = {}
+        last_result_at = time.monotonic()
+        while len(results) < len(tasks):
+            try:
+                result_job_id, task_id, succeeded, value = job_results.get(job_id, 1)
+                last_result_at = time.monotonic()
+            except queue.Empty:
+                result_job_id = None
+                if self.idle_timeout is not None and time.monotonic() - last_result_at > self.idle_timeout:
+                    raise RuntimeError(f"No result from the broker workers for {self.idle_timeout:g} seconds, {len(results)} of {len(tasks)} tasks finished.")
+
+            if result_job_id == job_id and task_id not in results:
+                if succeeded:
+                    results[task_id] = pickle.loads(value)
+                    if progress is not None:
+                        progress(len(results), len(tasks))
+                elif attempts[task_id] > self.max_retries:
+                    raise RuntimeError(f"Task {task_id} failed after {attempts[task_id]} attempts: {value}")
+                else:
+                    self.resend(task_queue, job_id, task_id, payloads[task_id], attempts, sent_at)
+
+            if self.task_timeout is not None:
+                for task_id in [task_id for task_id in sent_at if task_id not in results and time.monotonic() - sent_at[task_id] > self.task_timeout]:
+                    if attempts[task_id] > self.max_retries:
+                        raise RuntimeError(f"Task {task_id} timed out after {attempts[task_id]} attempts.")
+                    self.resend(task_queue, job_id, task_id, payloads[task_id], attempts, sent_at)
+
+        return [results[task_id] for task_id in range(len(tasks))]
+
+    def resend(self, task_queue, job_id, task_id, payload, attempts, sent_at):
+        """
+        Send a task to the broker again.
+
+        Args:
+            task_queue (queue.Queue): Task queue of the broker.
+            job_id (str): Id of the running job.
+            task_id (int): Position of the task.
+            payload (bytes): Pickled function and arguments of the task.
+            attempts (dict): Number of attempts of each task, updated.
+            sent_at (dict): Last send time of each task, updated.
+        """
+        task_queue.put((job_id, task_id, payload))
+        attempts[task_id] += 1
+        sent_at[task_id] = time.monotonic()
+
+def parse_address(text):
+    """
+    Parse a host:port address.
+
+    Args:
+        text (str): Address such as "localhost:50000", an empty host meaning localhost.
+
+    Returns:
+        tuple: (host, port).
+    """
+    host, port = text.rsplit(':', 1)
+    return host or 'localhost', int(port)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Task broker and workers for distributed model fitting.")
+    parser.add_argument('role', choices=['broker', 'worker'])
+    parser.add_argument('address', nargs='?', help="host:port to listen on (broker, localhost:50000 by default) or connect to (worker)")
+    parser.add_argument('--authkey', required=True, help="secret key shared by the broker, the clients and the workers")
+    parser.add_argument('--processes', type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+
+    if args.role == 'broker':
+        BrokerManager(address=parse_address(args.address or 'localhost:50000'), authkey=args.authkey.encode()).get_server().serve_forever()
+    else:
+        if args.address is None:
+            parser.error("the address of the broker is required for a worker")
+        for worker in start_workers(parse_address(args.address), args.authkey.encode(), args.processes):
+            worker.join()
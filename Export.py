@@ -0,0 +1,272 @@
+import os
+import re
+import gzip
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from plotting import plot_data, plot_data_stacked_bar
+from executor import run_tasks
+
+export_data = {}
+
+file_formats = {
+    "Format 1 (Original)": "CSV Files (*.csv)",
+    "Format 2 (New)": "CSV Files (*.csv)",
+    "Parquet": "Parquet Files (*.parquet)",
+    "Feather": "Feather Files (*.feather)",
+    "CSV (gzip)": "Compressed CSV Files (*.csv.gz)",
+    "CSV (zstd)": "Compressed CSV Files (*.csv.zst)"
+}
+
+def init_export_worker(df, forecast_results, start_year, end_year, forecast_until_year):
+    """
+    Keep the data shared by all figures of a worker, so it is sent once per worker instead of once per figure.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        forecast_results (dict): Forecast results.
+        start_year (int): Start year of the historical data.
+        end_year (int): End year of the historical data.
+        forecast_until_year (int): Year until which the forecasts run.
+    """
+    export_data.update({
+        'df': df,
+        'forecast_results': forecast_results,
+        'start_year': start_year,
+        'end_year': end_year,
+        'forecast_until_year': forecast_until_year
+    })
+
+def get_file_name(spec, index):
+    """
+    Get the image file name of a figure spec.
+
+    Args:
+        spec (tuple): (forecast keys, variable, plot type, chart type[, file name]).
+        index (int): Position of the spec in the export list.
+
+    Returns:
+        str: File name of the image.
+    """
+    if len(spec) > 4:
+        return spec[4]
+    forecast_keys, variable, plot_type, chart_type = spec[:4]
+    name = forecast_keys[0].split(' (')[0] if len(forecast_keys) == 1 else f"{len(forecast_keys)} forecasts"
+    return re.sub(r'[^\w\-. ]', '_', f"{index:03d} {name} {variable} {plot_type} {chart_type}") + ".png"
+
+def render_figure(spec, save_path, dpi):
+    """
+    Render one figure off-screen with the Agg backend and save it.
+
+    Args:
+        spec (tuple): (forecast keys, variable, plot type, chart type[, file name]).
+        save_path (str): Path of the image.
+        dpi (int): Resolution of the image.
+
+    Returns:
+        str: Path of the saved image, or the error message prefixed with "Error:".
+    """
+    forecast_keys, variable, plot_type, chart_type = spec[:4]
+    try:
+        figure = Figure(figsize=(11, 6))
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot(111)
+
+        if chart_type == "Stacked Bars":
+            max_value = plot_data_stacked_bar(export_data['df'], export_data['forecast_results'], forecast_keys, variable, plot_type, ax)
+        else:
+            max_value = plot_data(export_data['df'], export_data['forecast_results'], forecast_keys, variable, plot_type, ax)
+
+        start_year = export_data['end_year'] if plot_type == "Forecast" else export_data['start_year']
+        end_year = export_data['end_year'] if plot_type == "Historical" else export_data['forecast_until_year']
+        ax.set_xlim([start_year, end_year])
+        ax.set_ylim([0, max_value * 1.01])
+
+        figure.savefig(save_path, dpi=dpi)
+        return save_path
+    except Exception as e:
+        return f"Error: {e}"
+
+def export_figures(specs, df, forecast_results, out_dir, start_year, end_year, forecast_until_year, dpi=400, max_workers=None):
+    """
+    Render a list of figure specs to image files in a process pool.
+
+    Args:
+        specs (list): List of (forecast keys, variable, plot type, chart type[, file name]) tuples.
+        df (pd.DataFrame): Data frame containing the data.
+        forecast_results (dict): Forecast results.
+        out_dir (str): Directory of the images.
+        start_year (int): Start year of the historical data.
+        end_year (int): End year of the historical data.
+        forecast_until_year (int): Year until which the forecasts run.
+        dpi (int): Resolution of the images.
+        max_workers (int): Number of worker processes, None to use all cores.
+
+    Returns:
+        list: Path of each saved image, or the error message prefixed with "Error:".
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    forecast_keys = {key for spec in specs for key in spec[0]}
+    shared_forecasts = {key: forecast_results[key] for key in forecast_keys}
+    countries = {forecast['country'] for forecast in shared_forecasts.values()}
+    shared_df = df[df['Country'].isin(countries)]
+
+    tasks = [(spec, os.path.join(out_dir, get_file_name(spec, index)), dpi) for index, spec in enumerate(specs)]
+    return run_tasks(render_figure, tasks, max_workers, init_export_worker, (shared_df, shared_forecasts, start_year, end_year, forecast_until_year))
+
+def build_save_frame(df, forecast_results, forecast_keys, variable, save_type, include_model=False):
+    """
+    Build the historical and/or forecast rows of a list of forecasts in one frame.
+
+    The data is filtered and grouped by country once, the rows of every forecast are collected
+    as arrays and the frame is built once at the end.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        forecast_results (dict): Forecast results.
+        forecast_keys (list): Forecast keys to save.
+        variable (str): Variable to save.
+        save_type (str): "Historical", "Forecast" or "Both".
+        include_model (bool): Whether to add a Model column, "Historical" or the forecast key of each row.
+
+    Returns:
+        pd.DataFrame: Country, Date and variable columns, plus Model if requested.
+    """
+    columns = ['Country', 'Date', variable] + (['Model'] if include_model else [])
+    if save_type in ["Historical", "Both"]:
+        historical = df[df['Date'].notna()]
+        historical_rows = historical.groupby('Country', sort=False).indices
+        historical_dates = historical['Date'].to_numpy()
+        historical_values = historical[variable].to_numpy()
+
+    countries = []
+    dates = []
+    values = []
+    models = []
+    for forecast_key in forecast_keys:
+        country = forecast_results[forecast_key]['country']
+        if save_type in ["Historical", "Both"]:
+            rows = historical_rows.get(country, np.array([], dtype=int))
+            countries.append(np.full(len(rows), country, dtype=object))
+            dates.append(historical_dates[rows])
+            values.append(historical_values[rows])
+            models.append(np.full(len(rows), "Historical", dtype=object))
+
+        if save_type in ["Forecast", "Both"]:
+            forecast_values = forecast_results[forecast_key]['forecast_values']
+            countries.append(np.full(len(forecast_values), country, dtype=object))
+            dates.append(forecast_values.index.to_numpy())
+            values.append(forecast_values.to_numpy())
+            models.append(np.full(len(forecast_values), forecast_key, dtype=object))
+
+    if not countries:
+        return pd.DataFrame(columns=columns)
+    frame = {'Country': np.concatenate(countries), 'Date': np.concatenate(dates), variable: np.concatenate(values)}
+    if include_model:
+        frame['Model'] = np.concatenate(models)
+    return pd.DataFrame(frame, columns=columns)
+
+def write_frame(frame, save_path, file_format):
+    """
+    Write a frame in one of the save formats.
+
+    Args:
+        frame (pd.DataFrame): Data to write.
+        save_path (str): Path of the file.
+        file_format (str): One of the keys of file_formats.
+    """
+    if file_format == "Parquet":
+        frame.to_parquet(save_path, index=False)
+    elif file_format == "Feather":
+        frame.reset_index(drop=True).to_feather(save_path)
+    elif file_format == "CSV (gzip)":
+        frame.to_csv(save_path, index=False, compression='gzip')
+    elif file_format == "CSV (zstd)":
+        frame.to_csv(save_path, index=False, compression='zstd')
+    else:
+        frame.to_csv(save_path, index=False)
+
+def iter_all_forecasts(df, forecast_results, save_type):
+    """
+    Yield the rows of every forecast, one frame per variable.
+
+    Historical rows are yielded once per country and variable, forecast rows once per forecast.
+    Each variable takes one pass over the data for its historical rows and one for its forecast rows.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        forecast_results (dict): Forecast results.
+        save_type (str): "Historical", "Forecast" or "Both".
+
+    Yields:
+        pd.DataFrame: Country, Variable, Model, Date and Value columns.
+    """
+    keys_by_variable = {}
+    for forecast_key, forecast in forecast_results.items():
+        keys_by_variable.setdefault(forecast['variable'], []).append(forecast_key)
+
+    for variable, forecast_keys in keys_by_variable.items():
+        frames = []
+        if save_type in ["Historical", "Both"]:
+            country_keys = {}
+            for forecast_key in forecast_keys:
+                country_keys.setdefault(forecast_results[forecast_key]['country'], forecast_key)
+            frames.append(build_save_frame(df, forecast_results, list(country_keys.values()), variable, "Historical", include_model=True))
+        if save_type in ["Forecast", "Both"]:
+            frames.append(build_save_frame(df, forecast_results, forecast_keys, variable, "Forecast", include_model=True))
+
+        frame = pd.concat(frames, ignore_index=True).rename(columns={variable: 'Value'})
+        frame.insert(1, 'Variable', variable)
+        yield frame[['Country', 'Variable', 'Model', 'Date', 'Value']].astype({'Date': 'int64', 'Value': 'float64'})
+
+def stream_frames(frames, save_path, file_format):
+    """
+    Write frames with the same columns to one file, one frame at a time.
+
+    Parquet files get one row group per frame and Feather files one record batch per frame,
+    so only one frame is held in memory at a time.
+
+    Args:
+        frames (iterable): Frames to write.
+        save_path (str): Path of the file.
+        file_format (str): One of the keys of file_formats.
+
+    Returns:
+        int: Number of rows written.
+    """
+    rows = 0
+    schema = None
+    writer = None
+    handle = None
+
+    try:
+        for frame in frames:
+            if file_format in ["Parquet", "Feather"]:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pq.ParquetWriter(save_path, schema) if file_format == "Parquet" else pa.ipc.new_file(save_path, schema)
+                writer.write_table(table)
+            else:
+                if handle is None:
+                    if file_format == "CSV (gzip)":
+                        handle = gzip.open(save_path, 'wt', newline='')
+                    elif file_format == "CSV (zstd)":
+                        import zstandard
+                        handle = zstandard.open(save_path, 'wt', newline='')
+                    else:
+                        handle = open(save_path, 'w', newline='')
+                    frame.to_csv(handle, index=False)
+                else:
+                    frame.to_csv(handle, index=False, header=False)
+            rows += len(frame)
+    finally:
+        if writer is not None:
+            writer.close()
+        if handle is not None:
+            handle.close()
+
+    return rows
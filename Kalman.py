@@ -0,0 +1,261 @@
+import numpy as np
+
+def constrain_stationary(unconstrained):
+    """
+    Map unconstrained values to the coefficients of a stationary lag polynomial, for many series at once.
+
+    The values are first mapped to partial autocorrelations in (-1, 1), kept away from the unit
+    circle, and then converted to coefficients with the Durbin-Levinson recursion.
+
+    Args:
+        unconstrained (np.ndarray): One row of unconstrained values per series.
+
+    Returns:
+        np.ndarray: Coefficients phi of a stationary polynomial 1 - phi_1 L - ... - phi_k L^k, one row per series.
+    """
+    partial = np.clip(unconstrained / np.sqrt(1 + unconstrained ** 2), -1 + 1e-6, 1 - 1e-6)
+    coefficients = np.zeros_like(partial)
+    for lag in range(partial.shape[1]):
+        previous = coefficients[:, :lag].copy()
+        coefficients[:, :lag] = previous - partial[:, lag:lag + 1] * previous[:, ::-1]
+        coefficients[:, lag] = partial[:, lag]
+    return coefficients
+
+def arma_loglike(values, ar, ma):
+    """
+    Compute the exact ARMA log-likelihood of many series at once with a vectorised Kalman filter.
+
+    The innovation variance is concentrated out of the likelihood. Missing values (NaN) are
+    skipped by the filter, so shorter series can be padded with NaN at the start.
+
+    Args:
+        values (np.ndarray): Zero-mean series, one row per series.
+        ar (np.ndarray): AR coefficients, one row per series.
+        ma (np.ndarray): MA coefficients, one row per series.
+
+    Returns:
+        tuple: Log-likelihood and innovation variance of each series.
+    """
+    n_series, n_periods = values.shape
+    p, q = ar.shape[1], ma.shape[1]
+    dim = max(p, q + 1)
+
+    transition = np.zeros((n_series, dim, dim))
+    transition[:, :p, 0] = ar
+    transition[:, np.arange(dim - 1), np.arange(1, dim)] = 1
+    selection = np.zeros((n_series, dim))
+    selection[:, 0] = 1
+    selection[:, 1:q + 1] = ma
+    state_cov = selection[:, :, None] * selection[:, None, :]
+
+    # Stationary initial covariance: vec(P) = (I - T kron T)^-1 vec(R R')
+    kron = np.einsum('nij,nkl->nikjl', transition, transition).reshape(n_series, dim * dim, dim * dim)
+    cov = np.linalg.solve(np.eye(dim * dim) - kron, state_cov.reshape(n_series, dim * dim, 1)).reshape(n_series, dim, dim)
+    state = np.zeros((n_series, dim))
+
+    sum_log_variance = np.zeros(n_series)
+    sum_squares = np.zeros(n_series)
+    observations = np.zeros(n_series)
+    for period in range(n_periods):
+        observed = ~np.isnan(values[:, period])
+        variance = np.maximum(cov[:, 0, 0], 1e-12)
+        error = np.where(observed, values[:, period] - state[:, 0], 0)
+        gain = np.where(observed[:, None], cov[:, :, 0] / variance[:, None], 0)
+
+        state = state + gain * error[:, None]
+        cov = cov - gain[:, :, None] * cov[:, None, 0, :]
+        sum_log_variance += np.where(observed, np.log(variance), 0)
+        sum_squares += error ** 2 / variance
+        observations += observed
+
+        state = np.einsum('nij,nj->ni', transition, state)
+        cov = transition @ cov @ transition.transpose(0, 2, 1) + state_cov
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = sum_squares / observations
+        llf = -0.5 * (observations * (np.log(2 * np.pi * sigma2) + 1) + sum_log_variance)
+    return llf, sigma2
+
+def stack_series(series_list, d, align_end=True):
+    """
+    Difference several series and stack them in one matrix, padding the shorter ones with NaN.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        d (int): Order of differencing.
+        align_end (bool): Whether the series end in the last column (padded at the start) or
+            start in the first column (padded at the end).
+
+    Returns:
+        np.ndarray: One row per series.
+    """
+    differenced = [np.diff(np.asarray(series, dtype=float), d) for series in series_list]
+    values = np.full((len(differenced), max([len(series) for series in differenced] + [0])), np.nan)
+    for position, series in enumerate(differenced):
+        if len(series):
+            start = values.shape[1] - len(series) if align_end else 0
+            values[position, start:start + len(series)] = series
+    return values
+
+def maximize_batch(loglike, params, max_iterations=100, step=1e-5, tolerance=1e-8, max_step=2.0):
+    """
+    Maximize independent log-likelihoods of many series together with a batched BFGS.
+
+    Every series keeps its own inverse Hessian, step length and convergence flag, but each
+    likelihood evaluation covers all series, and the central differences of the gradient are
+    stacked into a single evaluation.
+
+    Args:
+        loglike (callable): Maps a parameter matrix (one row per series, repeated any number of
+            times down the rows) to the log-likelihood of each row.
+        params (np.ndarray): Starting parameters, one row per series.
+        max_iterations (int): Maximum number of BFGS iterations.
+        step (float): Finite difference step of the gradient.
+        tolerance (float): Relative change of the log-likelihood below which a series has converged.
+        max_step (float): Maximum length of a step in parameter space.
+
+    Returns:
+        np.ndarray: Maximizing parameters, one row per series.
+    """
+    n_series, n_params = params.shape
+    shifts = np.concatenate([np.zeros((1, n_params)), step * np.eye(n_params), -step * np.eye(n_params)])
+
+    def value_and_gradient(x):
+        values = -loglike((shifts[:, None, :] + x[None, :, :]).reshape(-1, n_params)).reshape(len(shifts), n_series)
+        return values[0], ((values[1:n_params + 1] - values[n_params + 1:]) / (2 * step)).T
+
+    x = params.copy()
+    value, gradient = value_and_gradient(x)
+    inverse_hessian = np.eye(n_params) / np.maximum(1, np.linalg.norm(gradient, axis=1))[:, None, None]
+    active = np.ones(n_series, dtype=bool)
+
+    for _ in range(max_iterations):
+        direction = -np.einsum('nij,nj->ni', inverse_hessian, gradient)
+        slope = (gradient * direction).sum(axis=1)
+        reset = slope >= 0
+        inverse_hessian[reset] = np.eye(n_params) / np.maximum(1, np.linalg.norm(gradient[reset], axis=1))[:, None, None]
+        direction[reset] = -gradient[reset] / np.maximum(1, np.linalg.norm(gradient[reset], axis=1))[:, None]
+        # Long steps saturate the coefficient transform, where the likelihood is flat
+        direction /= np.maximum(1, np.linalg.norm(direction, axis=1) / max_step)[:, None]
+        slope = (gradient * direction).sum(axis=1)
+        direction[~active] = 0
+
+        # Backtracking line search, halving the step of the series without sufficient decrease
+        alpha = np.ones(n_series)
+        accepted = ~active
+        new_x = x.copy()
+        for _ in range(30):
+            trial = x + alpha[:, None] * direction
+            trial_value = -loglike(trial)
+            decreased = ~accepted & (trial_value <= value + 1e-4 * alpha * slope)
+            new_x[decreased] = trial[decreased]
+            accepted |= decreased
+            if accepted.all():
+                break
+            alpha = np.where(accepted, alpha, alpha / 2)
+        active &= accepted
+
+        new_value, new_gradient = value_and_gradient(new_x)
+        moved = new_x - x
+        change = new_gradient - gradient
+        curvature = (moved * change).sum(axis=1)
+        update = active & (curvature > 1e-12)
+        if update.any():
+            rho = 1 / curvature[update]
+            left = np.eye(n_params) - rho[:, None, None] * moved[update][:, :, None] * change[update][:, None, :]
+            inverse_hessian[update] = left @ inverse_hessian[update] @ left.transpose(0, 2, 1) + rho[:, None, None] * moved[update][:, :, None] * moved[update][:, None, :]
+
+        converged = (np.abs(value - new_value) <= tolerance * (1 + np.abs(value))) | (np.abs(new_gradient).max(axis=1) < 1e-6)
+        x = np.where(active[:, None], new_x, x)
+        value = np.where(active, new_value, value)
+        gradient = np.where(active[:, None], new_gradient, gradient)
+        active &= ~converged
+        if not active.any():
+            break
+
+    return x
+
+def fit_arima_batch(series_list, order, max_iterations=100):
+    """
+    Fit the same ARIMA order to many series at once by maximum likelihood.
+
+    The likelihoods of all series are evaluated together by arma_loglike and maximized together
+    by maximize_batch. The model matches statsmodels' ARIMA: stationary and invertible
+    coefficients, a constant mean when d is 0 and none otherwise. As with statsmodels' diffuse
+    initialization, the likelihood of an integrated model is that of the differenced series.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        order (tuple): (p, d, q) order.
+        max_iterations (int): Maximum number of BFGS iterations.
+
+    Returns:
+        dict: Parameters (statsmodels' ARIMA order), log-likelihood, AIC and number of observations
+        of each series (NaN log-likelihood and AIC where the fit failed).
+    """
+    p, d, q = order
+    has_mean = d == 0
+    values = stack_series(series_list, d)
+    n_series, n_periods = values.shape
+    n_params = p + q + has_mean
+
+    observations = (~np.isnan(values)).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Only models with a mean are centred, the mean is then estimated around zero
+        center = np.where((observations > 0) & has_mean, np.nansum(values, axis=1) / observations, 0)[:, None]
+        scale = np.sqrt(np.nansum((values - center) ** 2, axis=1) / observations)[:, None]
+    scale = np.where((scale > 0) & np.isfinite(scale), scale, 1)
+    standardized = (values - center) / scale
+
+    def loglike(params):
+        repeats = len(params) // max(n_series, 1)
+        ar = constrain_stationary(params[:, :p])
+        ma = -constrain_stationary(params[:, p:p + q])
+        mean = params[:, p + q:p + q + 1] if has_mean else 0
+        llf, _ = arma_loglike(np.tile(standardized, (repeats, 1)) - mean, ar, ma)
+        return np.where(np.isfinite(llf), llf, -1e10)
+
+    params = np.zeros((n_series, n_params))
+    if n_series and n_periods and n_params:
+        params = maximize_batch(loglike, params, max_iterations)
+
+    ar = constrain_stationary(params[:, :p])
+    ma = -constrain_stationary(params[:, p:p + q])
+    mean = params[:, p + q:p + q + 1] if has_mean else 0
+    llf, sigma2 = arma_loglike(standardized - mean, ar, ma) if n_periods else (np.full(n_series, np.nan), np.zeros(n_series))
+
+    llf = llf - observations * np.log(scale[:, 0])
+    failed = ~np.isfinite(llf) | ~(sigma2 > 0) | (observations <= n_params + 1)
+    llf = np.where(failed, np.nan, llf)
+
+    # Parameters in statsmodels' order and units: mean, AR, MA, innovation variance
+    means = [center + mean * scale] if has_mean else []
+    return {
+        'params': np.hstack(means + [ar, ma, sigma2[:, None] * scale ** 2]),
+        'llf': llf,
+        'aic': -2 * llf + 2 * (n_params + 1),
+        'nobs': observations
+    }
+
+def score_orders(series_list, orders):
+    """
+    Score ARIMA orders for many series at once by their AIC.
+
+    This is the batched counterpart of scoring every (series, order) pair with statsmodels:
+    each order is fitted to all series together by fit_arima_batch.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        orders (list): (p, d, q) orders to score.
+
+    Returns:
+        tuple: AIC of each series (rows) and order (columns), inf where the fit failed, and the
+        parameters of every order, usable as start parameters of a statsmodels fit.
+    """
+    scores = np.full((len(series_list), len(orders)), np.inf)
+    params = []
+    for position, order in enumerate(orders):
+        fit = fit_arima_batch(series_list, order)
+        scores[:, position] = np.where(np.isfinite(fit['aic']), fit['aic'], np.inf)
+        params.append(fit['params'])
+    return scores, params
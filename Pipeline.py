@@ -0,0 +1,165 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+def update_digest(digest, value):
+    """
+    Feed a value into a hash, by content for data frames, series and arrays.
+
+    Args:
+        digest (hashlib.blake2b): Hash to update.
+        value (object): Value to hash. Containers are hashed element by element, other values by their repr.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(repr(list(value.columns) if isinstance(value, pd.DataFrame) else value.name).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value, key=repr):
+            update_digest(digest, key)
+            update_digest(digest, value[key])
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            update_digest(digest, item)
+        digest.update(b"]")
+    else:
+        digest.update(f"{type(value).__name__}:{value!r};".encode())
+
+def fingerprint(*values):
+    """
+    Compute a content fingerprint of any number of values.
+
+    Args:
+        *values: Values to fingerprint, see update_digest.
+
+    Returns:
+        str: Hexadecimal fingerprint.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    update_digest(digest, values)
+    return digest.hexdigest()
+
+class Pipeline:
+    """
+    Dependency graph of cached stages, rerunning only the stages whose inputs changed.
+
+    A stage is identified by a name (any hashable, e.g. ('fit', 'ARIMA', country, variable)),
+    declares its own inputs (data, year range, orders, horizon, ...) and the stages it
+    depends on. Its fingerprint combines the fingerprint of its inputs with the fingerprints
+    of those stages, so a change anywhere upstream makes every downstream stage dirty, and a
+    stage whose fingerprint did not change returns its cached value without running.
+
+    Attributes:
+        values (dict): Last value of each stage.
+        fingerprints (dict): Fingerprint of the last value of each stage.
+        dependents (dict): Stages depending on each stage.
+        run_counts (dict): Number of times each stage was computed.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.fingerprints = {}
+        self.dependents = {}
+        self.run_counts = {}
+
+    def get_fingerprint(self, inputs, dependencies):
+        """
+        Compute the fingerprint of a stage.
+
+        Args:
+            inputs (tuple): Inputs of the stage.
+            dependencies (list): Names of the stages it depends on, which must have run.
+
+        Returns:
+            str: Fingerprint of the stage.
+        """
+        return fingerprint(inputs, [self.fingerprints[dependency] for dependency in dependencies])
+
+    def is_dirty(self, name, inputs=(), dependencies=()):
+        """
+        Tell whether a stage must run.
+
+        Args:
+            name (hashable): Name of the stage.
+            inputs (tuple): Inputs of the stage.
+            dependencies (list): Names of the stages it depends on.
+
+        Returns:
+            bool: True if the stage never ran or its fingerprint changed.
+        """
+        return self.fingerprints.get(name) != self.get_fingerprint(inputs, dependencies)
+
+    def run(self, name, compute, inputs=(), dependencies=()):
+        """
+        Get the value of a stage, computing it only if it is dirty.
+
+        Args:
+            name (hashable): Name of the stage.
+            compute (callable): Computes the value of the stage, without arguments.
+            inputs (tuple): Inputs of the stage.
+            dependencies (list): Names of the stages it depends on.
+
+        Returns:
+            object: Value of the stage.
+        """
+        return self.run_many([name], lambda names: {name: compute()}, inputs, {name: dependencies})[name]
+
+    def run_many(self, names, compute, inputs=(), dependencies=None):
+        """
+        Get the values of several stages sharing their inputs, computing the dirty ones together.
+
+        This lets batched computations, e.g. fitting many countries at once, run only for the
+        countries whose stages are dirty.
+
+        Args:
+            names (list): Names of the stages.
+            compute (callable): Maps the list of dirty names to a dict of their values. Names
+                missing from the dict get the value None.
+            inputs (tuple): Inputs shared by the stages.
+            dependencies (dict): Names of the stages each stage depends on, None for no dependencies.
+
+        Returns:
+            dict: Value of each stage.
+        """
+        dependencies = dependencies or {}
+        stage_fingerprints = {name: self.get_fingerprint(inputs, dependencies.get(name, ())) for name in names}
+        dirty = [name for name in names if self.fingerprints.get(name) != stage_fingerprints[name]]
+
+        if dirty:
+            computed = compute(dirty)
+            for name in dirty:
+                self.invalidate(name)
+                self.values[name] = computed.get(name)
+                self.fingerprints[name] = stage_fingerprints[name]
+                self.run_counts[name] = self.run_counts.get(name, 0) + 1
+                for dependency in dependencies.get(name, ()):
+                    self.dependents.setdefault(dependency, set()).add(name)
+
+        return {name: self.values[name] for name in names}
+
+    def invalidate(self, name):
+        """
+        Drop the cached value of a stage and of every stage depending on it.
+
+        Args:
+            name (hashable): Name of the stage.
+        """
+        pending = [name]
+        while pending:
+            stage = pending.pop()
+            self.values.pop(stage, None)
+            self.fingerprints.pop(stage, None)
+            pending.extend(self.dependents.pop(stage, ()))
+
+    def clear(self):
+        """
+        Drop every cached value.
+        """
+        self.values.clear()
+        self.fingerprints.clear()
+        self.dependents.clear()
@@ -1,11 +1,312 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import to_rgba
+from collections import OrderedDict
+from pipeline import fingerprint
+
+historical_cache_size = 256
+historical_cache = OrderedDict()
+historical_cache_df = [None]
+confidence_cache_size = 256
+confidence_cache = OrderedDict()
+lod_threshold = 5000
+
+def clear_historical_cache():
+    """
+    Clear the cached historical slices, to be called whenever the data frame changes.
+    """
+    historical_cache.clear()
+    historical_cache_df[0] = None
+
+def get_cached(df, key, build):
+    """
+    Get a cached value derived from the data frame, building it on a miss.
+
+    The cache keeps the most recently used values and is cleared when a different data frame is passed.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        key (tuple): Cache key.
+        build (callable): Builds the value when it is not cached.
+
+    Returns:
+        object: Cached value.
+    """
+    if historical_cache_df[0] is not df:
+        clear_historical_cache()
+        historical_cache_df[0] = df
+
+    if key in historical_cache:
+        historical_cache.move_to_end(key)
+        return historical_cache[key]
+
+    value = build()
+    historical_cache[key] = value
+    if len(historical_cache) > historical_cache_size:
+        historical_cache.popitem(last=False)
+    return value
+
+def get_historical_data(df, country, variable):
+    """
+    Get the historical data of a country, cached by (country, variable).
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        country (str): Country name.
+        variable (str): Variable to plot.
+
+    Returns:
+        pd.DataFrame: Variable column indexed by Date.
+    """
+    return get_cached(df, (country, variable), lambda: df[df['Country'] == country][['Date', variable]].set_index('Date'))
+
+def decimal_years(dates):
+    """
+    Convert dates to decimal years, so daily data shares the year axis of annual data.
+
+    Args:
+        dates (array-like): Integer years, or dates that pandas can parse.
+
+    Returns:
+        np.ndarray: Year of each date plus the elapsed fraction of that year, NaN where a date cannot be parsed.
+    """
+    dates = pd.Series(dates)
+    if pd.api.types.is_numeric_dtype(dates):
+        return dates.to_numpy(dtype=float)
+    parsed = pd.to_datetime(dates, errors='coerce')
+    return (parsed.dt.year + (parsed.dt.dayofyear - 1) / (365 + parsed.dt.is_leap_year)).to_numpy(dtype=float)
+
+def get_historical_arrays(df, country, variable):
+    """
+    Get the historical data of a country as arrays sorted by decimal year, cached by (country, variable).
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        country (str): Country name.
+        variable (str): Variable to plot.
+
+    Returns:
+        tuple: Decimal years and values.
+    """
+    def build():
+        historical_data = get_historical_data(df, country, variable)
+        years = decimal_years(historical_data.index)
+        order = np.argsort(years, kind='stable')
+        return years[order], historical_data[variable].to_numpy(dtype=float)[order]
+
+    return get_cached(df, (country, variable, 'arrays'), build)
+
+def min_max_decimate(x, y, n_bins):
+    """
+    Decimate a series to the minimum and maximum of each of n_bins bins of consecutive points.
+
+    Every spike of the series is kept, so the decimated line covers the same pixels as the full one.
+
+    Args:
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): Values.
+        n_bins (int): Number of bins, usually the pixel width of the axis.
+
+    Returns:
+        tuple: Decimated x and y values, including the first and last points.
+    """
+    n_points = len(x)
+    if n_points <= 2 * n_bins:
+        return x, y
+    bin_size = -(-n_points // n_bins)
+    n_bins = -(-n_points // bin_size)
+    bins = np.full(n_bins * bin_size, np.nan)
+    bins[:n_points] = y
+    bins = bins.reshape(n_bins, bin_size)
+
+    starts = np.arange(n_bins) * bin_size
+    low = starts + np.argmin(np.where(np.isnan(bins), np.inf, bins), axis=1)
+    high = starts + np.argmax(np.where(np.isnan(bins), -np.inf, bins), axis=1)
+    indices = np.unique(np.concatenate([[0], np.minimum(low, n_points - 1), np.minimum(high, n_points - 1), [n_points - 1]]))
+    return x[indices], y[indices]
+
+def lttb_decimate(x, y, n_out):
+    """
+    Decimate a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The points between the first and the last are split into n_out - 2 buckets, and each bucket
+    keeps the point forming the largest triangle with the point kept in the previous bucket and
+    the mean of the next bucket.
+
+    Args:
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): Values.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        tuple: Decimated x and y values.
+    """
+    n_points = len(x)
+    if n_points <= n_out or n_out < 3:
+        return x, y
+    edges = np.linspace(1, n_points - 1, n_out - 1).astype(int)
+    filled = np.where(np.isnan(y), np.nanmean(y), y)
+    sums = np.concatenate([[0], np.cumsum(filled)])
+    x_sums = np.concatenate([[0], np.cumsum(x)])
+
+    indices = np.zeros(n_out, dtype=int)
+    indices[-1] = n_points - 1
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n_points
+        next_x = (x_sums[next_end] - x_sums[next_start]) / max(next_end - next_start, 1)
+        next_y = (sums[next_end] - sums[next_start]) / max(next_end - next_start, 1)
+        previous = indices[bucket]
+        areas = np.abs((x[previous] - next_x) * (filled[start:end] - filled[previous]) - (x[previous] - x[start:end]) * (next_y - filled[previous]))
+        indices[bucket + 1] = start + np.argmax(areas)
+    return x[indices], y[indices]
+
+class LevelOfDetailLine:
+    """
+    Line of a long series drawn decimated to the pixel width of its axis.
+
+    The decimation is recomputed for the visible range whenever the x limits of the axis change
+    (zoom and pan), so zooming in reveals the full detail. The full arrays are never modified,
+    only the data given to the drawn line is decimated.
+
+    Args:
+        ax (matplotlib.axes.Axes): Matplotlib axis to plot on.
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): Values.
+        method (str): Decimation, 'minmax' (min_max_decimate) or 'lttb' (lttb_decimate).
+        **kwargs: Line properties passed to ax.plot.
+    """
+
+    def __init__(self, ax, x, y, method='minmax', **kwargs):
+        self.ax = ax
+        self.x = x
+        self.y = y
+        self.method = method
+        self.line, = ax.plot(*self.decimate(0, len(x)), **kwargs)
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+
+    def decimate(self, start, end):
+        """
+        Decimate the points from start to end to the pixel width of the axis.
+
+        Args:
+            start (int): Position of the first point.
+            end (int): Position after the last point.
+
+        Returns:
+            tuple: Decimated x and y values.
+        """
+        width = max(int(self.ax.bbox.width), 1)
+        if self.method == 'lttb':
+            return lttb_decimate(self.x[start:end], self.y[start:end], 2 * width)
+        return min_max_decimate(self.x[start:end], self.y[start:end], width)
+
+    def update(self):
+        """
+        Redecimate the line for the visible x range, keeping one point beyond each edge.
+        """
+        x_min, x_max = sorted(self.ax.get_xlim())
+        start = max(int(np.searchsorted(self.x, x_min, side='left')) - 1, 0)
+        end = min(int(np.searchsorted(self.x, x_max, side='right')) + 1, len(self.x))
+        self.line.set_data(*self.decimate(start, end))
+
+def plot_line(ax, x, y, **kwargs):
+    """
+    Plot a line, with level-of-detail rendering when it has more than lod_threshold points.
+
+    Args:
+        ax (matplotlib.axes.Axes): Matplotlib axis to plot on.
+        x (np.ndarray): Sorted x values.
+        y (np.ndarray): Values.
+        **kwargs: Line properties passed to ax.plot.
+
+    Returns:
+        matplotlib.lines.Line2D: The plotted line.
+    """
+    if len(x) > lod_threshold:
+        return LevelOfDetailLine(ax, x, y, **kwargs).line
+    return ax.plot(x, y, **kwargs)[0]
+
+def get_confidence_interval(forecast_key, forecast):
+    """
+    Get the confidence interval of a forecast as arrays, cached by forecast key.
+
+    A cached entry is used as long as the forecast still holds the same confidence interval
+    object, so replotting or toggling the intervals does not slice the forecast again.
+
+    Args:
+        forecast_key (str): Forecast key.
+        forecast (dict): Forecast result.
+
+    Returns:
+        tuple: Years, lower bounds and upper bounds, without missing values.
+    """
+    forecast_ci = forecast['forecast_ci']
+    cached = confidence_cache.get(forecast_key)
+    if cached is not None and cached[0] is forecast_ci:
+        confidence_cache.move_to_end(forecast_key)
+        return cached[1]
+
+    years = np.asarray(forecast_ci.index, dtype=float)
+    lower = forecast_ci.iloc[:, 0].to_numpy(dtype=float)
+    upper = forecast_ci.iloc[:, 1].to_numpy(dtype=float)
+    valid = np.isfinite(lower) & np.isfinite(upper)
+    arrays = (years[valid], lower[valid], upper[valid])
+
+    confidence_cache[forecast_key] = (forecast_ci, arrays)
+    if len(confidence_cache) > confidence_cache_size:
+        confidence_cache.popitem(last=False)
+    return arrays
+
+def plot_confidence_intervals(ax, forecast_results, forecast_keys, alphas=None):
+    """
+    Draw the confidence intervals of many forecasts as a single polygon collection.
+
+    Each band takes the color of the line plotted with the forecast key as gid, or a color of
+    the default color cycle if there is none.
+
+    Args:
+        ax (matplotlib.axes.Axes): Matplotlib axis to plot on.
+        forecast_results (dict): Forecast results.
+        forecast_keys (list): List of forecast keys, keys no longer in the results are skipped.
+        alphas (list): Opacity of each band, None to fade the bands as their number grows.
+
+    Returns:
+        tuple: The collection (None if no band was drawn) and the highest upper bound.
+    """
+    forecast_keys = [forecast_key for forecast_key in forecast_keys if forecast_key in forecast_results]
+    if alphas is None:
+        alphas = [max(0.08, 0.3 / np.sqrt(max(len(forecast_keys), 1)))] * len(forecast_keys)
+    line_colors = {line.get_gid(): line.get_color() for line in ax.get_lines()}
+    cycle_colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+
+    polygons = []
+    colors = []
+    max_value = -float('inf')
+    for position, (forecast_key, alpha) in enumerate(zip(forecast_keys, alphas)):
+        years, lower, upper = get_confidence_interval(forecast_key, forecast_results[forecast_key])
+        if not len(years):
+            continue
+        polygons.append(np.column_stack([np.concatenate([years, years[::-1]]), np.concatenate([lower, upper[::-1]])]))
+        color = line_colors.get(forecast_key) or cycle_colors[position % len(cycle_colors)]
+        colors.append(to_rgba(color, alpha))
+        max_value = max(max_value, upper.max())
+
+    if not polygons:
+        return None, max_value
+    collection = PolyCollection(polygons, facecolors=colors, edgecolors='none', gid='confidence_intervals', zorder=1)
+    ax.add_collection(collection)
+    return collection, max_value
 
 def plot_historical_data(df, selected_countries, variable, start_year, end_year, ax):
     """
     Plot historical data for the selected countries.
 
+    Dates are placed on the axis as decimal years, and long series such as daily data are drawn
+    with level-of-detail rendering.
+
     Args:
         df (pd.DataFrame): Data frame containing the data.
         selected_countries (list): List of selected countries.
@@ -19,11 +320,12 @@ def plot_historical_data(df, selected_countries, variable, start_year, end_year,
     """
     max_value = -float('inf')
     for country in selected_countries:
-        country_data = df[(df['Country'] == country) & (df['Date'] >= start_year) & (df['Date'] <= end_year)]
-        if not country_data.empty:
-            max_value = max(max_value, country_data[variable].max())
-            ax.plot(country_data['Date'], country_data[variable], label=country)
-            
+        years, values = get_historical_arrays(df, country, variable)
+        start, end = np.searchsorted(years, [start_year, end_year + 1])
+        if end > start:
+            max_value = max(max_value, np.nanmax(values[start:end]))
+            plot_line(ax, years[start:end], values[start:end], label=country)
+
     ax.set_xlim([start_year, end_year])
     ax.set_ylim([0, max_value * 1.01])
     ax.legend()
@@ -73,7 +375,40 @@ def plot_historical_data_bar(df, selected_countries, variable, start_year, end_y
     ax.grid(True, linestyle='--', which='both', color='grey', alpha=0.5)
     return max_value
 
-def plot_data(df, forecast_results, forecast_keys, variable, plot_type, ax):
+def get_plot_series(df, forecast_key, forecast, variable, plot_type):
+    """
+    Get the historical and forecast values of a forecast as one series indexed by year.
+
+    The series is cached by forecast key, variable, plot type and the fingerprint of the
+    forecast values, so changing the plot type back or replotting reuses it, while a
+    correction of the forecast values builds it again.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        forecast_key (str): Forecast key.
+        forecast (dict): Forecast result.
+        variable (str): Variable to plot.
+        plot_type (str): Type of plot ("Historical", "Forecast", "Both").
+
+    Returns:
+        pd.Series: Values to plot, indexed by year.
+    """
+    forecast_values = forecast['forecast_values'] if plot_type != "Historical" else None
+
+    def build():
+        historical_data = get_historical_data(df, forecast['country'], variable)
+        temp_combined_data = pd.DataFrame(index=range(int(historical_data.index.min()), forecast['forecast_until_year'] + 1))
+        if plot_type == "Historical" or plot_type == "Both":
+            temp_combined_data.loc[historical_data.index, variable] = historical_data[variable]
+
+        if forecast_values is not None and (plot_type == "Forecast" or plot_type == "Both"):
+            temp_combined_data.loc[forecast_values.index, variable] = forecast_values.values
+        return temp_combined_data[variable]
+
+    key = ('plot', forecast_key, variable, plot_type, forecast['forecast_until_year'], fingerprint(forecast_values) if forecast_values is not None else None)
+    return get_cached(df, key, build)
+
+def plot_data(df, forecast_results, forecast_keys, variable, plot_type, ax, show_confidence_interval=False):
     """
     Plot data and forecasts on a matplotlib axis.
 
@@ -84,6 +419,7 @@ def plot_data(df, forecast_results, forecast_keys, variable, plot_type, ax):
         variable (str): Variable to plot.
         plot_type (str): Type of plot ("Historical", "Forecast", "Both").
         ax (matplotlib.axes.Axes): Matplotlib axis to plot on.
+        show_confidence_interval (bool): Whether to draw the confidence intervals of the forecasts.
 
     Returns:
         float: Maximum value in the plotted data.
@@ -92,25 +428,18 @@ def plot_data(df, forecast_results, forecast_keys, variable, plot_type, ax):
 
     for forecast_key in forecast_keys:
         forecast = forecast_results[forecast_key]
-        country = forecast['country']
-        historical_data = df[df['Country'] == country][['Date', variable]].set_index('Date')
-        forecast_values = forecast['forecast_values'] if plot_type != "Historical" else None
-
-        temp_combined_data = pd.DataFrame(index=range(int(historical_data.index.min()), forecast['forecast_until_year'] + 1))
-        if plot_type == "Historical" or plot_type == "Both":
-            temp_combined_data.loc[historical_data.index, variable] = historical_data[variable]
-
-        if forecast_values is not None and (plot_type == "Forecast" or plot_type == "Both"):
-            temp_combined_data.loc[forecast_values.index, variable] = forecast_values.values
-
-        combined_data[country] = temp_combined_data[variable]
+        combined_data[forecast['country']] = get_plot_series(df, forecast_key, forecast, variable, plot_type)
 
     combined_data = combined_data.dropna(how='all')
     max_value = combined_data.max().max()
 
     for forecast_key in forecast_keys:
         forecast = forecast_results[forecast_key]
-        ax.plot(combined_data.index, combined_data[forecast['country']], label=forecast['country'])
+        ax.plot(combined_data.index, combined_data[forecast['country']], label=forecast['country'], gid=forecast_key)
+
+    if show_confidence_interval and plot_type != "Historical":
+        _, ci_max_value = plot_confidence_intervals(ax, forecast_results, forecast_keys)
+        max_value = max(max_value, ci_max_value)
 
     ax.set_title(f'{variable} Production ({plot_type})', fontsize=16, fontweight='bold')
     ax.set_ylabel('Production (TWh)', fontsize=14)
@@ -140,18 +469,7 @@ def plot_data_stacked_bar(df, forecast_results, forecast_keys, variable, plot_ty
 
     for forecast_key in forecast_keys:
         forecast = forecast_results[forecast_key]
-        country = forecast['country']
-        historical_data = df[df['Country'] == country][['Date', variable]].set_index('Date')
-        forecast_values = forecast['forecast_values'] if plot_type != "Historical" else None
-
-        temp_combined_data = pd.DataFrame(index=range(int(historical_data.index.min()), forecast['forecast_until_year'] + 1))
-        if plot_type == "Historical" or plot_type == "Both":
-            temp_combined_data.loc[historical_data.index, variable] = historical_data[variable]
-
-        if forecast_values is not None and (plot_type == "Forecast" or plot_type == "Both"):
-            temp_combined_data.loc[forecast_values.index, variable] = forecast_values.values
-
-        combined_data[country] = temp_combined_data[variable]
+        combined_data[forecast['country']] = get_plot_series(df, forecast_key, forecast, variable, plot_type)
 
     combined_data = combined_data.fillna(0)
 
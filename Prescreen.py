@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+min_observations = 10
+max_missing_share = 0.5
+
+def build_country_matrix(df, countries, variable, start_year, end_year):
+    """
+    Build the wide year by country matrix of a variable.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        countries (list): Countries, one column each.
+        variable (str): Variable to screen.
+        start_year (int): Start year for the data.
+        end_year (int): End year for the data.
+
+    Returns:
+        pd.DataFrame: One row per year of the range and one column per country, NaN where there is no value.
+    """
+    subset = df[df['Country'].isin(countries) & (df['Date'] >= start_year) & (df['Date'] <= end_year)]
+    matrix = subset.drop_duplicates(['Country', 'Date']).pivot(index='Date', columns='Country', values=variable)
+    return matrix.reindex(index=range(start_year, end_year + 1), columns=countries)
+
+def screen_series(df, countries, variable, start_year, end_year, min_observations=min_observations, max_missing_share=max_missing_share):
+    """
+    Classify the series of several countries before fitting any model.
+
+    All series are screened at once on the wide country matrix. Gaps are measured over the span of
+    each series, from its first to its last value, since most series start long after the first
+    year of the range. A series is "Too short" when it has fewer than min_observations values,
+    "Mostly missing" when more than max_missing_share of the years of its span have no value,
+    "Constant" when every value is the same (such as all-zero generation) and "Valid" otherwise.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        countries (list): Countries to screen.
+        variable (str): Variable to screen.
+        start_year (int): Start year for the data.
+        end_year (int): End year for the data.
+        min_observations (int): Minimum number of values of a valid series.
+        max_missing_share (float): Maximum share of missing years of a valid series.
+
+    Returns:
+        pd.DataFrame: Country, Status, Observations, Missing Share and Reason of each series.
+    """
+    countries = list(dict.fromkeys(countries))
+    values = build_country_matrix(df, countries, variable, start_year, end_year).to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+    observations = observed.sum(axis=0)
+    first = np.argmax(observed, axis=0) if len(values) else np.zeros(len(countries), dtype=int)
+    last = len(values) - 1 - np.argmax(observed[::-1], axis=0) if len(values) else first
+    years = np.where(observations > 0, last - first + 1, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        missing_share = np.where(years > 0, 1 - observations / years, 1.0)
+    maximum = np.where(observed, values, -np.inf).max(axis=0, initial=-np.inf)
+    minimum = np.where(observed, values, np.inf).min(axis=0, initial=np.inf)
+
+    status = np.select(
+        [observations < min_observations, missing_share > max_missing_share, (observations > 0) & (maximum == minimum)],
+        ["Too short", "Mostly missing", "Constant"],
+        "Valid"
+    )
+
+    reasons = []
+    for position, country_status in enumerate(status):
+        if country_status == "Mostly missing":
+            reasons.append(f"Only {observations[position]} of the {years[position]} years from {start_year + first[position]} to {start_year + last[position]} have values.")
+        elif country_status == "Too short":
+            reasons.append(f"Only {observations[position]} values, at least {min_observations} are needed.")
+        elif country_status == "Constant":
+            reasons.append(f"Every value is {maximum[position]:g}.")
+        else:
+            reasons.append("")
+
+    return pd.DataFrame({
+        'Country': countries,
+        'Status': status,
+        'Observations': observations,
+        'Missing Share': missing_share,
+        'Reason': reasons
+    })
+
+def split_screened(screen):
+    """
+    Split a screen into the countries to model and the skipped series.
+
+    Args:
+        screen (pd.DataFrame): Result of screen_series.
+
+    Returns:
+        tuple: List of valid countries, data frame of the skipped series.
+    """
+    valid = screen['Status'] == "Valid"
+    return screen.loc[valid, 'Country'].tolist(), screen[~valid]
@@ -0,0 +1,166 @@
+from collections.abc import MutableMapping
+
+class ForecastRegistry(MutableMapping):
+    """
+    Forecast results keyed by their display key and indexed by what they forecast.
+
+    Every forecast is identified by (country, variable, model, order, horizon), so two entries
+    for the same forecast cannot coexist, and lookups by country or by model go through
+    secondary indexes instead of matching the display keys as strings.
+
+    Args:
+        forecasts (dict): Initial forecast results, keyed by display key.
+    """
+
+    def __init__(self, forecasts=None):
+        self.forecasts = {}
+        self.identities = {}
+        self.keys_by_identity = {}
+        self.keys_by_country = {}
+        self.keys_by_model = {}
+        if forecasts:
+            self.update(forecasts)
+
+    @staticmethod
+    def get_identity(forecast):
+        """
+        Get the (country, variable, model, order, horizon) identity of a forecast.
+
+        Args:
+            forecast (dict): Forecast result.
+
+        Returns:
+            tuple: Identity of the forecast.
+        """
+        model = forecast['model'] + (" + exog" if forecast.get('exog') else "")
+        order = (forecast['order'], forecast.get('seasonal_order'))
+        return (forecast['country'], forecast.get('variable'), model, order, forecast['forecast_until_year'])
+
+    def __getitem__(self, key):
+        return self.forecasts[key]
+
+    def __setitem__(self, key, forecast):
+        identity = self.get_identity(forecast)
+        previous_key = self.keys_by_identity.get(identity)
+        if previous_key is not None and previous_key != key:
+            del self[previous_key]
+        if key in self.forecasts:
+            del self[key]
+
+        self.forecasts[key] = forecast
+        self.identities[key] = identity
+        self.keys_by_identity[identity] = key
+        self.keys_by_country.setdefault(identity[0], {})[key] = None
+        self.keys_by_model.setdefault(identity[2], {})[key] = None
+
+    def __delitem__(self, key):
+        del self.forecasts[key]
+        identity = self.identities.pop(key)
+        del self.keys_by_identity[identity]
+        for index, value in ((self.keys_by_country, identity[0]), (self.keys_by_model, identity[2])):
+            del index[value][key]
+            if not index[value]:
+                del index[value]
+
+    def __iter__(self):
+        return iter(self.forecasts)
+
+    def __len__(self):
+        return len(self.forecasts)
+
+    def add(self, key, forecast):
+        """
+        Add a forecast under its display key, or replace the forecast it updates.
+
+        Display keys do not name the variable, so when the key is taken by a forecast of another
+        variable, the variable is appended to the key. A forecast with the identity of an
+        existing one keeps the key of that forecast.
+
+        Args:
+            key (str): Display key of the forecast, as built by forecast_future.
+            forecast (dict): Forecast result.
+
+        Returns:
+            str: Display key the forecast was added under.
+        """
+        identity = self.get_identity(forecast)
+        if identity in self.keys_by_identity:
+            key = self.keys_by_identity[identity]
+        elif key in self.identities and self.identities[key][1] != identity[1]:
+            key = f"{key} [{identity[1]}]"
+        self[key] = forecast
+        return key
+
+    def update_forecasts(self, forecasts):
+        """
+        Add several forecasts with add.
+
+        Args:
+            forecasts (dict): Forecast results, keyed by display key.
+        """
+        for key, forecast in forecasts.items():
+            self.add(key, forecast)
+
+    def clear(self):
+        """
+        Remove every forecast.
+        """
+        self.forecasts.clear()
+        self.identities.clear()
+        self.keys_by_identity.clear()
+        self.keys_by_country.clear()
+        self.keys_by_model.clear()
+
+    def get_key(self, country, variable, model, order, horizon):
+        """
+        Get the display key of a forecast from its identity.
+
+        Args:
+            country (str): Country name.
+            variable (str): Forecast variable.
+            model (str): Model code ('SARX', 'AR', optionally with " + exog").
+            order (tuple): (order, seasonal order or None).
+            horizon (int): Year until which the forecast runs.
+
+        Returns:
+            str: Display key of the forecast, None if there is none.
+        """
+        return self.keys_by_identity.get((country, variable, model, order, horizon))
+
+    def keys_for_country(self, country, variable=None):
+        """
+        Get the display keys of the forecasts of a country.
+
+        Args:
+            country (str): Country name.
+            variable (str): Only return the forecasts of this variable, None for all.
+
+        Returns:
+            list: Display keys, in insertion order.
+        """
+        keys = self.keys_by_country.get(country, {})
+        return [key for key in keys if variable is None or self.identities[key][1] == variable]
+
+    def keys_for_model(self, model):
+        """
+        Get the display keys of the forecasts of a model.
+
+        Args:
+            model (str): Model code ('SARX', 'AR', optionally with " + exog").
+
+        Returns:
+            list: Display keys, in insertion order.
+        """
+        return list(self.keys_by_model.get(model, {}))
+
+    def get_country(self, key):
+        """
+        Get the country of a forecast.
+
+        Args:
+            key (str): Display key of the forecast.
+
+        Returns:
+            str: Country name.
+        """
+        return self.identities[key][0]
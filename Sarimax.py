@@ -1,11 +1,220 @@
 import numpy as np
 import pandas as pd
 from statsmodels.tsa.statespace.sarimax import SARIMAX
+from adf_test import select_differencing
+from seasonality import detect_seasonal_periods
 
-def optimize_sarimax(series, p_range, d_range, q_range, seasonal_period, enable_seasonality):
+def prepare_exog_data(exog_df):
+    """
+    Prepare exogenous data as annual values indexed by year.
+
+    Daily or monthly dates are aggregated to yearly sums.
+
+    Args:
+        exog_df (pd.DataFrame): Exogenous data with a Date column and optionally a Country column.
+
+    Returns:
+        pd.DataFrame: Annual exogenous data indexed by year, keeping the Country column if present.
+    """
+    exog_df = exog_df.copy()
+    if not pd.api.types.is_integer_dtype(exog_df['Date']):
+        exog_df['Date'] = pd.to_datetime(exog_df['Date']).dt.year
+        group_columns = ['Country', 'Date'] if 'Country' in exog_df.columns else ['Date']
+        exog_df = exog_df.groupby(group_columns, as_index=False).sum(numeric_only=True)
+    return exog_df.set_index('Date')
+
+def align_exog(exog_data, country, years):
+    """
+    Build the exogenous design matrix of one country for the given years.
+
+    Data of the country itself is used when the exogenous data has a Country column that contains it,
+    otherwise the exogenous data must describe a single series (e.g. World demand).
+
+    Args:
+        exog_data (pd.DataFrame): Annual exogenous data from prepare_exog_data.
+        country (str): Country name.
+        years (array-like): Years of the rows of the design matrix.
+
+    Returns:
+        np.ndarray: Design matrix with one row per year and one column per exogenous variable.
+    """
+    if exog_data is None:
+        raise ValueError(f"The model of {country} uses exogenous data, but none is loaded.")
+    if 'Country' in exog_data.columns:
+        if country in exog_data['Country'].values:
+            exog_data = exog_data[exog_data['Country'] == country]
+        elif exog_data['Country'].nunique() > 1:
+            raise ValueError(f"No exogenous data for {country}.")
+        exog_data = exog_data.drop(columns=['Country'])
+
+    exog_matrix = exog_data.reindex(years).to_numpy(dtype=float)
+    if np.isnan(exog_matrix).any():
+        raise ValueError(f"Exogenous data does not cover the years {years[0]}-{years[-1]} for {country}.")
+    return exog_matrix
+
+def lean_result(results):
+    """
+    Reduce a fitted results object to its parameter vector and fit statistics.
+
+    Args:
+        results (SARIMAXResults): Fitted SARIMAX results.
+
+    Returns:
+        dict: Parameters, AIC, BIC, log-likelihood and number of observations.
+    """
+    return {
+        'params': np.asarray(results.params, dtype=float),
+        'aic': results.aic,
+        'bic': results.bic,
+        'llf': results.llf,
+        'nobs': results.nobs
+    }
+
+def rebuild_model(result):
+    """
+    Rebuild a forecast-capable SARIMAX results object from a lean result.
+
+    The stored parameters are run through the Kalman filter once, no optimization is done.
+
+    Args:
+        result (dict): Lean SARIMAX result for one country.
+
+    Returns:
+        SARIMAXResults: Filtered results object.
+    """
+    model = SARIMAX(result['endog'],
+                    exog=result.get('exog'),
+                    order=result['order'],
+                    seasonal_order=result['seasonal_order'],
+                    enforce_stationarity=False,
+                    enforce_invertibility=False)
+    return model.filter(result['params'])
+
+def get_model_object(result):
+    """
+    Get the results object of a SARIMAX result, rebuilding it if it was stored lean.
+
+    Args:
+        result (dict): SARIMAX result for one country.
+
+    Returns:
+        SARIMAXResults: Results object.
+    """
+    return result['model_object'] if 'model_object' in result else rebuild_model(result)
+
+def get_model_summary(result):
+    """
+    Get the summary of a SARIMAX result, rendering it on demand if it was stored lean.
+
+    Args:
+        result (dict): SARIMAX result for one country.
+
+    Returns:
+        Summary: statsmodels summary.
+    """
+    return result['model_summary'] if 'model_summary' in result else rebuild_model(result).summary()
+
+def get_candidate_orders(p_range, d_range, q_range, seasonal_period, enable_seasonality, seasonal_d_range=range(2)):
+    """
+    Get the (order, seasonal order) candidates of the grid search.
+
+    Args:
+        p_range (range): Range of p values.
+        d_range (range): Range of d values.
+        q_range (range): Range of q values.
+        seasonal_period (int): Seasonal period.
+        enable_seasonality (bool): Whether to enable seasonality.
+        seasonal_d_range (range): Range of D values.
+
+    Returns:
+        list: (order, seasonal order) tuples, each candidate once.
+    """
+    seasonal_orders = [(P_, D_, Q_, seasonal_period) for P_ in range(2) for D_ in seasonal_d_range for Q_ in range(2)] if enable_seasonality else [(0, 0, 0, 0)]
+    return [((p, d, q), seasonal_order) for p in p_range for d in d_range for q in q_range for seasonal_order in seasonal_orders]
+
+def build_sarimax(series, exog, order, seasonal_order):
+    """
+    Build an unfitted SARIMAX model with the settings used by the grid search.
+
+    Args:
+        series (pd.Series): Time series data.
+        exog (np.ndarray): Exogenous design matrix aligned with the series, None for no regressors.
+        order (tuple): (p, d, q) order.
+        seasonal_order (tuple): (P, D, Q, m) seasonal order.
+
+    Returns:
+        SARIMAX: Unfitted model.
+    """
+    return SARIMAX(series, exog=exog, order=order, seasonal_order=seasonal_order, enforce_stationarity=False, enforce_invertibility=False)
+
+def score_candidate(series, exog, order, seasonal_order):
+    """
+    Score one SARIMAX candidate by its AIC, as a task that can run on any worker.
+
+    Only the maximizing parameters are computed: no results object, covariance matrix or
+    standard errors are built. The AIC is computed from the log-likelihood at those parameters.
+
+    Args:
+        series (pd.Series): Time series data.
+        exog (np.ndarray): Exogenous design matrix aligned with the series, None for no regressors.
+        order (tuple): (p, d, q) order.
+        seasonal_order (tuple): (P, D, Q, m) seasonal order.
+
+    Returns:
+        float: AIC of the candidate, inf if the fit failed.
+    """
+    try:
+        model = build_sarimax(series, exog, order, seasonal_order)
+        params = model.fit(disp=False, return_params=True)
+        aic = -2 * model.loglike(params) + 2 * len(params)
+        return aic if np.isfinite(aic) else np.inf
+    except Exception:
+        return np.inf
+
+def select_candidate(candidates, scores):
+    """
+    Select the candidate with the lowest AIC.
+
+    Args:
+        candidates (list): (order, seasonal order) tuples.
+        scores (list): AIC of each candidate, as returned by score_candidate.
+
+    Returns:
+        tuple: Best AIC, best order, best seasonal order (None if every fit failed).
+    """
+    best_aic = np.inf
+    best = (None, None)
+    for (order, seasonal_order), aic in zip(candidates, scores):
+        if aic < best_aic:
+            best_aic = aic
+            best = (order, seasonal_order)
+    return (best_aic, *best)
+
+def fit_winner(series, exog, order, seasonal_order, lean):
+    """
+    Fit the winning candidate in full.
+
+    Args:
+        series (pd.Series): Time series data.
+        exog (np.ndarray): Exogenous design matrix aligned with the series, None for no regressors.
+        order (tuple): (p, d, q) order, None if every candidate failed.
+        seasonal_order (tuple): (P, D, Q, m) seasonal order.
+        lean (bool): Whether to keep only the parameters and fit statistics.
+
+    Returns:
+        SARIMAXResults or dict: Fitted results (lean dict if lean is True), None if there is no winner.
+    """
+    if order is None:
+        return None
+    results = build_sarimax(series, exog, order, seasonal_order).fit(disp=False)
+    return lean_result(results) if lean else results
+
+def optimize_sarimax(series, p_range, d_range, q_range, seasonal_period, enable_seasonality, lean=False, exog=None, seasonal_d_range=range(2)):
     """
     Optimize SARIMAX model parameters.
 
+    Candidates are ranked by score_candidate and only the winner is fitted in full.
+
     Args:
         series (pd.Series): Time series data.
         p_range (range): Range of p values.
@@ -13,87 +222,158 @@ def optimize_sarimax(series, p_range, d_range, q_range, seasonal_period, enable_
         q_range (range): Range of q values.
         seasonal_period (int): Seasonal period.
         enable_seasonality (bool): Whether to enable seasonality.
+        lean (bool): Whether to keep only the parameters and fit statistics of the best model.
+        exog (np.ndarray): Exogenous design matrix aligned with the series, shared by all candidates.
+        seasonal_d_range (range): Range of D values.
 
     Returns:
-        tuple: Best AIC, best order, best seasonal order, best model.
+        tuple: Best AIC, best order, best seasonal order, best model (lean dict if lean is True).
     """
-    best_aic = np.inf
-    best_order = None
-    best_seasonal_order = None
-    best_mdl = None
-
-    P = D = Q = range(2)
-    m = seasonal_period
-
-    for p in p_range:
-        for d in d_range:
-            for q in q_range:
-                for P_ in P:
-                    for D_ in D:
-                        for Q_ in Q:
-                            try:
-                                temp_model = SARIMAX(series,
-                                                     order=(p, d, q),
-                                                     seasonal_order=(P_, D_, Q_, m) if enable_seasonality else (0, 0, 0, 0),
-                                                     enforce_stationarity=False,
-                                                     enforce_invertibility=False)
-                                results = temp_model.fit(disp=False)
-                                if results.aic < best_aic:
-                                    best_aic = results.aic
-                                    best_order = (p, d, q)
-                                    best_seasonal_order = (P_, D_, Q_, m) if enable_seasonality else (0, 0, 0, 0)
-                                    best_mdl = results
-                            except:
-                                continue
+    candidates = get_candidate_orders(p_range, d_range, q_range, seasonal_period, enable_seasonality, seasonal_d_range)
+    scores = [score_candidate(series, exog, order, seasonal_order) for order, seasonal_order in candidates]
+    best_aic, best_order, best_seasonal_order = select_candidate(candidates, scores)
+    try:
+        best_mdl = fit_winner(series, exog, best_order, best_seasonal_order, lean)
+    except Exception:
+        best_mdl = None
     return best_aic, best_order, best_seasonal_order, best_mdl
 
-def optimize_sarimax_models(adf_results, df, selected_countries, p_range, d_range, q_range, seasonal_period, start_year, end_year, enable_seasonality):
+def build_result(aic, order, seasonal_order, model, variable, data_series, exog, lean):
+    """
+    Build the result entry of a country from its best model.
+
+    Args:
+        aic (float): AIC of the best model.
+        order (tuple): Best (p, d, q) order.
+        seasonal_order (tuple): Best (P, D, Q, m) seasonal order.
+        model (dict or SARIMAXResults): Best model, lean dict if lean is True, None if every fit failed.
+        variable (str): Modeled variable.
+        data_series (pd.Series): Data the model was fitted on.
+        exog (np.ndarray): Exogenous design matrix, None for no regressors.
+        lean (bool): Whether to store only parameters and fit statistics instead of results objects.
+
+    Returns:
+        dict: SARIMAX result of the country.
+    """
+    if model is not None and lean:
+        return {
+            **model,
+            'order': order,
+            'seasonal_order': seasonal_order,
+            'variable': variable,
+            'endog': data_series.astype(float),
+            'exog': exog
+        }
+    elif model is not None:
+        return {
+            'aic': aic, 
+            'order': order, 
+            'seasonal_order': seasonal_order, 
+            'variable': variable,
+            'exog': exog,
+            'model_summary': model.summary(),
+            'model_object': model
+        }
+    return {'error': 'Model optimization failed.'}
+
+def optimize_sarimax_models(adf_results, df, selected_countries, p_range, d_range, q_range, seasonal_period, start_year, end_year, enable_seasonality, lean=False, exog_data=None,
+                            backend=None, progress=None, auto_differencing=False):
     """
     Optimize SARIMAX models for multiple countries.
 
+    With auto_differencing, d and D are not searched: a battery of unit-root tests selects them
+    once for all countries (select_differencing, d at most max(d_range)) and only the implied
+    orders are fitted. Without a seasonal period, the period of every country is detected by
+    detect_seasonal_periods, and countries without a significant period are fitted without
+    seasonal terms.
+
     Args:
-        adf_results (pd.DataFrame): ADF test results.
+        adf_results (pd.DataFrame): Table with the Country and Variable to model, e.g. the ADF test results.
         df (pd.DataFrame): Data frame containing the data.
         selected_countries (list): List of selected countries.
         p_range (range): Range of p values.
         d_range (range): Range of d values.
         q_range (range): Range of q values.
-        seasonal_period (int): Seasonal period.
+        seasonal_period (int): Seasonal period, None to detect it for each country.
         start_year (int): Start year for the data.
         end_year (int): End year for the data.
         enable_seasonality (bool): Whether to enable seasonality.
+        lean (bool): Whether to store only parameters and fit statistics instead of results objects.
+        exog_data (pd.DataFrame): Annual exogenous data from prepare_exog_data, None for no regressors.
+        backend (LocalBackend or QueueBackend): Execution backend receiving one (series, order) scoring task per
+            candidate of every country, None to score the candidates one after the other in this process.
+        progress (callable): Called with (finished tasks, total tasks) by the backend.
+        auto_differencing (bool): Whether to select d and D with unit-root tests instead of searching them.
 
     Returns:
         dict: SARIMAX results for each country.
     """
     sarimax_results = {}
+    prepared = []
 
     for country in selected_countries:
         variable = adf_results[adf_results['Country'] == country]['Variable'].values[0]
-        data_series = df[(df['Country'] == country) & (df['Date'] >= start_year) & (df['Date'] <= end_year) & (df[variable].notna())][variable]
+        country_data = df[(df['Country'] == country) & (df['Date'] >= start_year) & (df['Date'] <= end_year) & (df[variable].notna())]
+        data_series = country_data[variable].reset_index(drop=True)
 
         if data_series.empty or len(data_series) < max(p_range) + max(d_range) + max(q_range) + 1:
             sarimax_results[country] = {'error': 'Insufficient data for modeling.'}
             continue
 
         try:
-            aic, order, seasonal_order, model = optimize_sarimax(data_series, p_range, d_range, q_range, seasonal_period, enable_seasonality)
-            if model is not None:
-                sarimax_results[country] = {
-                    'aic': aic, 
-                    'order': order, 
-                    'seasonal_order': seasonal_order, 
-                    'model_summary': model.summary(),
-                    'model_object': model
-                }
-            else:
-                sarimax_results[country] = {'error': 'Model optimization failed.'}
+            exog = align_exog(exog_data, country, country_data['Date'].to_numpy()) if exog_data is not None else None
+            prepared.append((country, variable, data_series, exog))
         except Exception as e:
             sarimax_results[country] = {'error': str(e)}
 
-    return sarimax_results
+    # The seasonal period of each country, 0 for no seasonal terms
+    series_list = [data_series for _, _, data_series, _ in prepared]
+    if not enable_seasonality:
+        periods = np.zeros(len(prepared), dtype=int)
+    elif seasonal_period is None:
+        periods = detect_seasonal_periods(series_list)
+    else:
+        periods = np.full(len(prepared), seasonal_period)
+
+    # The d and D ranges of each country, searched in full unless the unit-root tests fix them
+    differencing = [(d_range, range(2))] * len(prepared)
+    if auto_differencing:
+        for period in np.unique(periods):
+            members = np.flatnonzero(periods == period)
+            orders = select_differencing([series_list[position] for position in members], max(d_range), int(period))
+            for position, d, D in zip(members, orders['d'], orders['D']):
+                differencing[position] = ([max(d, min(d_range))], [D])
+
+    pending = []
+    tasks = []
+    for (country, variable, data_series, exog), period, (country_d_range, country_seasonal_d_range) in zip(prepared, periods, differencing):
+        try:
+            if backend is not None:
+                candidates = get_candidate_orders(p_range, country_d_range, q_range, int(period), period > 0, country_seasonal_d_range)
+                pending.append((country, variable, data_series, exog, candidates))
+                tasks.extend((data_series, exog, order, seasonal_order) for order, seasonal_order in candidates)
+                continue
+            aic, order, seasonal_order, model = optimize_sarimax(data_series, p_range, country_d_range, q_range, int(period), period > 0, lean, exog,
+                                                                 country_seasonal_d_range)
+            sarimax_results[country] = build_result(aic, order, seasonal_order, model, variable, data_series, exog, lean)
+        except Exception as e:
+            sarimax_results[country] = {'error': str(e)}
+
+    if pending:
+        scores = backend.map(score_candidate, tasks, progress)
+        offset = 0
+        for country, variable, data_series, exog, candidates in pending:
+            aic, order, seasonal_order = select_candidate(candidates, scores[offset:offset + len(candidates)])
+            offset += len(candidates)
+            try:
+                model = fit_winner(data_series, exog, order, seasonal_order, lean)
+                sarimax_results[country] = build_result(aic, order, seasonal_order, model, variable, data_series, exog, lean)
+            except Exception as e:
+                sarimax_results[country] = {'error': str(e)}
+
+    return {country: sarimax_results[country] for country in selected_countries if country in sarimax_results}
 
-def forecast_future(sarimax_results, df, start_year, forecast_until_year=2100, replace_negative_forecast=False):
+def forecast_future(sarimax_results, df, start_year, forecast_until_year=2100, replace_negative_forecast=False, exog_data=None):
     """
     Forecast future values using SARIMAX models.
 
@@ -103,14 +383,17 @@ def forecast_future(sarimax_results, df, start_year, forecast_until_year=2100, r
         start_year (int): Start year for the forecast.
         forecast_until_year (int): Year until which to forecast.
         replace_negative_forecast (bool): Whether to replace negative forecast values with zero.
+        exog_data (pd.DataFrame): Annual exogenous data covering the forecast years, required for models fitted with regressors.
 
     Returns:
-        dict: Forecast results for each country.
+        tuple: Forecast results keyed by forecast key, and the error message of each country whose
+        forecast failed (e.g. because the exogenous data does not cover the forecast years).
     """
     forecast_results = {}
+    forecast_errors = {}
 
     for country, result in sarimax_results.items():
-        if 'model_object' in result:
+        if 'error' not in result:
             filtered_data = df[(df['Country'] == country) & (df['Date'] >= start_year)]
             last_data_year = filtered_data['Date'].max()
 
@@ -119,8 +402,13 @@ def forecast_future(sarimax_results, df, start_year, forecast_until_year=2100, r
 
             forecast_years = pd.date_range(start=pd.to_datetime(str(int(last_data_year) + 1)), end=pd.to_datetime(str(forecast_until_year + 1)), freq='YE').year
             steps_to_forecast_until = len(forecast_years)
-            model = result['model_object']
-            forecast = model.get_forecast(steps=steps_to_forecast_until)
+            model = get_model_object(result)
+            try:
+                future_exog = align_exog(exog_data, country, forecast_years) if result.get('exog') is not None else None
+                forecast = model.get_forecast(steps=steps_to_forecast_until, exog=future_exog)
+            except Exception as e:
+                forecast_errors[country] = str(e)
+                continue
             forecast_values = forecast.predicted_mean
             forecast_ci = forecast.conf_int(alpha=0.05)
             forecast_ci.columns = ['mean_ci_lower', 'mean_ci_upper']
@@ -131,14 +419,18 @@ def forecast_future(sarimax_results, df, start_year, forecast_until_year=2100, r
                 forecast_values[forecast_values < 0] = 0
 
             forecast_key = f"{country} ({forecast_until_year}) - SARIMAX {result['order']} ({result['seasonal_order'][3]})"
+            if result.get('exog') is not None:
+                forecast_key += " + exog"
             forecast_results[forecast_key] = {
                 'forecast_values': forecast_values,
                 'forecast_ci': forecast_ci,
                 'country': country,
                 'model': 'SARX',
+                'variable': result['variable'],
                 'order': result['order'],
                 'seasonal_order': result['seasonal_order'],
+                'exog': result.get('exog') is not None,
                 'forecast_until_year': forecast_until_year
             }
 
-    return forecast_results
+    return forecast_results, forecast_errors
@@ -0,0 +1,209 @@
+import os
+import glob
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from batch import slice_country_data, run_batch_task
+from executor import run_tasks
+from prescreen import screen_series, build_country_matrix
+
+aggregate_tolerance = 1e-3
+
+def convert_to_original_format(new_df):
+    """
+    Convert a data frame from the new format (Date, Variable, one column per country) to the original format.
+
+    Args:
+        new_df (pd.DataFrame): Data frame in the new format.
+
+    Returns:
+        pd.DataFrame: Data frame with Country, Date and variable columns.
+    """
+    melted_df = new_df.melt(id_vars=['Date', 'Variable'], var_name='Country', value_name='Value')
+    variable_name = melted_df['Variable'].iloc[0]
+    melted_df = melted_df.rename(columns={'Value': variable_name}).drop(columns=['Variable'])
+    return melted_df
+
+def read_dataset(file_name):
+    """
+    Read a CSV file in either format into the original format.
+
+    Args:
+        file_name (str): Path of the CSV file.
+
+    Returns:
+        pd.DataFrame: Data frame with Country, Date and variable columns.
+    """
+    new_df = pd.read_csv(file_name)
+    return new_df if 'Country' in new_df.columns else convert_to_original_format(new_df)
+
+def find_scenario_files(directory, pattern="*.csv"):
+    """
+    Find the scenario files of a directory.
+
+    Args:
+        directory (str): Directory containing the scenario files.
+        pattern (str): Glob pattern of the scenario files.
+
+    Returns:
+        dict: Path of each scenario, keyed by the file name without extension.
+    """
+    return {os.path.splitext(os.path.basename(path))[0]: path for path in sorted(glob.glob(os.path.join(directory, pattern)))}
+
+def find_aggregates(df, variable, countries, tolerance=aggregate_tolerance):
+    """
+    Find the aggregate series of a scenario file, such as regional totals.
+
+    A series is an aggregate when it is a constant multiple of the sum of the other series of
+    the file, like "Asia Cop" (the total of its countries) or "Anicca" (a fixed share of that
+    total). Adding it to its members would count them twice.
+
+    Args:
+        df (pd.DataFrame): Data of the scenario file.
+        variable (str): Variable of the file.
+        countries (list): Series of the file.
+        tolerance (float): Largest spread of the ratio to the sum of the other series, relative to the ratio.
+
+    Returns:
+        list: Aggregate series.
+    """
+    matrix = build_country_matrix(df, countries, variable, int(df['Date'].min()), int(df['Date'].max()))
+    aggregates = []
+    for country in countries:
+        others = matrix.drop(columns=[country])
+        if others.shape[1] < 2:
+            continue
+        total = others.sum(axis=1, min_count=1)
+        ratio = (matrix[country] / total)[(total > 0) & matrix[country].notna()]
+        if len(ratio) >= 2 and ratio.max() > 0 and ratio.max() - ratio.min() <= tolerance * ratio.max():
+            aggregates.append(country)
+    return aggregates
+
+def get_projection(df, country, variable, settings):
+    """
+    Get the projection of a country in a scenario file, its values after the end year.
+
+    Args:
+        df (pd.DataFrame): Data of the scenario file.
+        country (str): Country name.
+        variable (str): Variable of the file.
+        settings (dict): Year range and forecast settings.
+
+    Returns:
+        pd.Series: Projected values indexed by year, empty if the file has none.
+    """
+    rows = df[(df['Country'] == country) & (df['Date'] > settings['end_year']) & (df['Date'] <= settings['forecast_until_year']) & df[variable].notna()]
+    return pd.Series(rows[variable].to_numpy(dtype=float), index=pd.Index(rows['Date'].astype(int)), name=variable)
+
+def run_scenario_sweep(directory, model_name, settings, countries=None, pattern="*.csv", max_workers=None):
+    """
+    Run the same model configuration over every scenario file of a directory.
+
+    Scenario files usually share their history and differ in their projections, so a country
+    with values after the end year keeps the projection of its file. Only the countries without
+    one are modeled on their data up to the end year and forecast from there, each
+    (scenario, country) combination as a separate task of one process pool. Constant, too short
+    and mostly missing series are skipped without fitting. Aggregate series of a file are left
+    out unless the countries are given.
+
+    Args:
+        directory (str): Directory containing the scenario files.
+        model_name (str): "SARIMAX" or "ARIMA".
+        settings (dict): Model ranges, year range and forecast settings.
+        countries (list): Countries to model, None to model every country of each file except its aggregates.
+        pattern (str): Glob pattern of the scenario files.
+        max_workers (int): Number of worker processes, None to use all cores.
+
+    Returns:
+        tuple: Data, variable, countries and left out aggregates of each scenario, forecast result
+        of each (scenario, country), with 'projected' set for the projections of the files.
+    """
+    datasets = {}
+    sweep_results = {}
+    keys = []
+    tasks = []
+
+    for scenario, path in find_scenario_files(directory, pattern).items():
+        df = read_dataset(path)
+        variable = [col for col in df.columns if col not in ['Country', 'Date']][0]
+        file_countries = list(df['Country'].unique())
+        aggregates = find_aggregates(df, variable, file_countries) if countries is None else []
+        scenario_countries = [country for country in file_countries if (countries is None or country in countries) and country not in aggregates]
+        datasets[scenario] = (df, variable, scenario_countries, aggregates)
+
+        modeled = []
+        for country in scenario_countries:
+            projection = get_projection(df, country, variable, settings)
+            if projection.empty:
+                modeled.append(country)
+            else:
+                sweep_results[(scenario, country)] = {'forecast': {'forecast_values': projection}, 'projected': True}
+
+        history = df[df['Date'] <= settings['end_year']]
+        screen = screen_series(history, modeled, variable, settings['start_year'], settings['end_year'])
+        for country, status, reason in screen[screen['Status'] != "Valid"][['Country', 'Status', 'Reason']].itertuples(index=False):
+            sweep_results[(scenario, country)] = {'error': f"Skipped ({status}): {reason}"}
+
+        country_data = slice_country_data(history, modeled, settings['start_year'])
+        for country in modeled:
+            if (scenario, country) in sweep_results:
+                continue
+            keys.append((scenario, country))
+            tasks.append((country, variable, model_name, country_data.get(country, history.iloc[0:0]), settings))
+
+    sweep_results.update(zip(keys, run_tasks(run_batch_task, tasks, max_workers)))
+    return datasets, sweep_results
+
+def build_comparison_table(datasets, sweep_results, settings):
+    """
+    Build the consolidated comparison table of a scenario sweep.
+
+    Each column is the total of one scenario over the countries with a projection or a forecast,
+    historical values up to the end year followed by the projected or forecast values. Failed
+    countries are left out of the history too, so they do not add a drop after the end year.
+
+    Args:
+        datasets (dict): Data of each scenario, as returned by run_scenario_sweep.
+        sweep_results (dict): Forecast result of each (scenario, country).
+        settings (dict): Model ranges, year range and forecast settings.
+
+    Returns:
+        pd.DataFrame: Total of each scenario by year.
+    """
+    years = range(settings['start_year'], settings['forecast_until_year'] + 1)
+    table = pd.DataFrame(index=pd.Index(years, name='Date'))
+
+    for scenario, (df, variable, scenario_countries, _) in datasets.items():
+        members = [country for country in scenario_countries if 'error' not in sweep_results[(scenario, country)]]
+        historical = df[df['Country'].isin(members) & (df['Date'] >= settings['start_year']) & (df['Date'] <= settings['end_year'])]
+        total = historical.groupby('Date')[variable].sum(min_count=1).reindex(years)
+        for country in members:
+            forecast_values = sweep_results[(scenario, country)]['forecast']['forecast_values']
+            total = total.add(forecast_values.reindex(years), fill_value=0)
+        table[scenario] = total
+
+    return table
+
+def plot_comparison(table, variable, save_path):
+    """
+    Plot the scenario comparison table and save it as an image.
+
+    Args:
+        table (pd.DataFrame): Total of each scenario by year.
+        variable (str): Modeled variable.
+        save_path (str): Path of the image.
+    """
+    figure = Figure(figsize=(12, 7))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+
+    for scenario in table.columns:
+        ax.plot(table.index, table[scenario], label=scenario)
+
+    ax.set_title(f"{variable} Production (Scenario Comparison)", fontsize=16, fontweight='bold')
+    ax.set_ylabel('Production (TWh)', fontsize=14)
+    ax.set_xlabel('Year', fontsize=14)
+    ax.legend()
+    ax.grid(True, linestyle='--', which='both', color='grey', alpha=0.5)
+    ax.set_ylim(bottom=0)
+    figure.savefig(save_path, dpi=400)
@@ -0,0 +1,62 @@
+from collections import Counter
+
+class SearchIndex:
+    """
+    Search index of a list of names, such as countries, groups and forecast keys.
+
+    Queries of three or more characters are matched as substrings through a trigram index, and
+    fall back to the names sharing enough of the query trigrams when nothing contains the query,
+    so small typos still find the name.
+    Shorter queries have too few trigrams to use the index and are matched as substrings of every name.
+
+    Args:
+        names (list): Names to index, in the order of the list they filter.
+    """
+
+    def __init__(self, names=()):
+        self.names = [name.lower() for name in names]
+        self.trigrams = {}
+
+        for position, name in enumerate(self.names):
+            for trigram in self.get_trigrams(f" {name} "):
+                self.trigrams.setdefault(trigram, set()).add(position)
+
+    @staticmethod
+    def get_trigrams(text):
+        """
+        Get the trigrams of a text.
+
+        Args:
+            text (str): Lowercase text.
+
+        Returns:
+            set: Trigrams of the text.
+        """
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def search(self, query, min_similarity=0.4):
+        """
+        Find the names matching a query.
+
+        Args:
+            query (str): Text typed by the user.
+            min_similarity (float): Share of the query trigrams a name needs for a fuzzy match.
+
+        Returns:
+            set: Positions of the matching names, None if the query is empty.
+        """
+        query = query.strip().lower()
+        if not query:
+            return None
+        if len(query) < 3:
+            return {position for position, name in enumerate(self.names) if query in name}
+
+        postings = sorted((self.trigrams.get(trigram, set()) for trigram in self.get_trigrams(query)), key=len)
+        candidates = set.intersection(*postings) if postings[0] else set()
+        matches = {position for position in candidates if query in self.names[position]}
+        if matches:
+            return matches
+
+        trigrams = self.get_trigrams(f" {query} ")
+        counts = Counter(position for trigram in trigrams for position in self.trigrams.get(trigram, ()))
+        return {position for position, count in counts.items() if count >= min_similarity * len(trigrams)}
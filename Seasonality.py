@@ -0,0 +1,124 @@
+import numpy as np
+from kalman import stack_series
+
+def center_series(values):
+    """
+    Subtract the mean of many series and zero their padding.
+
+    Args:
+        values (np.ndarray): Series, one row per series, starting in the first column and padded with NaN at the end.
+
+    Returns:
+        tuple: Centred series (zero padded) and length of each series.
+    """
+    lengths = (~np.isnan(values)).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.nan_to_num(values - np.nansum(values, axis=1, keepdims=True) / lengths[:, None]), lengths
+
+def detrend_series(values):
+    """
+    Remove the least-squares linear trend of many series at once.
+
+    Args:
+        values (np.ndarray): Series, one row per series, starting in the first column and padded with NaN at the end.
+
+    Returns:
+        np.ndarray: Detrended series, padded with NaN like the input.
+    """
+    centered, lengths = center_series(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        time = np.where(np.isnan(values), 0, np.arange(values.shape[1])[None, :] - (lengths[:, None] - 1) / 2)
+        slope = (time * centered).sum(axis=1) / (time ** 2).sum(axis=1)
+    return np.where(np.isnan(values), np.nan, centered - np.nan_to_num(slope)[:, None] * time)
+
+def autocorrelations(values, max_lag):
+    """
+    Compute the sample autocorrelations of many series at once through the FFT.
+
+    Args:
+        values (np.ndarray): Series, one row per series, starting in the first column and padded with NaN at the end.
+        max_lag (int): Largest lag.
+
+    Returns:
+        np.ndarray: Autocorrelations, one row per series and one column per lag from 0 to max_lag,
+        NaN beyond the length of the series.
+    """
+    centered, lengths = center_series(values)
+    # Padding to twice the length makes the circular autocovariance the ordinary one
+    transform = np.fft.rfft(centered, n=2 * max(values.shape[1], max_lag + 1), axis=1)
+    autocovariance = np.fft.irfft(np.abs(transform) ** 2, axis=1)[:, :max_lag + 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        acf = autocovariance / autocovariance[:, :1]
+    return np.where(np.arange(max_lag + 1)[None, :] < lengths[:, None], acf, np.nan)
+
+def periodograms(values):
+    """
+    Compute the periodogram of many series at once, each at its own Fourier frequencies.
+
+    Args:
+        values (np.ndarray): Series, one row per series, starting in the first column and padded with NaN at the end.
+
+    Returns:
+        np.ndarray: Periodogram at the frequencies j / n (n the length of the series), one row per
+        series and one column per j from 1 to (n - 1) // 2, NaN beyond.
+    """
+    centered, lengths = center_series(values)
+    power = np.full((len(values), max((values.shape[1] - 1) // 2, 0)), np.nan)
+    # Series of the same length share their Fourier frequencies, so each group takes one FFT
+    for length in np.unique(lengths):
+        members = np.flatnonzero(lengths == length)
+        harmonics = (length - 1) // 2
+        if harmonics > 0:
+            transform = np.fft.rfft(centered[members, :length], axis=1)[:, 1:harmonics + 1]
+            power[members, :harmonics] = np.abs(transform) ** 2 / length
+    return power
+
+def detect_seasonal_periods(series_list, max_period=None, alpha=0.05):
+    """
+    Detect the seasonal period of many series at once, or the absence of seasonality.
+
+    The series are detrended and prewhitened with an AR(1) filter, so that neither trends nor
+    persistence look like seasonality. Fisher's g test then decides whether the strongest
+    periodogram peak with a period between 2 and max_period is significant. As the peak may be
+    a harmonic of the period, and the Fourier frequencies are coarse, the period is the lag with
+    the highest autocorrelation among the multiples of the peak period and their neighbours.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        max_period (int): Longest period, None for half the length of each series.
+        alpha (float): Significance level of Fisher's g test.
+
+    Returns:
+        np.ndarray: Seasonal period of each series, 0 where no period is significant.
+    """
+    values = detrend_series(stack_series(series_list, 0, align_end=False))
+    n_series = len(values)
+    lengths = (~np.isnan(values)).sum(axis=1)
+    longest = lengths // 2 if max_period is None else np.minimum(lengths // 2, max_period)
+    if not n_series or values.shape[1] < 3 or longest.max() < 2:
+        return np.zeros(n_series, dtype=int)
+
+    largest_lag = int(longest.max()) + 1
+    acf = autocorrelations(values, largest_lag)
+    residuals = values[:, 1:] - np.nan_to_num(acf[:, 1:2]) * values[:, :-1]
+    power = periodograms(residuals)
+    lengths = np.maximum(lengths - 1, 1)
+
+    harmonics = np.arange(1, power.shape[1] + 1)
+    frequencies = (~np.isnan(power)).sum(axis=1)
+    allowed = ~np.isnan(power) & (lengths[:, None] <= longest[:, None] * harmonics[None, :])
+    peak = np.argmax(np.where(allowed, power, -np.inf), axis=1)
+    rows = np.arange(n_series)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g = power[rows, peak] / np.nansum(power, axis=1)
+        p_values = np.minimum(frequencies * (1 - g) ** (frequencies - 1), 1)
+    peak_period = lengths / harmonics[peak]
+
+    multiples = np.arange(1, int(np.max(np.where(allowed.any(axis=1), longest / peak_period, 1))) + 2)
+    candidates = np.rint(peak_period[:, None, None] * multiples[None, :, None]) + np.array([-1, 0, 1])[None, None, :]
+    candidates = np.clip(candidates, 0, largest_lag).astype(int).reshape(n_series, -1)
+    valid = (candidates >= 2) & (candidates <= longest[:, None])
+    period = candidates[rows, np.argmax(np.where(valid, np.nan_to_num(acf[rows[:, None], candidates], nan=-np.inf), -np.inf), axis=1)]
+
+    significant = (p_values < alpha) & allowed.any(axis=1) & valid.any(axis=1) & (acf[rows, period] > 0)
+    return np.where(significant, period, 0)
@@ -0,0 +1,365 @@
+import os
+import re
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from registry import ForecastRegistry
+
+session_version = 1
+session_data_folder = "session_data"
+data_directory_pattern = re.compile(r"data_\d{4}")
+
+def save_array(path, array):
+    """
+    Save an array as .npy.
+
+    Arrays are always saved into a new data directory (see save_session), never over a file
+    that a loaded session may still have memory-mapped, which Windows does not allow.
+
+    Args:
+        path (str): Path of the .npy file.
+        array (np.ndarray): Array to save.
+    """
+    np.save(path, array)
+
+def get_data_directories(data_root):
+    """
+    Get the data directories saved in the session data folder.
+
+    Args:
+        data_root (str): Session data folder.
+
+    Returns:
+        list: Names of the "data_<nnnn>" directories.
+    """
+    return [name for name in os.listdir(data_root) if data_directory_pattern.fullmatch(name)]
+
+def next_data_directory(data_root):
+    """
+    Get the name of a new data directory of a session.
+
+    Args:
+        data_root (str): Session data folder.
+
+    Returns:
+        str: Name of the first "data_<nnnn>" directory above the existing ones.
+    """
+    numbers = [int(name[5:]) for name in get_data_directories(data_root)]
+    return f"data_{max(numbers, default=0) + 1:04d}"
+
+def save_frame(frame, directory):
+    """
+    Save a data frame as one .npy file per column.
+
+    Numeric and date columns are saved as they are, text columns as integer codes plus the list of values.
+
+    Args:
+        frame (pd.DataFrame): Data frame to save.
+        directory (str): Directory of the column files.
+
+    Returns:
+        dict: Column layout, needed to load the frame back.
+    """
+    os.makedirs(directory, exist_ok=True)
+    columns = []
+    for position, column in enumerate(frame.columns):
+        file_name = f"column_{position:04d}.npy"
+        values = frame[column]
+        if values.dtype.kind in 'biufM':
+            save_array(os.path.join(directory, file_name), values.to_numpy())
+            columns.append({'name': column, 'file': file_name, 'kind': 'numeric'})
+        else:
+            codes, categories = pd.factorize(values)
+            save_array(os.path.join(directory, file_name), codes.astype(np.int32))
+            columns.append({'name': column, 'file': file_name, 'kind': 'text', 'categories': [str(value) for value in categories]})
+    return {'columns': columns, 'rows': len(frame)}
+
+def load_frame(layout, directory):
+    """
+    Load a data frame saved with save_frame, memory-mapping the numeric columns.
+
+    The numeric columns are copy-on-write maps of the files, so they are only read from disk
+    when used and changes never reach the session files.
+
+    Args:
+        layout (dict): Column layout returned by save_frame.
+        directory (str): Directory of the column files.
+
+    Returns:
+        pd.DataFrame: The saved data frame.
+    """
+    data = {}
+    for column in layout['columns']:
+        values = np.load(os.path.join(directory, column['file']), mmap_mode='c')
+        if column['kind'] == 'text':
+            categories = np.array(column['categories'] + [None], dtype=object)
+            values = categories[values]
+        data[column['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+def save_forecasts(forecast_results, directory):
+    """
+    Save the forecast values and confidence intervals of every forecast in shared arrays.
+
+    Simulation summaries are saved as float32 in shared arrays too, the simulated paths are not saved.
+
+    Args:
+        forecast_results (ForecastRegistry): Forecast results.
+        directory (str): Data directory of the session.
+
+    Returns:
+        list: Description of each forecast and its position in the arrays.
+    """
+    forecasts = []
+    years = []
+    values = []
+    lower = []
+    upper = []
+    start = 0
+    simulation_arrays = [[], [], []]
+    simulation_starts = [0, 0, 0]
+
+    for forecast_key, forecast in forecast_results.items():
+        forecast_values = forecast['forecast_values']
+        forecast_ci = forecast['forecast_ci']
+        forecasts.append({
+            'key': forecast_key,
+            'country': forecast['country'],
+            'model': forecast['model'],
+            'variable': forecast.get('variable'),
+            'order': list(forecast['order']),
+            'seasonal_order': list(forecast['seasonal_order']) if forecast.get('seasonal_order') is not None else None,
+            'exog': bool(forecast.get('exog', False)),
+            'forecast_until_year': int(forecast['forecast_until_year']),
+            'start': start,
+            'length': len(forecast_values)
+        })
+        if 'simulation' in forecast:
+            simulation = forecast['simulation']
+            forecasts[-1]['simulation'] = {
+                'quantiles': simulation['quantiles'].tolist(),
+                'thresholds': simulation['thresholds'].tolist(),
+                'n_paths': int(simulation['n_paths']),
+                'bands_start': simulation_starts[0],
+                'exceedance_start': simulation_starts[1],
+                'mean_start': simulation_starts[2]
+            }
+            for position, array in enumerate([simulation['bands'], simulation['exceedance'], simulation['mean']]):
+                simulation_arrays[position].append(array.astype(np.float32).ravel())
+                simulation_starts[position] += array.size
+        years.append(np.asarray(forecast_values.index, dtype=np.int64))
+        values.append(forecast_values.to_numpy(dtype=float))
+        lower.append(forecast_ci.iloc[:, 0].to_numpy(dtype=float))
+        upper.append(forecast_ci.iloc[:, 1].to_numpy(dtype=float))
+        start += len(forecast_values)
+
+    for name, arrays, dtype in [('forecast_years', years, np.int64), ('forecast_values', values, float),
+                                ('forecast_ci_lower', lower, float), ('forecast_ci_upper', upper, float),
+                                ('simulation_bands', simulation_arrays[0], np.float32), ('simulation_exceedance', simulation_arrays[1], np.float32),
+                                ('simulation_mean', simulation_arrays[2], np.float32)]:
+        save_array(os.path.join(directory, f"{name}.npy"), np.concatenate(arrays) if arrays else np.array([], dtype=dtype))
+    return forecasts
+
+def load_forecasts(forecasts, directory):
+    """
+    Load the forecasts saved with save_forecasts as views of memory-mapped arrays.
+
+    Args:
+        forecasts (list): Description of each forecast.
+        directory (str): Data directory of the session.
+
+    Returns:
+        ForecastRegistry: Forecast results.
+    """
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='c')
+              for name in ['forecast_years', 'forecast_values', 'forecast_ci_lower', 'forecast_ci_upper']}
+    for name in ['simulation_bands', 'simulation_exceedance', 'simulation_mean']:
+        path = os.path.join(directory, f"{name}.npy")
+        arrays[name] = np.load(path, mmap_mode='c') if os.path.exists(path) else np.array([], dtype=np.float32)
+
+    forecast_results = ForecastRegistry()
+    for forecast in forecasts:
+        positions = slice(forecast['start'], forecast['start'] + forecast['length'])
+        index = pd.Index(arrays['forecast_years'][positions])
+        entry = {
+            'forecast_values': pd.Series(arrays['forecast_values'][positions], index=index, name='predicted_mean', copy=False),
+            'forecast_ci': pd.DataFrame({'mean_ci_lower': arrays['forecast_ci_lower'][positions],
+                                         'mean_ci_upper': arrays['forecast_ci_upper'][positions]}, index=index, copy=False),
+            'country': forecast['country'],
+            'model': forecast['model'],
+            'variable': forecast['variable'],
+            'order': tuple(forecast['order']),
+            'forecast_until_year': forecast['forecast_until_year']
+        }
+        if forecast['seasonal_order'] is not None:
+            entry['seasonal_order'] = tuple(forecast['seasonal_order'])
+            entry['exog'] = forecast['exog']
+        if forecast.get('simulation') is not None:
+            simulation = forecast['simulation']
+            n_quantiles, n_thresholds, length = len(simulation['quantiles']), len(simulation['thresholds']), forecast['length']
+            entry['simulation'] = {
+                'years': np.asarray(index, dtype=np.int32),
+                'quantiles': np.asarray(simulation['quantiles'], dtype=np.float32),
+                'bands': arrays['simulation_bands'][simulation['bands_start']:simulation['bands_start'] + n_quantiles * length].reshape(n_quantiles, length),
+                'thresholds': np.asarray(simulation['thresholds'], dtype=np.float32),
+                'exceedance': arrays['simulation_exceedance'][simulation['exceedance_start']:simulation['exceedance_start'] + n_thresholds * length].reshape(n_thresholds, length),
+                'mean': arrays['simulation_mean'][simulation['mean_start']:simulation['mean_start'] + length],
+                'n_paths': simulation['n_paths']
+            }
+        forecast_results[forecast['key']] = entry
+    return forecast_results
+
+def save_models(model_results, directory):
+    """
+    Save the parameters and fit statistics of fitted models, with the data they were fitted on.
+
+    Full results objects are reduced to the same lean form the optimizers produce in lean mode.
+
+    Args:
+        model_results (dict): Model results of each model name ("SARIMAX", "ARIMA"), keyed by country.
+        directory (str): Data directory of the session.
+
+    Returns:
+        dict: Description of each model and the position of its data in the endog array.
+    """
+    models = {}
+    endogs = []
+    start = 0
+
+    for model_name, results in model_results.items():
+        models[model_name] = {}
+        for country, result in (results or {}).items():
+            if 'error' in result:
+                continue
+            if 'params' in result:
+                params = np.asarray(result['params'], dtype=float)
+                statistics = {name: float(result[name]) for name in ['aic', 'bic', 'llf', 'nobs']}
+                endog = np.asarray(result['endog'], dtype=float)
+                exog = result.get('exog')
+            else:
+                fitted = result['model_object']
+                params = np.asarray(fitted.params, dtype=float)
+                statistics = {name: float(getattr(fitted, name)) for name in ['aic', 'bic', 'llf', 'nobs']}
+                endog = np.asarray(fitted.model.data.endog, dtype=float).ravel()
+                exog = fitted.model.data.exog if model_name == "SARIMAX" else None
+
+            models[model_name][country] = {
+                **statistics,
+                'params': params.tolist(),
+                'order': list(result['order']),
+                'seasonal_order': list(result['seasonal_order']) if 'seasonal_order' in result else None,
+                'variable': result.get('variable'),
+                'exog': np.asarray(exog, dtype=float).tolist() if exog is not None else None,
+                'start': start,
+                'length': len(endog)
+            }
+            endogs.append(endog)
+            start += len(endog)
+
+    save_array(os.path.join(directory, "model_endog.npy"), np.concatenate(endogs) if endogs else np.array([], dtype=float))
+    return models
+
+def load_models(models, directory):
+    """
+    Load the models saved with save_models as lean results, rebuilt on demand without refitting.
+
+    Args:
+        models (dict): Description of each model.
+        directory (str): Data directory of the session.
+
+    Returns:
+        dict: Lean model results of each model name, keyed by country.
+    """
+    endog = np.load(os.path.join(directory, "model_endog.npy"), mmap_mode='c')
+
+    model_results = {}
+    for model_name, results in models.items():
+        model_results[model_name] = {}
+        for country, result in results.items():
+            entry = {name: result[name] for name in ['aic', 'bic', 'llf', 'nobs', 'variable']}
+            entry['params'] = np.asarray(result['params'])
+            entry['order'] = tuple(result['order'])
+            if result['seasonal_order'] is not None:
+                entry['seasonal_order'] = tuple(result['seasonal_order'])
+            entry['endog'] = pd.Series(endog[result['start']:result['start'] + result['length']], copy=False)
+            entry['exog'] = np.asarray(result['exog']) if result['exog'] is not None else None
+            model_results[model_name][country] = entry
+    return model_results
+
+def save_session(session_dir, df, forecast_results, model_results=None, exog_data=None, active_lines=None, settings=None):
+    """
+    Save the loaded data, fitted models and forecasts to a session directory.
+
+    The arrays are written into a new data directory of the session data folder, and
+    session.json is switched to it only once they are all written. The data directories of
+    earlier saves in that folder are then removed, except those still memory-mapped on
+    Windows, which are removed by a later save. Nothing else in the session directory is touched.
+
+    Args:
+        session_dir (str): Session directory, created if needed.
+        df (pd.DataFrame): Data frame containing the data.
+        forecast_results (ForecastRegistry): Forecast results, including any corrections.
+        model_results (dict): Model results of each model name ("SARIMAX", "ARIMA"), keyed by country.
+        exog_data (pd.DataFrame): Exogenous data indexed by Date.
+        active_lines (list): Reference lines of the plot.
+        settings (dict): Year range, variable and forecast settings.
+    """
+    data_root = os.path.join(session_dir, session_data_folder)
+    os.makedirs(data_root, exist_ok=True)
+    data_name = next_data_directory(data_root)
+    data_dir = os.path.join(data_root, data_name)
+    os.makedirs(data_dir)
+    session = {
+        'version': session_version,
+        'data': data_name,
+        'dataset': save_frame(df, os.path.join(data_dir, "dataset")) if df is not None else None,
+        'exog_data': save_frame(exog_data.reset_index(), os.path.join(data_dir, "exog_data")) if exog_data is not None else None,
+        'forecasts': save_forecasts(forecast_results, data_dir),
+        'models': save_models(model_results or {}, data_dir),
+        'active_lines': active_lines or [],
+        'settings': settings or {}
+    }
+
+    temp_path = os.path.join(session_dir, "session.json.tmp")
+    with open(temp_path, 'w') as handle:
+        json.dump(session, handle)
+    os.replace(temp_path, os.path.join(session_dir, "session.json"))
+
+    for name in get_data_directories(data_root):
+        if name != data_name:
+            shutil.rmtree(os.path.join(data_root, name), ignore_errors=True)
+
+def load_session(session_dir):
+    """
+    Load a session directory saved with save_session.
+
+    Arrays are memory-mapped instead of read, so large sessions open without reading every
+    value and no model is refitted.
+
+    Args:
+        session_dir (str): Session directory.
+
+    Returns:
+        dict: Data frame, forecast results, model results, exogenous data, active lines and settings.
+    """
+    with open(os.path.join(session_dir, "session.json")) as handle:
+        session = json.load(handle)
+    if session.get('version') != session_version:
+        raise ValueError(f"Unsupported session version: {session.get('version')}")
+
+    if not data_directory_pattern.fullmatch(session.get('data') or ""):
+        raise ValueError(f"Invalid session data directory: {session.get('data')}")
+    data_dir = os.path.join(session_dir, session_data_folder, session['data'])
+    exog_data = None
+    if session['exog_data'] is not None:
+        exog_data = load_frame(session['exog_data'], os.path.join(data_dir, "exog_data")).set_index('Date')
+
+    return {
+        'df': load_frame(session['dataset'], os.path.join(data_dir, "dataset")) if session['dataset'] is not None else None,
+        'forecast_results': load_forecasts(session['forecasts'], data_dir),
+        'model_results': load_models(session['models'], data_dir),
+        'exog_data': exog_data,
+        'active_lines': session['active_lines'],
+        'settings': session['settings']
+    }
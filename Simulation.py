@@ -0,0 +1,328 @@
+import numpy as np
+import pandas as pd
+from kalman import stack_series
+from sarimax import get_model_object as get_sarimax_object, align_exog
+from arima import get_model_object as get_arima_object
+from ets import ets_filter
+
+default_quantiles = (0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.975)
+max_chunk_values = 20_000_000
+
+def summarize_paths(paths, quantiles=default_quantiles, thresholds=()):
+    """
+    Compute the quantile bands and exceedance probabilities of simulated paths of many series at once.
+
+    The paths are sorted once along the path axis, the quantiles are read off the order
+    statistics (linear interpolation, as numpy's default quantile method) and the exceedance
+    probabilities counted on the same sorted array.
+
+    Args:
+        paths (np.ndarray): Paths of each series, shaped (series, paths, steps).
+        quantiles (tuple): Quantile levels between 0 and 1.
+        thresholds (array-like): Exceedance thresholds, one list for all series or one row per series.
+
+    Returns:
+        tuple: Quantile bands (series, quantiles, steps), exceedance probabilities
+        (series, thresholds, steps) and mean (series, steps), all float32.
+    """
+    n_series, n_paths, steps = paths.shape
+    ordered = np.sort(paths, axis=1)
+
+    positions = np.asarray(quantiles, dtype=float) * (n_paths - 1)
+    below = np.floor(positions).astype(int)
+    above = np.minimum(below + 1, n_paths - 1)
+    weight = (positions - below)[None, :, None]
+    bands = ordered[:, below] * (1 - weight) + ordered[:, above] * weight
+
+    thresholds = np.asarray(thresholds, dtype=float)
+    if thresholds.ndim < 2:
+        thresholds = np.broadcast_to(thresholds.ravel(), (n_series, thresholds.size))
+    exceedance = (ordered[:, None, :, :] > thresholds[:, :, None, None]).mean(axis=2)
+    return bands.astype(np.float32), exceedance.astype(np.float32), ordered.mean(axis=1).astype(np.float32)
+
+def matrix_sqrt(cov):
+    """
+    Compute a square root of many covariance matrices at once, accepting singular ones.
+
+    Args:
+        cov (np.ndarray): Symmetric positive semi-definite matrices, shaped (series, k, k).
+
+    Returns:
+        np.ndarray: Matrices L with L L' = cov, shaped like cov.
+    """
+    eigenvalues, eigenvectors = np.linalg.eigh((cov + cov.transpose(0, 2, 1)) / 2)
+    return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))[:, None, :]
+
+def state_space_system(results):
+    """
+    Extract the forecast system of a fitted statsmodels state space results object.
+
+    Only the time-invariant matrices are needed, as the regression effects and intercepts are
+    part of the forecast mean, not of the deviations around it.
+
+    Args:
+        results (MLEResults): Fitted SARIMAX or ARIMA results.
+
+    Returns:
+        dict: Design, transition, selection times the square root of the state covariance,
+        observation variance and covariance of the state of the first forecast step.
+    """
+    ssm = results.model.ssm
+
+    def last(name):
+        matrix = np.asarray(ssm[name], dtype=float)
+        return matrix[..., -1] if matrix.ndim == 3 else matrix
+
+    return {
+        'design': last('design')[0],
+        'transition': last('transition'),
+        'shock': last('selection') @ matrix_sqrt(last('state_cov')[None])[0],
+        'obs_var': float(last('obs_cov')[0, 0]),
+        'state_cov': np.asarray(results.predicted_state_cov[:, :, -1], dtype=float)
+    }
+
+def simulate_state_space_deviations(systems, steps, n_paths, rng):
+    """
+    Simulate the deviations of many state space models from their forecast means at once.
+
+    The systems are padded with zero states to the largest state dimension, so every step of
+    every path of every model is one batched matrix product. The initial state deviation is
+    drawn from the covariance of the first forecast step, so the paths carry the uncertainty
+    of the filtered state as well as the future shocks.
+
+    Args:
+        systems (list): Systems from state_space_system.
+        steps (int): Number of steps to simulate.
+        n_paths (int): Number of paths of each model.
+        rng (np.random.Generator): Random number generator.
+
+    Returns:
+        np.ndarray: Deviations shaped (series, paths, steps).
+    """
+    n_series = len(systems)
+    k_states = max(len(system['design']) for system in systems)
+    k_shocks = max(system['shock'].shape[1] for system in systems)
+    design = np.zeros((n_series, k_states))
+    transition = np.zeros((n_series, k_states, k_states))
+    shock = np.zeros((n_series, k_states, k_shocks))
+    initial = np.zeros((n_series, k_states, k_states))
+    for position, system in enumerate(systems):
+        k, r = system['shock'].shape
+        design[position, :k] = system['design']
+        transition[position, :k, :k] = system['transition']
+        shock[position, :k, :r] = system['shock']
+        initial[position, :k, :k] = system['state_cov']
+    obs_std = np.sqrt(np.clip([system['obs_var'] for system in systems], 0, None))
+
+    state = np.einsum('nij,npj->npi', matrix_sqrt(initial), rng.standard_normal((n_series, n_paths, k_states)))
+    deviations = np.empty((n_series, n_paths, steps))
+    for step in range(steps):
+        deviations[:, :, step] = np.einsum('ni,npi->np', design, state) + obs_std[:, None] * rng.standard_normal((n_series, n_paths))
+        state = np.einsum('nij,npj->npi', transition, state) + np.einsum('nij,npj->npi', shock, rng.standard_normal((n_series, n_paths, k_shocks)))
+    return deviations
+
+def simulate_ar_ols_paths(series_list, coefficients, sigma2, steps, n_paths, rng):
+    """
+    Simulate future paths of many autoregressions at once.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        coefficients (np.ndarray): Constant then lag coefficients of each series, padded with zeros.
+        sigma2 (np.ndarray): Innovation variance of each series.
+        steps (int): Number of steps to simulate.
+        n_paths (int): Number of paths of each series.
+        rng (np.random.Generator): Random number generator.
+
+    Returns:
+        np.ndarray: Paths shaped (series, paths, steps).
+    """
+    n_series, max_lag = len(series_list), coefficients.shape[1] - 1
+    values = stack_series(series_list, 0)
+    history = np.zeros((n_series, max_lag))
+    if max_lag and values.shape[1]:
+        recent = values[:, -max_lag:][:, ::-1]
+        history[:, :recent.shape[1]] = np.nan_to_num(recent)
+    history = np.repeat(history[:, None, :], n_paths, axis=1)
+
+    paths = np.empty((n_series, n_paths, steps))
+    innovation_std = np.sqrt(np.clip(sigma2, 0, None))[:, None]
+    for step in range(steps):
+        paths[:, :, step] = coefficients[:, None, 0] + np.einsum('nj,npj->np', coefficients[:, 1:], history) + innovation_std * rng.standard_normal((n_series, n_paths))
+        if max_lag:
+            history = np.concatenate([paths[:, :, step:step + 1], history[:, :, :-1]], axis=2)
+    return paths
+
+def simulate_ets_paths(series_list, params, steps, n_paths, rng):
+    """
+    Simulate future paths of many additive ETS models at once.
+
+    The states after the last observation are found with ets_filter, and every path then runs
+    the same recursions with its own Gaussian errors.
+
+    Args:
+        series_list (list): Series of each country, without missing values.
+        params (np.ndarray): Parameters of each series, as returned by fit_ets_batch. All rows have the same seasonal period.
+        steps (int): Number of steps to simulate.
+        n_paths (int): Number of paths of each series.
+        rng (np.random.Generator): Random number generator.
+
+    Returns:
+        np.ndarray: Paths shaped (series, paths, steps).
+    """
+    smoothing, level, slope, season, sigma2 = params[:, :4], params[:, 4], params[:, 5], params[:, 6:-1], params[:, -1]
+    _, _, level, slope, season = ets_filter(stack_series(series_list, 0, align_end=False), *smoothing.T, level, slope, season)
+    alpha, beta, gamma, phi = (values[:, None] for values in smoothing.T)
+    level = np.repeat(level[:, None], n_paths, axis=1)
+    slope = np.repeat(slope[:, None], n_paths, axis=1)
+    season = np.repeat(season[:, None, :], n_paths, axis=1)
+
+    paths = np.empty((len(params), n_paths, steps))
+    error_std = np.sqrt(np.clip(sigma2, 0, None))[:, None]
+    for step in range(steps):
+        error = error_std * rng.standard_normal(level.shape)
+        current_season = season[:, :, 0] if season.shape[2] else 0
+        paths[:, :, step] = level + phi * slope + current_season + error
+        level = level + phi * slope + alpha * error
+        slope = phi * slope + beta * error
+        if season.shape[2]:
+            season = np.concatenate([season[:, :, 1:], (current_season + gamma * error)[:, :, None]], axis=2)
+    return paths
+
+def forecast_years_of(df, countries, start_year, forecast_until_year):
+    """
+    Get the forecast years of each country, starting after its last data year.
+
+    Args:
+        df (pd.DataFrame): Data frame containing the data.
+        countries (list): Countries.
+        start_year (int): Start year for the data.
+        forecast_until_year (int): Last forecast year.
+
+    Returns:
+        dict: Forecast years of each country.
+    """
+    last_years = df[df['Country'].isin(countries) & (df['Date'] >= start_year)].groupby('Country')['Date'].max()
+    return {country: pd.Index(range(int(last_years[country]) + 1, forecast_until_year + 1)) for country in countries}
+
+def simulate_paths(model, results, years, n_paths, rng, exog_data=None):
+    """
+    Simulate future paths of fitted models of one model type, all countries at once.
+
+    Args:
+        model (str): Model code of the forecasts, 'SARX', 'AR', 'AROLS' or 'ETS'.
+        results (dict): Fitted results of that model, keyed by country.
+        years (dict): Forecast years of each country.
+        n_paths (int): Number of paths of each country.
+        rng (np.random.Generator): Random number generator.
+        exog_data (pd.DataFrame): Annual exogenous data covering the forecast years, required for SARIMAX models fitted with regressors.
+
+    Returns:
+        np.ndarray: Paths shaped (countries, paths, steps), steps covering the longest horizon.
+    """
+    countries = list(results)
+    steps = max(len(years[country]) for country in countries)
+
+    if model in ('SARX', 'AR'):
+        means = np.zeros((len(countries), steps))
+        systems = []
+        for position, country in enumerate(countries):
+            fitted = get_sarimax_object(results[country]) if model == 'SARX' else get_arima_object(results[country])
+            future_exog = None
+            if model == 'SARX' and results[country].get('exog') is not None:
+                future_exog = align_exog(exog_data, country, years[country])
+                future_exog = np.vstack([future_exog, np.repeat(future_exog[-1:], steps - len(future_exog), axis=0)])
+            means[position] = np.asarray(fitted.get_forecast(steps=steps, exog=future_exog).predicted_mean, dtype=float)
+            systems.append(state_space_system(fitted))
+        return means[:, None, :] + simulate_state_space_deviations(systems, steps, n_paths, rng)
+
+    if model == 'AROLS':
+        max_lag = max(len(results[country]['params']) - 2 for country in countries)
+        coefficients = np.zeros((len(countries), max_lag + 1))
+        for position, country in enumerate(countries):
+            coefficients[position, :len(results[country]['params']) - 1] = results[country]['params'][:-1]
+        sigma2 = np.array([results[country]['params'][-1] for country in countries])
+        return simulate_ar_ols_paths([results[country]['endog'] for country in countries], coefficients, sigma2, steps, n_paths, rng)
+
+    if model == 'ETS':
+        paths = np.empty((len(countries), n_paths, steps))
+        groups = {}
+        for position, country in enumerate(countries):
+            groups.setdefault(len(results[country]['params']), []).append(position)
+        for positions in groups.values():
+            params = np.array([results[countries[position]]['params'] for position in positions])
+            paths[positions] = simulate_ets_paths([results[countries[position]]['endog'] for position in positions], params, steps, n_paths, rng)
+        return paths
+
+    raise ValueError(f"Simulation is not supported for {model} models.")
+
+def simulate_future(model, model_results, df, start_year, forecast_until_year=2100, n_paths=1000, quantiles=default_quantiles, thresholds=(),
+                    replace_negative_forecast=False, exog_data=None, keep_paths=False, seed=None):
+    """
+    Simulate future paths of every fitted model of one type and summarize their distribution.
+
+    Countries are simulated together in chunks of at most max_chunk_values path values, and
+    only the float32 summaries (and the paths, if requested) of each country are kept.
+
+    Args:
+        model (str): Model code of the forecasts, 'SARX', 'AR', 'AROLS' or 'ETS'.
+        model_results (dict): Fitted results of that model, keyed by country.
+        df (pd.DataFrame): Data frame containing the data.
+        start_year (int): Start year for the data.
+        forecast_until_year (int): Last forecast year.
+        n_paths (int): Number of paths of each country.
+        quantiles (tuple): Quantile levels between 0 and 1.
+        thresholds (array-like): Exceedance thresholds, in the units of the variable.
+        replace_negative_forecast (bool): Whether to replace negative simulated values with 0.
+        exog_data (pd.DataFrame): Annual exogenous data covering the forecast years, required for SARIMAX models fitted with regressors.
+        keep_paths (bool): Whether to keep the simulated paths of each country.
+        seed (int): Seed of the random number generator, None for a random seed.
+
+    Returns:
+        dict: Simulation of each country: forecast years, quantile levels, quantile bands
+        (quantiles, years), thresholds, exceedance probabilities (thresholds, years), mean and
+        number of paths, plus the paths (paths, years) if kept. Countries that cannot be simulated
+        (e.g. because the exogenous data does not cover the forecast years) get {'error': ...} instead.
+    """
+    fitted = {country: result for country, result in model_results.items() if 'error' not in result}
+    if not fitted:
+        return {}
+
+    rng = np.random.default_rng(seed)
+    years = forecast_years_of(df, list(fitted), start_year, forecast_until_year)
+    fitted = {country: result for country, result in fitted.items() if len(years[country])}
+
+    simulations = {}
+    if model == 'SARX':
+        for country in [country for country, result in fitted.items() if result.get('exog') is not None]:
+            try:
+                align_exog(exog_data, country, years[country])
+            except ValueError as e:
+                simulations[country] = {'error': str(e)}
+                del fitted[country]
+    countries = list(fitted)
+    steps = max([len(years[country]) for country in countries] + [1])
+    chunk_size = max(1, max_chunk_values // (n_paths * steps))
+    thresholds = np.asarray(thresholds, dtype=float).ravel()
+
+    for chunk_start in range(0, len(countries), chunk_size):
+        chunk = countries[chunk_start:chunk_start + chunk_size]
+        paths = simulate_paths(model, {country: fitted[country] for country in chunk}, years, n_paths, rng, exog_data)
+        if replace_negative_forecast:
+            np.maximum(paths, 0, out=paths)
+        bands, exceedance, mean = summarize_paths(paths, quantiles, thresholds)
+
+        for position, country in enumerate(chunk):
+            horizon = len(years[country])
+            simulations[country] = {
+                'years': np.asarray(years[country], dtype=np.int32),
+                'quantiles': np.asarray(quantiles, dtype=np.float32),
+                'bands': bands[position, :, :horizon].copy(),
+                'thresholds': thresholds.astype(np.float32),
+                'exceedance': exceedance[position, :, :horizon].copy(),
+                'mean': mean[position, :horizon].copy(),
+                'n_paths': n_paths
+            }
+            if keep_paths:
+                simulations[country]['paths'] = paths[position, :, :horizon].astype(np.float32)
+
+    return simulations
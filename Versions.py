@@ -0,0 +1,149 @@
+from collections import deque
+import pandas as pd
+
+def diff_values(before, after):
+    """
+    Compare two versions of forecast values year by year.
+
+    Args:
+        before (pd.Series): Values before the change, indexed by year.
+        after (pd.Series): Values after the change, indexed by year.
+
+    Returns:
+        pd.DataFrame: Year, value before, value after and change, for the years whose value changed.
+    """
+    frame = pd.DataFrame({'Before': before, 'After': after})
+    frame['Change'] = frame['After'] - frame['Before']
+    changed = (frame['Before'] != frame['After']) & ~(frame['Before'].isna() & frame['After'].isna())
+    return frame[changed].rename_axis('Year').reset_index()
+
+class ForecastHistory:
+    """
+    Undo and redo history of forecast corrections, as copy-on-write versions.
+
+    Forecast values are never written in place: a correction builds a new Series and commits
+    it. A version only holds the values it replaced and the values it set for a single
+    forecast, with its confidence interval shifted by the same change, so all versions share
+    the arrays of every other forecast, and undo and redo only swap two references. A version
+    whose forecast was replaced since (e.g. by running the model again) or removed is stale
+    and skipped.
+
+    Args:
+        forecast_results (ForecastRegistry): Forecast results whose corrections are tracked.
+        max_versions (int): Number of versions kept for undo, the oldest are dropped first.
+    """
+
+    def __init__(self, forecast_results, max_versions=200):
+        self.forecast_results = forecast_results
+        self.undo_stack = deque(maxlen=max_versions)
+        self.redo_stack = []
+
+    def commit(self, forecast_key, values, description=""):
+        """
+        Set new forecast values as a new version.
+
+        Args:
+            forecast_key (str): Forecast key.
+            values (pd.Series): New forecast values, not to be modified afterwards.
+            description (str): Description of the change.
+
+        Returns:
+            dict: The version, None if the values did not change.
+        """
+        forecast = self.forecast_results[forecast_key]
+        previous = forecast['forecast_values']
+        if values.equals(previous):
+            return None
+
+        previous_ci = forecast.get('forecast_ci')
+        forecast_ci = previous_ci.add(values - previous, axis=0) if previous_ci is not None else None
+        version = {'key': forecast_key, 'forecast': forecast, 'before': previous, 'after': values,
+                   'before_ci': previous_ci, 'after_ci': forecast_ci, 'description': description}
+        self.apply(version, 'after')
+        self.undo_stack.append(version)
+        self.redo_stack.clear()
+        return version
+
+    @staticmethod
+    def apply(version, side):
+        """
+        Set the values and confidence interval of one side of a version on its forecast.
+
+        Args:
+            version (dict): Version.
+            side (str): 'before' or 'after'.
+        """
+        version['forecast']['forecast_values'] = version[side]
+        if version[f"{side}_ci"] is not None:
+            version['forecast']['forecast_ci'] = version[f"{side}_ci"]
+
+    def is_current(self, version, values):
+        """
+        Tell whether a version still applies to its forecast.
+
+        Args:
+            version (dict): Version.
+            values (pd.Series): Values the forecast must hold for the version to apply.
+
+        Returns:
+            bool: True if the forecast is still registered and holds these values.
+        """
+        return self.forecast_results.get(version['key']) is version['forecast'] and version['forecast']['forecast_values'] is values
+
+    def undo(self):
+        """
+        Restore the values before the last version.
+
+        Returns:
+            dict: The undone version, None if there is nothing to undo.
+        """
+        while self.undo_stack:
+            version = self.undo_stack.pop()
+            if self.is_current(version, version['after']):
+                self.apply(version, 'before')
+                self.redo_stack.append(version)
+                return version
+        return None
+
+    def redo(self):
+        """
+        Apply the last undone version again.
+
+        Returns:
+            dict: The redone version, None if there is nothing to redo.
+        """
+        while self.redo_stack:
+            version = self.redo_stack.pop()
+            if self.is_current(version, version['before']):
+                self.apply(version, 'after')
+                self.undo_stack.append(version)
+                return version
+        return None
+
+    def last_version(self):
+        """
+        Get the last applied version.
+
+        Returns:
+            dict: The last version that can be undone, None if there is none.
+        """
+        return next((version for version in reversed(self.undo_stack) if self.is_current(version, version['after'])), None)
+
+    def diff(self, version):
+        """
+        Compare the values before and after a version.
+
+        Args:
+            version (dict): Version.
+
+        Returns:
+            pd.DataFrame: Year, value before, value after and change, for the years the version changed.
+        """
+        return diff_values(version['before'], version['after'])
+
+    def clear(self):
+        """
+        Drop every version.
+        """
+        self.undo_stack.clear()
+        self.redo_stack.clear()
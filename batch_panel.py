@@ -0,0 +1,58 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QListWidget, QListWidgetItem, QCheckBox, QPushButton
+from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt
+import os
+
+class BatchPanel(QWidget):
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+
+        self.setWindowTitle("Batch Forecast")
+        self.setGeometry(100, 100, 300, 500)
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        icon_path = os.path.join(script_dir, "assets", "Logo_NBackground.png")
+        self.setWindowIcon(QIcon(icon_path))
+
+        layout = QVBoxLayout()
+
+        self.variable_label = QLabel("Select variables to forecast:", self)
+        layout.addWidget(self.variable_label)
+
+        self.variable_list = QListWidget(self)
+        layout.addWidget(self.variable_list)
+
+        self.model_label = QLabel("Select models:", self)
+        layout.addWidget(self.model_label)
+
+        self.sarimax_checkbox = QCheckBox("SARIMAX", self)
+        layout.addWidget(self.sarimax_checkbox)
+
+        self.arima_checkbox = QCheckBox("ARIMA", self)
+        self.arima_checkbox.setChecked(True)
+        layout.addWidget(self.arima_checkbox)
+
+        self.run_button = QPushButton("Run Batch", self)
+        self.run_button.clicked.connect(self.run_batch)
+        layout.addWidget(self.run_button)
+
+        self.setLayout(layout)
+
+    def populate_variables(self, variables):
+
+        self.variable_list.clear()
+        for variable in variables:
+            item = QListWidgetItem(variable)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Unchecked)
+            self.variable_list.addItem(item)
+
+    def run_batch(self):
+
+        variables = [self.variable_list.item(index).text() for index in range(self.variable_list.count()) if self.variable_list.item(index).checkState() == Qt.Checked]
+        models = [checkbox.text() for checkbox in [self.sarimax_checkbox, self.arima_checkbox] if checkbox.isChecked()]
+        if not variables or not models:
+            self.main_window.console.append("Select at least one variable and one model for the batch forecast.")
+            return
+        self.main_window.run_batch(variables, models)
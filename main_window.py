@@ -1,18 +1,34 @@
 import sys
 import os
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QPushButton, QComboBox, QTextEdit, QFileDialog, QLabel, QSpinBox, QListWidget, QListWidgetItem, QLineEdit, QGridLayout, QMessageBox, QAction)
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QPushButton, QComboBox, QTextEdit, QFileDialog, QLabel, QSpinBox, QLineEdit, QGridLayout, QMessageBox, QAction, QInputDialog)
 from PyQt5.QtGui import QIcon
-from PyQt5.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from PyQt5.QtCore import QTimer
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
 import pandas as pd
 from adf_test import perform_adf_test
-from sarimax import optimize_sarimax_models, forecast_future as forecast_future_sarimax
-from arima import optimize_arima_models, forecast_future as forecast_future_arima
-from plotting import plot_data, plot_data_stacked_bar, plot_historical_data, plot_historical_data_bar
+from sarimax import optimize_sarimax_models, forecast_future as forecast_future_sarimax, get_model_summary as get_sarimax_summary, prepare_exog_data
+from arima import optimize_arima_models, forecast_future as forecast_future_arima, get_model_summary as get_arima_summary
+from ar_ols import optimize_ar_ols_models, forecast_future as forecast_future_ar_ols, get_model_summary as get_ar_ols_summary
+from ets import optimize_ets_models, forecast_future as forecast_future_ets, get_model_summary as get_ets_summary
+from backtest import backtest_models
+from simulation import simulate_future
+from batch import run_batch_forecast
+from scenario import convert_to_original_format, run_scenario_sweep, build_comparison_table, plot_comparison
+from export import export_figures, build_save_frame, write_frame, iter_all_forecasts, stream_frames
+from plotting import plot_data, plot_data_stacked_bar, plot_historical_data, plot_historical_data_bar, clear_historical_cache, plot_confidence_intervals, decimal_years
 from side_panel import SidePanelWindow
 from group_panel import GroupPanelWindow
 from save_panel import SavePanel
+from results_panel import ResultsPanel
+from batch_panel import BatchPanel
+from search_list import SearchListView
+from registry import ForecastRegistry
+from pipeline import Pipeline
+from versions import ForecastHistory
+from session import save_session, load_session
+from prescreen import screen_series, split_screened
+from executor import QueueBackend, parse_address
 from about import AboutWindow
 
 class MainWindow(QMainWindow):
@@ -35,8 +51,14 @@ class MainWindow(QMainWindow):
         Dictionary to hold SARIMAX model results.
     arima_results : dict
         Dictionary to hold ARIMA model results.
-    forecast_results : dict
-        Dictionary to hold forecast results.
+    ar_ols_results : dict
+        Dictionary to hold AR-OLS model results.
+    ets_results : dict
+        Dictionary to hold ETS model results.
+    forecast_results : ForecastRegistry
+        Registry of the forecast results, indexed by country, variable, model, order and horizon.
+    forecast_history : ForecastHistory
+        Undo and redo history of the corrections of the forecast results.
     sidePanelWindow : SidePanelWindow
         Instance of the side panel window.
     forecast_until_year : int
@@ -47,8 +69,29 @@ class MainWindow(QMainWindow):
         List of active lines for plotting.
     save_panel : SavePanel
         Instance of the save panel.
+    lean_results : bool
+        Flag to keep only parameters and fit statistics of the fitted models.
+    batched_scoring : bool
+        Flag to score the ARIMA orders of all selected countries at once with the batched Kalman filter.
+    auto_differencing : bool
+        Flag to select the SARIMAX differencing orders with unit-root tests instead of searching them.
+    results_panel : ResultsPanel
+        Instance of the results panel showing the model summaries.
+    batch_panel : BatchPanel
+        Instance of the batch forecast panel.
+    exog_data : pandas.DataFrame
+        Annual exogenous data used as regressors by the SARIMAX models.
+    backend : QueueBackend
+        Task broker backend of the SARIMAX grid searches, None to fit in this process.
+    plotted_forecasts : tuple
+        Axis and forecast keys of the forecast line plot on the canvas, None if there is none.
+    pipeline : Pipeline
+        Cached data, fit and forecast stages of the model runs, so only the stages whose inputs changed run again.
     """
     
+    console_max_blocks = 5000
+    search_debounce_ms = 150
+    
     def __init__(self):
         """
         Initializes the MainWindow instance.
@@ -68,7 +111,8 @@ class MainWindow(QMainWindow):
 
         This method configures the main window's title, size, and icon,
         and initializes various widgets including search bars, lists,
-        combo boxes, spin boxes, buttons, text edit, and a matplotlib canvas.
+        combo boxes, spin boxes, buttons, text edit, and a matplotlib canvas with its
+        zoom and pan toolbar.
         """
         self.setWindowTitle("Forecasting")
         self.setGeometry(100, 100, 1100, 900)
@@ -85,9 +129,10 @@ class MainWindow(QMainWindow):
         self.country_search = QLineEdit()
         self.country_search.setPlaceholderText("Search country...")
         layout.addWidget(self.country_search, 1, 0, 1, 4)
-        self.country_search.textChanged.connect(self.filter_country_list)
+        self.country_search_timer = self.create_search_timer(self.filter_country_list)
+        self.country_search.textChanged.connect(self.country_search_timer.start)
 
-        self.country_list = QListWidget()
+        self.country_list = SearchListView()
         layout.addWidget(self.country_list, 2, 0, 1, 4)
 
         self.variable_combo = QComboBox()
@@ -96,9 +141,10 @@ class MainWindow(QMainWindow):
         self.forecasted_country_search = QLineEdit()
         self.forecasted_country_search.setPlaceholderText("Search forecast country...")
         layout.addWidget(self.forecasted_country_search, 1, 6, 1, 4)
-        self.forecasted_country_search.textChanged.connect(self.filter_forecasted_country_list)
+        self.forecasted_country_search_timer = self.create_search_timer(self.filter_forecasted_country_list)
+        self.forecasted_country_search.textChanged.connect(self.forecasted_country_search_timer.start)
 
-        self.forecasted_country_list = QListWidget()
+        self.forecasted_country_list = SearchListView()
         layout.addWidget(self.forecasted_country_list, 2, 6, 1, 4)
 
         self.start_year_label = QLabel("Start Year:")
@@ -131,10 +177,13 @@ class MainWindow(QMainWindow):
 
         self.console = QTextEdit()
         self.console.setReadOnly(True)
+        self.console.document().setMaximumBlockCount(self.console_max_blocks)
         layout.addWidget(self.console, 5, 0, 1, 10)
 
         self.canvas = FigureCanvas(Figure())
         layout.addWidget(self.canvas, 6, 0, 1, 10)
+        self.navigation_toolbar = NavigationToolbar(self.canvas, self)
+        layout.addWidget(self.navigation_toolbar, 7, 0, 1, 10)
 
     def create_button(self, text, callback, layout, row, col, size=(30, 30)):
         """
@@ -188,10 +237,31 @@ class MainWindow(QMainWindow):
         save_action.triggered.connect(self.show_save_panel)
         save_plot_action = QAction('Save Plot...', self)
         save_plot_action.triggered.connect(self.download_plot)
+        load_exog_action = QAction('Open Exogenous Data...', self)
+        load_exog_action.triggered.connect(self.load_exog_file)
+        clear_exog_action = QAction('Clear Exogenous Data', self)
+        clear_exog_action.triggered.connect(self.clear_exog_data)
         file_menu.addAction(load_action)
+        file_menu.addAction(load_exog_action)
+        file_menu.addAction(clear_exog_action)
         file_menu.addAction(save_action)
         file_menu.addAction(save_plot_action)
 
+        export_figures_action = QAction('Export Report Figures...', self)
+        export_figures_action.triggered.connect(self.export_report_figures)
+        file_menu.addAction(export_figures_action)
+
+        scenario_sweep_action = QAction('Run Scenario Sweep...', self)
+        scenario_sweep_action.triggered.connect(self.run_scenario_sweep)
+        file_menu.addAction(scenario_sweep_action)
+
+        save_session_action = QAction('Save Session...', self)
+        save_session_action.triggered.connect(self.save_session)
+        open_session_action = QAction('Open Session...', self)
+        open_session_action.triggered.connect(self.open_session)
+        file_menu.addAction(save_session_action)
+        file_menu.addAction(open_session_action)
+
         group_action = QAction('Group Country`s', self)
         group_action.triggered.connect(self.group_countries)
         clear_console_action = QAction('Clear Console', self)
@@ -202,14 +272,61 @@ class MainWindow(QMainWindow):
         edit_menu.addAction(clear_console_action)
         edit_menu.addAction(clear_forecasts_action)
 
+        undo_correction_action = QAction('Undo Correction', self)
+        undo_correction_action.setShortcut('Ctrl+Z')
+        undo_correction_action.triggered.connect(self.undo_correction)
+        redo_correction_action = QAction('Redo Correction', self)
+        redo_correction_action.setShortcut('Ctrl+Y')
+        redo_correction_action.triggered.connect(self.redo_correction)
+        correction_diff_action = QAction('Show Correction Diff', self)
+        correction_diff_action.triggered.connect(self.show_correction_diff)
+        edit_menu.addAction(undo_correction_action)
+        edit_menu.addAction(redo_correction_action)
+        edit_menu.addAction(correction_diff_action)
+
         toggle_side_panel_action = QAction('Open Forecast Panel', self)
         toggle_side_panel_action.triggered.connect(self.toggleSidePanel)
         window_menu.addAction(toggle_side_panel_action)
 
+        results_panel_action = QAction('Open Results Panel', self)
+        results_panel_action.triggered.connect(self.show_results_panel)
+        window_menu.addAction(results_panel_action)
+
+        batch_panel_action = QAction('Open Batch Forecast Panel', self)
+        batch_panel_action.triggered.connect(self.show_batch_panel)
+        window_menu.addAction(batch_panel_action)
+
         adf_test_action = QAction('ADF Test', self)
         adf_test_action.triggered.connect(self.run_adf_test)
         tools_menu.addAction(adf_test_action)
 
+        backtest_action = QAction('Backtest', self)
+        backtest_action.triggered.connect(self.run_backtest)
+        tools_menu.addAction(backtest_action)
+
+        simulation_action = QAction('Simulate Forecast Paths...', self)
+        simulation_action.triggered.connect(self.run_simulation)
+        tools_menu.addAction(simulation_action)
+
+        task_broker_action = QAction('Task Broker...', self)
+        task_broker_action.triggered.connect(self.set_task_broker)
+        tools_menu.addAction(task_broker_action)
+
+        self.lean_results_action = QAction('Lean Results', self)
+        self.lean_results_action.setCheckable(True)
+        self.lean_results_action.toggled.connect(self.toggle_lean_results)
+        tools_menu.addAction(self.lean_results_action)
+
+        self.batched_scoring_action = QAction('Batched ARIMA Scoring', self)
+        self.batched_scoring_action.setCheckable(True)
+        self.batched_scoring_action.toggled.connect(self.toggle_batched_scoring)
+        tools_menu.addAction(self.batched_scoring_action)
+
+        self.auto_differencing_action = QAction('Automatic Differencing', self)
+        self.auto_differencing_action.setCheckable(True)
+        self.auto_differencing_action.toggled.connect(self.toggle_auto_differencing)
+        tools_menu.addAction(self.auto_differencing_action)
+
         about_action = QAction('About', self)
         about_action.triggered.connect(self.show_about)
         help_menu.addAction(about_action)
@@ -251,12 +368,116 @@ class MainWindow(QMainWindow):
         self.filtered_data = None
         self.sarimax_results = None
         self.arima_results = None
-        self.forecast_results = {}
+        self.ar_ols_results = None
+        self.ets_results = None
+        self.forecast_results = ForecastRegistry()
+        self.forecast_history = ForecastHistory(self.forecast_results)
         self.sidePanelWindow = None
         self.forecast_until_year = 2100
         self.replace_negative_forecast = False
         self.active_lines = []  
         self.save_panel = SavePanel(self)
+        self.results_panel = ResultsPanel(self)
+        self.batch_panel = BatchPanel(self)
+        self.lean_results = False
+        self.batched_scoring = False
+        self.auto_differencing = False
+        self.exog_data = None
+        self.backend = None
+        self.plotted_forecasts = None
+        self.pipeline = Pipeline()
+
+    def set_task_broker(self):
+        """
+        Sets the task broker used by the SARIMAX grid searches.
+
+        This method asks for the host:port and secret key of a broker started with
+        "python Executor.py broker host:port --authkey KEY" and served by
+        "python Executor.py worker host:port --authkey KEY" on any number of machines.
+        An empty address fits the models in this process again.
+        """
+        address, ok = QInputDialog.getText(self, "Task Broker", "Broker address (host:port, empty for local fitting):")
+        if not ok:
+            return
+        if not address.strip():
+            self.backend = None
+            self.console.append("SARIMAX models are fitted locally.")
+            return
+
+        authkey, ok = QInputDialog.getText(self, "Task Broker", "Broker key:", QLineEdit.Password)
+        if not ok:
+            return
+        if not authkey:
+            self.console.append("A broker key is required.")
+            return
+        try:
+            self.backend = QueueBackend(parse_address(address.strip()), authkey.encode())
+        except ValueError:
+            self.console.append(f"Invalid broker address: {address}")
+            return
+        self.console.append(f"SARIMAX models are fitted by the workers of {address.strip()}.")
+
+    def show_fit_progress(self, finished, total):
+        """
+        Shows the progress of a distributed grid search.
+
+        Parameters
+        ----------
+        finished : int
+            Number of finished fits.
+        total : int
+            Total number of fits.
+
+        This method shows the number of finished fits in the status bar.
+        """
+        self.statusBar().showMessage(f"{finished}/{total} fits finished")
+        QApplication.processEvents()
+
+    def toggle_lean_results(self, checked):
+        """
+        Enables or disables the lean results mode.
+
+        Parameters
+        ----------
+        checked : bool
+            Whether the lean results mode is enabled.
+
+        In lean mode the model optimizers keep only the parameter vector, order and fit
+        statistics of each model, and results objects are rebuilt when needed.
+        """
+        self.lean_results = checked
+        self.console.append(f"Lean results {'enabled' if checked else 'disabled'}.")
+
+    def toggle_batched_scoring(self, checked):
+        """
+        Enables or disables the batched scoring of ARIMA orders.
+
+        Parameters
+        ----------
+        checked : bool
+            Whether the batched scoring is enabled.
+
+        With batched scoring the log-likelihood of every order is maximized for all selected
+        countries at once with a vectorised Kalman filter, and only the winning order of each
+        country is fitted with statsmodels.
+        """
+        self.batched_scoring = checked
+        self.console.append(f"Batched ARIMA scoring {'enabled' if checked else 'disabled'}.")
+
+    def toggle_auto_differencing(self, checked):
+        """
+        Enables or disables the automatic selection of the SARIMAX differencing orders.
+
+        Parameters
+        ----------
+        checked : bool
+            Whether the automatic differencing is enabled.
+
+        With automatic differencing, d and D are selected once per country by ADF and KPSS
+        tests and the seasonal strength, and only those orders are searched.
+        """
+        self.auto_differencing = checked
+        self.console.append(f"Automatic differencing {'enabled' if checked else 'disabled'}.")
     
     def show_save_panel(self):
         """
@@ -265,6 +486,22 @@ class MainWindow(QMainWindow):
         This method shows the save panel for saving data.
         """
         self.save_panel.show()
+
+    def show_results_panel(self):
+        """
+        Displays the results panel.
+
+        This method shows the results panel listing the fitted models.
+        """
+        self.results_panel.show()
+
+    def show_batch_panel(self):
+        """
+        Displays the batch forecast panel.
+
+        This method shows the panel to forecast several variables at once.
+        """
+        self.batch_panel.show()
         
     def add_line(self, name, value, color, line_type, axis):
         """
@@ -304,12 +541,116 @@ class MainWindow(QMainWindow):
         event : QCloseEvent
             The close event.
 
-        This method closes the side panel window if it is open and accepts the event.
+        This method offers to save the session when data is loaded, closes the side panel
+        window if it is open and accepts the event.
         """
+        if self.df is not None:
+            reply = QMessageBox.question(self, 'Save Session', 'Do you want to save the session before closing?', QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel, QMessageBox.No)
+            if reply == QMessageBox.Cancel or (reply == QMessageBox.Yes and not self.save_session()):
+                event.ignore()
+                return
+
         if self.sidePanelWindow and self.sidePanelWindow.isVisible():
             self.sidePanelWindow.close()
         event.accept()
 
+    def save_session(self):
+        """
+        Saves the current session to a directory.
+
+        Returns
+        -------
+        bool
+            True if the session was saved, False otherwise.
+
+        This method opens a QFileDialog to select a session directory and saves the dataset,
+        the exogenous data, the fitted model parameters, the forecasts with their corrections,
+        the plot lines and the current settings to it.
+        """
+        session_dir = QFileDialog.getExistingDirectory(self, "Select Session Directory", self.extracted_dataset_dir)
+        if not session_dir:
+            return False
+
+        settings = {
+            'start_year': self.start_year_spin.value(),
+            'end_year': self.end_year_spin.value(),
+            'variable': self.variable_combo.currentText(),
+            'forecast_until_year': self.forecast_until_year,
+            'replace_negative_forecast': self.replace_negative_forecast,
+            'lean_results': self.lean_results,
+            'batched_scoring': self.batched_scoring,
+            'auto_differencing': self.auto_differencing
+        }
+        try:
+            save_session(session_dir, self.df, self.forecast_results, {'SARIMAX': self.sarimax_results, 'ARIMA': self.arima_results, 'AR-OLS': self.ar_ols_results,
+                                                                        'ETS': self.ets_results},
+                         self.exog_data, self.active_lines, settings)
+        except Exception as e:
+            self.console.append(f"Error saving session: {e}")
+            return False
+
+        self.console.append(f"Session saved to {session_dir}")
+        return True
+
+    def open_session(self):
+        """
+        Opens a session saved with save_session.
+
+        This method opens a QFileDialog to select a session directory and restores the dataset,
+        models, forecasts, plot lines and settings from it. The arrays are memory-mapped and
+        the models are not refitted.
+        """
+        session_dir = QFileDialog.getExistingDirectory(self, "Select Session Directory", self.extracted_dataset_dir)
+        if not session_dir:
+            return
+
+        try:
+            session = load_session(session_dir)
+        except Exception as e:
+            self.console.append(f"Error opening session: {e}")
+            return
+
+        self.df = session['df']
+        clear_historical_cache()
+        self.pipeline.clear()
+        self.exog_data = session['exog_data']
+        self.sarimax_results = session['model_results'].get('SARIMAX') or None
+        self.arima_results = session['model_results'].get('ARIMA') or None
+        self.ar_ols_results = session['model_results'].get('AR-OLS') or None
+        self.ets_results = session['model_results'].get('ETS') or None
+        self.forecast_results = session['forecast_results']
+        self.forecast_history = ForecastHistory(self.forecast_results)
+        self.active_lines = session['active_lines']
+
+        settings = session['settings']
+        self.forecast_until_year = settings.get('forecast_until_year', self.forecast_until_year)
+        self.replace_negative_forecast = settings.get('replace_negative_forecast', self.replace_negative_forecast)
+        self.lean_results_action.setChecked(settings.get('lean_results', self.lean_results))
+        self.batched_scoring_action.setChecked(settings.get('batched_scoring', self.batched_scoring))
+        self.auto_differencing_action.setChecked(settings.get('auto_differencing', self.auto_differencing))
+
+        self.update_combos()
+        if 'variable' in settings:
+            self.variable_combo.setCurrentText(settings['variable'])
+        if 'start_year' in settings:
+            self.start_year_spin.setValue(settings['start_year'])
+            self.end_year_spin.setValue(settings['end_year'])
+        self.update_forecasted_countries_list()
+
+        self.results_panel.clear_results()
+        if self.sarimax_results:
+            self.results_panel.add_results(self.sarimax_results, "SARIMAX", get_sarimax_summary)
+        if self.arima_results:
+            self.results_panel.add_results(self.arima_results, "ARIMA", get_arima_summary)
+        if self.ar_ols_results:
+            self.results_panel.add_results(self.ar_ols_results, "AR-OLS", get_ar_ols_summary)
+        if self.ets_results:
+            self.results_panel.add_results(self.ets_results, "ETS", get_ets_summary)
+        if self.sidePanelWindow:
+            self.sidePanelWindow.update_line_list()
+
+        self.console.append(f"Session {session_dir} opened with {len(self.forecast_results)} forecasts.")
+
     def load_file(self):
         """
         Opens a file dialog to load a CSV file.
@@ -348,6 +689,37 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.console.append(f"Error loading file: {e}")
 
+    def load_exog_file(self):
+        """
+        Opens a file dialog to load exogenous data for the SARIMAX models.
+
+        This method loads a CSV file in either format (e.g. World_ElectricityDemand.csv or the daily
+        Demand.csv), aggregates it to yearly values and keeps it as the SARIMAX regressors.
+        """
+        options = QFileDialog.Options()
+        file_name, _ = QFileDialog.getOpenFileName(self, "Load Exogenous CSV File", self.dataset_dir, "CSV Files (*.csv);;All Files (*)", options=options)
+        if not file_name:
+            return
+
+        try:
+            exog_df = pd.read_csv(file_name)
+            if 'Variable' in exog_df.columns:
+                exog_df = self.convert_new_format_to_original(exog_df)
+            self.exog_data = prepare_exog_data(exog_df.dropna())
+            exog_columns = [col for col in self.exog_data.columns if col != 'Country']
+            self.console.append(f"Exogenous data {file_name} loaded: {', '.join(exog_columns)}.")
+        except Exception as e:
+            self.console.append(f"Error loading exogenous data: {e}")
+
+    def clear_exog_data(self):
+        """
+        Clears the exogenous data.
+
+        This method removes the regressors so that SARIMAX models are fitted without exogenous data.
+        """
+        self.exog_data = None
+        self.console.append("Exogenous data cleared.")
+
     def convert_new_format_to_original(self, new_df):
         """
         Converts new format DataFrame to original format.
@@ -364,10 +736,7 @@ class MainWindow(QMainWindow):
 
         This method converts a DataFrame from the new format to the original format expected by the application.
         """
-        melted_df = new_df.melt(id_vars=['Date', 'Variable'], var_name='Country', value_name='Value')
-        variable_name = melted_df['Variable'].iloc[0]
-        melted_df = melted_df.rename(columns={'Value': variable_name}).drop(columns=['Variable'])
-        return melted_df
+        return convert_to_original_format(new_df)
 
     def merge_or_replace_dataframe(self, new_format_df):
         """
@@ -389,6 +758,8 @@ class MainWindow(QMainWindow):
                 self.df = new_format_df
         else:
             self.df = new_format_df
+        clear_historical_cache()
+        self.pipeline.clear()
 
     def update_combos(self):
         """
@@ -396,11 +767,12 @@ class MainWindow(QMainWindow):
 
         This method populates the country list, variable combo box,
         and sets the range for the year spin boxes based on the DataFrame.
+        Dates that are not years, such as daily dates, are ranged by their year.
         """
         if self.df is not None:
             self.populate_country_list(self.df['Country'].unique().tolist())
             self.populate_variable_combo([col for col in self.df.columns if col not in ['Country', 'Date']])
-            self.set_year_range(self.df['Date'].unique())
+            self.set_year_range(decimal_years(self.df['Date'].unique()) // 1)
 
     def populate_country_list(self, countries):
         """
@@ -414,15 +786,9 @@ class MainWindow(QMainWindow):
         This method clears the existing items in the country list widget
         and adds new items for each country in the provided list.
         """
-        self.country_list.clear()
+        self.country_list.set_items(countries)
         self.forecasted_country_list.clear()
 
-        for country in countries:
-            country_item = QListWidgetItem(country)
-            country_item.setFlags(country_item.flags() | Qt.ItemIsUserCheckable)
-            country_item.setCheckState(Qt.Unchecked)
-            self.country_list.addItem(country_item)
-
     def populate_variable_combo(self, variables):
         """
         Populates the variable combo box.
@@ -437,6 +803,7 @@ class MainWindow(QMainWindow):
         """
         self.variable_combo.clear()
         self.variable_combo.addItems(variables)
+        self.batch_panel.populate_variables(variables)
 
     def set_year_range(self, years):
         """
@@ -520,6 +887,7 @@ class MainWindow(QMainWindow):
         group_data = self.aggregate_group_data(selected_countries, start_year, end_year, group_name)
 
         self.df = pd.concat([self.df, group_data], ignore_index=True)
+        clear_historical_cache()
         self.update_combos()
         self.console.append(f"Group '{group_name}' created and added to the dataset.")
         self.country_search.setPlaceholderText("Search country...")
@@ -582,6 +950,7 @@ class MainWindow(QMainWindow):
             self.console.append("Please select at least one country.")
             return
 
+        selected_countries = self.screen_countries(selected_countries, variable)
         self.adf_results = pd.DataFrame(columns=['Country', 'Variable', 'ADF Statistic', 'p-value', 'Num Lags', 'Num Observations', '1%', '5%', '10%', 'Stationary', 'Error'])
 
         for country in selected_countries:
@@ -600,6 +969,136 @@ class MainWindow(QMainWindow):
         self.console.append("<hr style='border: 1px solid black;'>")
         self.console.append(self.format_adf_results(self.adf_results))
 
+    def get_model_settings(self):
+        """
+        Gets the model and settings of the backtest, batch and scenario jobs.
+
+        Returns
+        -------
+        tuple
+            Model name ("SARIMAX" or "ARIMA") and settings dict with the p, d and q ranges, the
+            seasonal period and seasonality flag, the year range and the forecast settings.
+
+        This method reads the model and ranges of the side panel, or uses ARIMA with the default
+        ranges and a detected seasonal period if the side panel is closed.
+        """
+        model_name = "ARIMA"
+        settings = {
+            'p_range': range(0, 2),
+            'd_range': range(0, 2),
+            'q_range': range(0, 2),
+            'seasonal_period': None,
+            'enable_seasonality': True,
+            'start_year': self.start_year_spin.value(),
+            'end_year': self.end_year_spin.value(),
+            'forecast_until_year': self.forecast_until_year,
+            'replace_negative_forecast': self.replace_negative_forecast,
+            'auto_differencing': self.auto_differencing
+        }
+        if self.sidePanelWindow:
+            panel = self.sidePanelWindow
+            model_name = panel.model_combo.currentText() if panel.model_combo.currentText() in ["SARIMAX", "ARIMA"] else "ARIMA"
+            settings['p_range'] = panel.get_range(panel.p_range_input.text(), [0, 2])
+            settings['d_range'] = panel.get_range(panel.d_range_input.text(), [0, 2])
+            settings['q_range'] = panel.get_range(panel.q_range_input.text(), [0, 2])
+            settings['seasonal_period'] = panel.get_seasonal_period()
+            settings['enable_seasonality'] = panel.enable_seasonality_checkbox.isChecked()
+        return model_name, settings
+
+    def run_backtest(self):
+        """
+        Runs a rolling-origin backtest on the selected data.
+
+        This method evaluates every candidate order of the model selected in the side panel
+        (ARIMA with the default ranges if the side panel is closed), the same (order, seasonal
+        order) candidates as the grid search for SARIMAX, over expanding windows of the selected
+        countries, variable and year range, and appends the MAE, MAPE and RMSE of each country
+        and candidate to the console.
+        """
+        if self.df is None:
+            self.console.append("You must first load a CSV file.")
+            return
+
+        selected_countries = self.get_selected_countries(self.country_list)
+        if not selected_countries:
+            self.console.append("Please select at least one country.")
+            return
+
+        variable = self.variable_combo.currentText()
+        selected_countries = self.screen_countries(selected_countries, variable)
+        if not selected_countries:
+            return
+
+        model_name, settings = self.get_model_settings()
+        backtest_results = backtest_models(self.df, selected_countries, variable, model_name, settings['p_range'], settings['d_range'], settings['q_range'],
+                                           settings['seasonal_period'], settings['enable_seasonality'], settings['start_year'], settings['end_year'])
+        self.console.append("<hr style='border: 1px solid black;'>")
+        self.console.append(f"<b>{model_name} backtest results:</b>")
+        self.console.append(backtest_results.to_html(index=False, na_rep=''))
+
+    def run_simulation(self):
+        """
+        Simulates future paths of the models behind the selected forecasts.
+
+        This method asks for the number of paths and optional exceedance thresholds, simulates
+        the paths of every selected forecast (all forecasts if none is selected) from its fitted
+        model, stores the float32 quantile bands and exceedance probabilities in the forecast
+        under 'simulation' and appends their values in the last forecast year to the console.
+        """
+        if self.df is None or not self.forecast_results:
+            self.console.append("You must first run a model.")
+            return
+
+        forecast_keys = self.get_selected_countries(self.forecasted_country_list) or list(self.forecast_results.keys())
+        n_paths, ok = QInputDialog.getInt(self, "Simulate Forecast Paths", "Number of paths:", 1000, 100, 100000, 100)
+        if not ok:
+            return
+        thresholds_text, ok = QInputDialog.getText(self, "Simulate Forecast Paths", "Exceedance thresholds (comma separated, optional):")
+        if not ok:
+            return
+        try:
+            thresholds = [float(value) for value in thresholds_text.split(',') if value.strip()]
+        except ValueError:
+            self.console.append(f"Invalid thresholds: {thresholds_text}")
+            return
+
+        model_results = {'SARX': self.sarimax_results, 'AR': self.arima_results, 'AROLS': self.ar_ols_results, 'ETS': self.ets_results}
+        groups = {}
+        for forecast_key in forecast_keys:
+            forecast = self.forecast_results[forecast_key]
+            result = (model_results.get(forecast['model']) or {}).get(forecast['country'])
+            if result is None or 'error' in result or result.get('variable') != forecast['variable'] or tuple(result['order']) != tuple(forecast['order']):
+                self.console.append(f"No fitted model found for {forecast_key}, run the model again to simulate it.")
+                continue
+            groups.setdefault((forecast['model'], forecast['forecast_until_year']), {})[forecast['country']] = (forecast_key, result)
+
+        rows = []
+        for (model, forecast_until_year), entries in groups.items():
+            try:
+                simulations = simulate_future(model, {country: result for country, (_, result) in entries.items()}, self.df, self.start_year_spin.value(),
+                                              forecast_until_year, n_paths, thresholds=thresholds, replace_negative_forecast=self.replace_negative_forecast,
+                                              exog_data=self.exog_data)
+            except ValueError as e:
+                self.console.append(f"Simulation failed: {e}")
+                continue
+            for country, (forecast_key, _) in entries.items():
+                if country not in simulations:
+                    continue
+                if 'error' in simulations[country]:
+                    self.console.append(f"Simulation failed for {forecast_key}: {simulations[country]['error']}")
+                    continue
+                simulation = simulations[country]
+                self.forecast_results[forecast_key]['simulation'] = simulation
+                row = {'Forecast': forecast_key, 'Year': int(simulation['years'][-1]), 'Mean': simulation['mean'][-1]}
+                row.update({f"P{100 * quantile:g}": band[-1] for quantile, band in zip(simulation['quantiles'], simulation['bands'])})
+                row.update({f"P(> {threshold:g})": probability[-1] for threshold, probability in zip(simulation['thresholds'], simulation['exceedance'])})
+                rows.append(row)
+
+        if rows:
+            self.console.append("<hr style='border: 1px solid black;'>")
+            self.console.append(f"<b>Simulated forecast distribution ({n_paths} paths):</b>")
+            self.console.append(pd.DataFrame(rows).to_html(index=False, float_format=lambda value: f"{value:.3f}"))
+
     def run_sarimax(self, p_range=None, d_range=None, q_range=None, seasonal_period=None, enable_seasonality=True):
         """
         Runs the SARIMAX model optimization.
@@ -613,7 +1112,7 @@ class MainWindow(QMainWindow):
         q_range : range, optional
             Range of values for the q parameter (default is range(0, 2)).
         seasonal_period : int, optional
-            Seasonal period for the SARIMAX model (default is 11).
+            Seasonal period for the SARIMAX model (default is None, detecting the period of each country).
         enable_seasonality : bool, optional
             Flag to enable or disable seasonality (default is True).
 
@@ -623,18 +1122,31 @@ class MainWindow(QMainWindow):
         p_range = p_range if p_range is not None else range(0, 2)
         d_range = d_range if d_range is not None else range(0, 2)
         q_range = q_range if q_range is not None else range(0, 2)
-        seasonal_period = seasonal_period if seasonal_period is not None else 11
 
-        selected_countries = self.get_selected_countries(self.country_list)
+        variable = self.variable_combo.currentText()
+        selected_countries = self.screen_countries(self.get_selected_countries(self.country_list), variable)
         start_year = self.start_year_spin.value()
         end_year = self.end_year_spin.value()
+        settings = (end_year, p_range, d_range, q_range, seasonal_period, enable_seasonality, self.lean_results, self.auto_differencing, self.exog_data)
+
+        def optimize(countries):
+            model_variables = pd.DataFrame({'Country': countries, 'Variable': variable})
+            return optimize_sarimax_models(model_variables, self.df, countries, p_range, d_range, q_range, seasonal_period, start_year, end_year, enable_seasonality,
+                                           self.lean_results, self.exog_data, self.backend, self.show_fit_progress, self.auto_differencing)
 
-        sarimax_results = optimize_sarimax_models(self.df, selected_countries, p_range, d_range, q_range, seasonal_period, start_year, end_year, enable_seasonality)
+        def forecast(results):
+            return forecast_future_sarimax(results, self.df, start_year, self.forecast_until_year, self.replace_negative_forecast, self.exog_data)
+
+        try:
+            sarimax_results, forecast_results = self.run_model_stages("SARIMAX", selected_countries, variable, settings, optimize, forecast)
+        except (OSError, RuntimeError) as e:
+            self.console.append(f"Distributed fitting failed: {e}")
+            return
         self.console.append("<hr style='border: 1px solid black;'>")
         self.console.append(self.format_sarimax_results(sarimax_results))
+        self.sarimax_results = {**(self.sarimax_results or {}), **sarimax_results}
 
-        forecast_results = forecast_future_sarimax(sarimax_results, self.df, start_year, self.forecast_until_year, self.replace_negative_forecast)
-        self.forecast_results.update(forecast_results)
+        self.forecast_results.update_forecasts(forecast_results)
 
         self.apply_forecast_corrections()
         self.update_forecasted_countries_list()
@@ -659,20 +1171,248 @@ class MainWindow(QMainWindow):
         d_range = d_range if d_range is not None else range(0, 2)
         q_range = q_range if q_range is not None else range(0, 2)
 
-        selected_countries = self.get_selected_countries(self.country_list)
         start_year = self.start_year_spin.value()
         end_year = self.end_year_spin.value()
 
-        arima_results = optimize_arima_models(self.df, selected_countries, p_range, d_range, q_range, start_year, end_year)
+        variable = self.variable_combo.currentText()
+        selected_countries = self.screen_countries(self.get_selected_countries(self.country_list), variable)
+
+        arima_results, forecast_results = self.run_model_stages(
+            "ARIMA", selected_countries, variable, (end_year, p_range, d_range, q_range, self.lean_results, self.batched_scoring),
+            lambda countries: optimize_arima_models(self.df, countries, variable, p_range, d_range, q_range, start_year, end_year, self.lean_results, self.batched_scoring),
+            lambda results: (forecast_future_arima(results, self.df, start_year, self.forecast_until_year, self.replace_negative_forecast), {}))
         self.console.append("<hr style='border: 1px solid black;'>")
         self.console.append(self.format_arima_results(arima_results))
+        self.arima_results = {**(self.arima_results or {}), **arima_results}
+
+        self.forecast_results.update_forecasts(forecast_results)
+
+        self.apply_forecast_corrections()
+        self.update_forecasted_countries_list()
+
+    def run_ar_ols(self, p_range=None):
+        """
+        Runs the AR-OLS model fitting.
+
+        Parameters
+        ----------
+        p_range : list, optional
+            Candidate numbers of lags (default is [0, 2]).
+
+        This method fits autoregressions by least squares to all selected countries at once,
+        selects the number of lags of each country by AIC, and updates the forecast results.
+        """
+        p_range = p_range if p_range is not None else [0, 2]
+
+        start_year = self.start_year_spin.value()
+        end_year = self.end_year_spin.value()
+
+        variable = self.variable_combo.currentText()
+        selected_countries = self.screen_countries(self.get_selected_countries(self.country_list), variable)
+
+        ar_ols_results, forecast_results = self.run_model_stages(
+            "AR-OLS", selected_countries, variable, (end_year, p_range),
+            lambda countries: optimize_ar_ols_models(self.df, countries, variable, p_range, start_year, end_year),
+            lambda results: (forecast_future_ar_ols(results, self.df, start_year, self.forecast_until_year, self.replace_negative_forecast), {}))
+        self.console.append("<hr style='border: 1px solid black;'>")
+        self.console.append(self.format_model_results(ar_ols_results, "AR-OLS", get_ar_ols_summary))
+        self.ar_ols_results = {**(self.ar_ols_results or {}), **ar_ols_results}
+
+        self.forecast_results.update_forecasts(forecast_results)
+
+        self.apply_forecast_corrections()
+        self.update_forecasted_countries_list()
+
+    def run_ets(self, seasonal_period=None, enable_seasonality=True):
+        """
+        Runs the ETS model fitting.
+
+        Parameters
+        ----------
+        seasonal_period : int, optional
+            Seasonal period (default is None, detecting the period of each country).
+        enable_seasonality : bool, optional
+            Whether to try seasonal models (default is True).
+
+        This method fits additive exponential smoothing models to all selected countries at once,
+        selects the trend and seasonality of each country by AIC, and updates the forecast results.
+        """
+        start_year = self.start_year_spin.value()
+        end_year = self.end_year_spin.value()
+
+        variable = self.variable_combo.currentText()
+        selected_countries = self.screen_countries(self.get_selected_countries(self.country_list), variable)
 
-        forecast_results = forecast_future_arima(arima_results, self.df, start_year, self.forecast_until_year, self.replace_negative_forecast)
-        self.forecast_results.update(forecast_results)
+        ets_results, forecast_results = self.run_model_stages(
+            "ETS", selected_countries, variable, (end_year, seasonal_period, enable_seasonality),
+            lambda countries: optimize_ets_models(self.df, countries, variable, seasonal_period, start_year, end_year, enable_seasonality),
+            lambda results: (forecast_future_ets(results, self.df, start_year, self.forecast_until_year, self.replace_negative_forecast), {}))
+        self.console.append("<hr style='border: 1px solid black;'>")
+        self.console.append(self.format_model_results(ets_results, "ETS", get_ets_summary))
+        self.ets_results = {**(self.ets_results or {}), **ets_results}
+
+        self.forecast_results.update_forecasts(forecast_results)
 
         self.apply_forecast_corrections()
         self.update_forecasted_countries_list()
 
+    def run_model_stages(self, model_name, selected_countries, variable, settings, optimize, forecast):
+        """
+        Runs the data, fit and forecast stages of a model through the pipeline.
+
+        Parameters
+        ----------
+        model_name : str
+            Name of the model.
+        selected_countries : list of str
+            The countries to model.
+        variable : str
+            The variable to model.
+        settings : tuple
+            Inputs of the fit besides the data, such as the end year, orders and flags.
+        optimize : callable
+            Fits a list of countries, returning their results keyed by country.
+        forecast : callable
+            Forecasts model results keyed by country, returning forecast results keyed by forecast key
+            and the error message of each country whose forecast failed.
+
+        Returns
+        -------
+        tuple
+            Model results of the selected countries and their forecast results.
+
+        This method fingerprints the data of each country from the start year on, refits only
+        the countries whose data or fit settings changed, and forecasts again only the countries
+        whose fit, horizon or forecast settings changed. The forecasts are returned with copied
+        values, so corrections never reach the cached stages, and failed forecasts are reported
+        in the console.
+        """
+        start_year = self.start_year_spin.value()
+        subset = self.df[self.df['Country'].isin(selected_countries) & (self.df['Date'] >= start_year)]
+        country_data = {country: data[['Date', variable]].to_numpy(dtype=float) for country, data in subset.groupby('Country', sort=False)}
+
+        data_stages = {country: ('data', country, variable, start_year) for country in selected_countries}
+        for country, stage in data_stages.items():
+            self.pipeline.run(stage, lambda: None, (country_data.get(country, ()),))
+
+        fit_stages = {country: ('fit', model_name, country, variable) for country in selected_countries}
+        refitted = []
+
+        def fit(stages):
+            refitted.extend(stage[2] for stage in stages)
+            results = optimize([stage[2] for stage in stages])
+            return {fit_stages[country]: result for country, result in results.items()}
+
+        fitted = self.pipeline.run_many(list(fit_stages.values()), fit, settings, {fit_stages[country]: [data_stages[country]] for country in selected_countries})
+        model_results = {country: fitted[fit_stages[country]] for country in selected_countries if fitted[fit_stages[country]] is not None}
+
+        forecast_stages = {country: ('forecast', model_name, country, variable) for country in model_results if 'error' not in model_results[country]}
+
+        def forecast_stage(stages):
+            forecasts, errors = forecast({stage[2]: model_results[stage[2]] for stage in stages})
+            values = {forecast_stages[country]: {'error': error} for country, error in errors.items()}
+            values.update({forecast_stages[entry['country']]: {'forecast_key': forecast_key, 'forecast': entry} for forecast_key, entry in forecasts.items()})
+            return values
+
+        forecasts = self.pipeline.run_many(list(forecast_stages.values()), forecast_stage, (self.forecast_until_year, self.replace_negative_forecast),
+                                           {stage: [fit_stages[country]] for country, stage in forecast_stages.items()})
+        forecast_results = {}
+        for stage, value in forecasts.items():
+            if value is None:
+                continue
+            if 'error' in value:
+                self.console.append(f"{model_name} forecast failed for {stage[2]}: {value['error']}")
+            else:
+                forecast_results[value['forecast_key']] = {**value['forecast'], 'forecast_values': value['forecast']['forecast_values'].copy()}
+
+        if len(refitted) < len(selected_countries):
+            self.console.append(f"Reused {len(selected_countries) - len(refitted)} of {len(selected_countries)} fitted {model_name} models.")
+        return model_results, forecast_results
+
+    def run_batch(self, variables, models):
+        """
+        Runs a batch forecast over several variables and models.
+
+        Parameters
+        ----------
+        variables : list of str
+            The variables to forecast.
+        models : list of str
+            The models to apply (SARIMAX and/or ARIMA).
+
+        This method forecasts every variable of every selected country with every model in one job,
+        using the ranges of the side panel (or the defaults if it is closed), and adds the forecasts
+        to the forecast results.
+        """
+        if self.df is None:
+            self.console.append("You must first load a CSV file.")
+            return
+
+        selected_countries = self.get_selected_countries(self.country_list)
+        if not selected_countries:
+            self.console.append("Please select at least one country.")
+            return
+
+        _, settings = self.get_model_settings()
+
+        batch_results = run_batch_forecast(self.df, selected_countries, variables, models, settings)
+
+        failed = ""
+        for (country, variable, model_name), result in batch_results.items():
+            if 'error' in result:
+                failed += f"<b>Failed to model {country} - {variable} ({model_name}):</b> {result['error']}<br>"
+            else:
+                self.forecast_results.add(result['forecast_key'], result['forecast'])
+
+        self.console.append("<hr style='border: 1px solid black;'>")
+        self.console.append(f"Batch forecast finished: {len(batch_results)} combinations.<br>{failed}")
+        self.update_forecasted_countries_list()
+
+    def run_scenario_sweep(self):
+        """
+        Runs the same model over every scenario file of a directory.
+
+        This method opens a QFileDialog to select a directory of scenario CSV files and takes every
+        country checked in the country list (every country of each file except its aggregates if
+        none is checked). Countries keep the projections of their files after the end year, those
+        without one are modeled with the model and ranges of the side panel. The consolidated
+        comparison table and figure are saved to the extracted dataset and plot directories.
+        """
+        directory = QFileDialog.getExistingDirectory(self, "Select Scenario Directory", self.extracted_dataset_dir)
+        if not directory:
+            return
+
+        model_name, settings = self.get_model_settings()
+
+        selected_countries = self.get_selected_countries(self.country_list)
+        datasets, sweep_results = run_scenario_sweep(directory, model_name, settings, selected_countries or None)
+        if not datasets:
+            self.console.append(f"No scenario files found in {directory}.")
+            return
+
+        table = build_comparison_table(datasets, sweep_results, settings)
+        variable = next(iter(datasets.values()))[1]
+        table_path = os.path.join(self.extracted_dataset_dir, "Scenario_Sweep_Comparison.csv")
+        plot_path = os.path.join(self.plot_dir, "Scenario_Sweep_Comparison.png")
+        table.reset_index().to_csv(table_path, index=False)
+        plot_comparison(table, variable, plot_path)
+
+        failed = ""
+        for (scenario, country), result in sweep_results.items():
+            if 'error' in result:
+                failed += f"<b>Failed to model {country} in {scenario}:</b> {result['error']}<br>"
+        for scenario, (_, _, _, aggregates) in datasets.items():
+            if aggregates:
+                failed += f"<b>Aggregates left out of {scenario}:</b> {', '.join(aggregates)}<br>"
+
+        projected = sum(1 for result in sweep_results.values() if result.get('projected'))
+        forecast = sum(1 for result in sweep_results.values() if 'error' not in result and not result.get('projected'))
+        self.console.append("<hr style='border: 1px solid black;'>")
+        self.console.append(f"Scenario sweep finished for {len(datasets)} scenarios: {projected} series keep the projections of their files after "
+                            f"{settings['end_year']}, {forecast} are forecast with {model_name}.<br>{failed}")
+        self.console.append(f"Comparison table saved to {table_path}")
+        self.console.append(f"Comparison plot saved to {plot_path}")
+
     def apply_forecast_corrections(self):
         """
         Applies corrections to the forecast.
@@ -738,15 +1478,15 @@ class MainWindow(QMainWindow):
             Flag to apply start correction.
 
         This method adjusts the forecast data linearly to match the target value by the target year,
-        with optional parameters for continuous and short corrections.
+        with optional parameters for continuous and short corrections. The corrected values are
+        a new version in the forecast history, so the correction can be undone.
         """
         forecast_key = self.get_forecast_key(country)
         if not forecast_key:
             self.console.append(f"No forecast found for selected country: {country}")
             return
 
-        forecast_data = self.forecast_results[forecast_key]
-        forecast_values = forecast_data['forecast_values']
+        forecast_values = self.forecast_results[forecast_key]['forecast_values'].copy()
         forecast_years = forecast_values.index
 
         if target_year in forecast_years:
@@ -769,6 +1509,47 @@ class MainWindow(QMainWindow):
                             forecast_values.loc[year] = target_value
 
             forecast_values[forecast_values < 0] = 0
+            self.forecast_history.commit(forecast_key, forecast_values, f"{target_value:g} in {target_year}" + (f" from {start_target_year}" if start_target_year else ""))
+
+    def undo_correction(self):
+        """
+        Undoes the last forecast correction.
+
+        This method restores the forecast values and confidence interval before the last
+        correction that still applies to its forecast, without refitting the model.
+        """
+        version = self.forecast_history.undo()
+        if version is None:
+            self.console.append("No correction to undo.")
+            return
+        self.console.append(f"Undid correction of {version['key']} ({version['description']}).")
+
+    def redo_correction(self):
+        """
+        Redoes the last undone forecast correction.
+
+        This method applies the last undone correction again, without recomputing it.
+        """
+        version = self.forecast_history.redo()
+        if version is None:
+            self.console.append("No correction to redo.")
+            return
+        self.console.append(f"Redid correction of {version['key']} ({version['description']}).")
+
+    def show_correction_diff(self):
+        """
+        Shows the changes made by the last forecast correction.
+
+        This method appends the values before and after the last applied correction, and their
+        difference, for every year the correction changed.
+        """
+        version = self.forecast_history.last_version()
+        if version is None:
+            self.console.append("No correction to show.")
+            return
+        self.console.append("<hr style='border: 1px solid black;'>")
+        self.console.append(f"<b>Correction of {version['key']} ({version['description']}):</b>")
+        self.console.append(self.forecast_history.diff(version).to_html(index=False, float_format=lambda value: f"{value:.3f}"))
 
     def get_forecast_key(self, country):
         """
@@ -777,19 +1558,20 @@ class MainWindow(QMainWindow):
         Parameters
         ----------
         country : str
-            The name of the country.
+            The name of the country, or a forecast key.
 
         Returns
         -------
         str or None
             The forecast key if found, otherwise None.
 
-        This method searches the forecast results for the key corresponding to the given country.
+        This method returns the key itself when a forecast key is given, otherwise the first
+        forecast of the country found in the country index of the forecast registry.
         """
-        for key, value in self.forecast_results.items():
-            if country in key:
-                return key
-        return None
+        if country in self.forecast_results:
+            return country
+        keys = self.forecast_results.keys_for_country(country)
+        return keys[0] if keys else None
 
     def update_forecasted_countries_list(self):
         """
@@ -798,15 +1580,7 @@ class MainWindow(QMainWindow):
         This method clears the existing items in the forecasted country list
         and adds new items for each key in the forecast results.
         """
-        self.forecasted_country_list.clear()
-        forecasted_countries = list(self.forecast_results.keys())
-
-        for forecast_key in forecasted_countries:
-            forecasted_country_item = QListWidgetItem(forecast_key)
-            forecasted_country_item.setFlags(forecasted_country_item.flags() | Qt.ItemIsUserCheckable)
-            forecasted_country_item.setCheckState(Qt.Unchecked)
-            self.forecasted_country_list.addItem(forecasted_country_item)
-
+        self.forecasted_country_list.set_items(list(self.forecast_results.keys()))
         self.forecasted_country_search.clear()
         
     def plot_selected_data(self):
@@ -824,6 +1598,7 @@ class MainWindow(QMainWindow):
 
         self.canvas.figure.clear()
         ax = self.canvas.figure.add_subplot(111)
+        self.plotted_forecasts = None
 
         if plot_type == "Historical" and not selected_forecasts and not self.df.empty:
             self.plot_historical_data(chart_type, selected_countries, variable, ax)
@@ -874,7 +1649,8 @@ class MainWindow(QMainWindow):
             The axes object to plot on.
 
         This method plots forecast data for the selected forecast keys and variable
-        using the specified plot type and chart type.
+        using the specified plot type and chart type. The confidence intervals of all
+        forecasts are drawn as one band collection when the side panel option is checked.
         """
         if not self.forecast_results:
             self.console.append("You must first apply a model.")
@@ -884,19 +1660,44 @@ class MainWindow(QMainWindow):
             self.console.append("Please select at least one forecast to plot.")
             return
 
-        show_confidence_interval = self.sidePanelWindow.show_confidence_interval_checkbox.isChecked()
-        if show_confidence_interval and len(selected_forecasts) > 1:
-            self.console.append("The 'Show Confidence Interval' option is only available for one country at a time.")
-            return
+        show_confidence_interval = bool(self.sidePanelWindow) and self.sidePanelWindow.show_confidence_interval_checkbox.isChecked()
 
         max_value = -float('inf')
         if chart_type == "Lines":
-            max_value = plot_data(self.df, self.forecast_results, selected_forecasts, variable, plot_type, ax)
+            max_value = plot_data(self.df, self.forecast_results, selected_forecasts, variable, plot_type, ax, show_confidence_interval)
+            self.plotted_forecasts = (ax, selected_forecasts) if plot_type != "Historical" else None
         elif chart_type == "Stacked Bars":
             max_value = plot_data_stacked_bar(self.df, self.forecast_results, selected_forecasts, variable, plot_type, ax)
+            if show_confidence_interval:
+                self.console.append("Confidence intervals are only drawn on line charts.")
 
         self.set_plot_limits(ax, plot_type, max_value)
 
+    def toggle_confidence_interval(self, checked):
+        """
+        Shows or hides the confidence intervals of the plotted forecasts.
+
+        Parameters
+        ----------
+        checked : bool
+            Whether the confidence intervals are shown.
+
+        This method changes the visibility of the band collection on the current plot, drawing
+        it from the cached interval arrays the first time, without replotting the forecasts.
+        """
+        if not self.plotted_forecasts:
+            return
+
+        ax, forecast_keys = self.plotted_forecasts
+        collection = next((collection for collection in ax.collections if collection.get_gid() == 'confidence_intervals'), None)
+        if collection is not None:
+            collection.set_visible(checked)
+        elif checked:
+            collection, max_value = plot_confidence_intervals(ax, self.forecast_results, forecast_keys)
+            if collection is not None:
+                ax.set_ylim(top=max(ax.get_ylim()[1], max_value * 1.01))
+        self.canvas.draw_idle()
+
     def set_plot_limits(self, ax, plot_type, max_value):
         """
         Sets the plot limits.
@@ -926,7 +1727,7 @@ class MainWindow(QMainWindow):
         ax.set_xlim([start_year, end_year])
         ax.set_ylim([0, max_value * 1.01])
 
-    def save_forecast(self, save_type, format_type, save_path):
+    def save_forecast(self, save_type, format_type, save_path, all_forecasts=False):
         """
         Saves the forecast data to a file.
 
@@ -935,13 +1736,28 @@ class MainWindow(QMainWindow):
         save_type : str
             The type of data to save (Historical, Forecast, or Both).
         format_type : str
-            The format to save the data in (Original or New).
+            The format to save the data in (Original, New, Parquet, Feather, CSV (gzip) or CSV (zstd)).
         save_path : str
             The path to save the file.
+        all_forecasts : bool
+            Whether to save every forecast of every variable instead of the selected forecasts.
 
         This method aggregates the data to be saved based on the specified type and format,
-        and saves it to the specified file path.
+        and saves it to the specified file path. When all forecasts are saved, the rows are
+        written one variable at a time in a long Country, Variable, Model, Date, Value layout.
         """
+        if all_forecasts:
+            if not self.forecast_results:
+                self.console.append("You must first apply a model.")
+                return
+            try:
+                rows = stream_frames(iter_all_forecasts(self.df, self.forecast_results, save_type), save_path, format_type)
+            except Exception as e:
+                self.console.append(f"Failed to save {save_path}: {e}")
+                return
+            self.console.append(f"{rows} rows saved to {save_path}")
+            return
+
         selected_forecast_keys = self.get_selected_countries(self.forecasted_country_list)
         if not selected_forecast_keys:
             self.console.append("Please select at least one forecasted country to save.")
@@ -954,7 +1770,11 @@ class MainWindow(QMainWindow):
             save_data = save_data.pivot(index='Date', columns='Country', values=variable).reset_index()
             save_data.insert(1, 'Variable', variable)
 
-        save_data.to_csv(save_path, index=False)
+        try:
+            write_frame(save_data, save_path, format_type)
+        except Exception as e:
+            self.console.append(f"Failed to save {save_path}: {e}")
+            return
         self.console.append(f"Data saved to {save_path}")
 
     def aggregate_save_data(self, selected_forecast_keys, variable, save_type):
@@ -978,25 +1798,7 @@ class MainWindow(QMainWindow):
         This method aggregates historical and/or forecast data for the selected forecast keys
         and variable based on the specified save type.
         """
-        save_data = pd.DataFrame()
-
-        for forecast_key in selected_forecast_keys:
-            country = forecast_key.split(' (')[0]
-            if save_type in ["Historical", "Both"]:
-                historical_data = self.df[(self.df['Country'] == country) & (self.df['Date'].notna())][['Country', 'Date', variable]]
-                save_data = pd.concat([save_data, historical_data], ignore_index=True)
-
-            if save_type in ["Forecast", "Both"]:
-                forecast_values = self.forecast_results[forecast_key]['forecast_values']
-                forecast_years = forecast_values.index
-                forecast_df = pd.DataFrame({
-                    'Country': country,
-                    'Date': forecast_years,
-                    variable: forecast_values.values
-                })
-                save_data = pd.concat([save_data, forecast_df], ignore_index=True)
-
-        return save_data
+        return build_save_frame(self.df, self.forecast_results, selected_forecast_keys, variable, save_type)
 
     def download_plot(self):
         """
@@ -1011,6 +1813,42 @@ class MainWindow(QMainWindow):
             self.canvas.figure.savefig(save_path, dpi=400)
             self.console.append(f"Plot saved to {save_path}")
 
+    def export_report_figures(self):
+        """
+        Exports the report figures of the forecasts in one run.
+
+        This method opens a QFileDialog to select an output directory and renders, off-screen and in
+        parallel, one figure per selected forecast (every forecast if none is selected) plus one
+        stacked bar figure per variable with several forecasts, using the current plot type and
+        chart type.
+        """
+        if not self.forecast_results:
+            self.console.append("You must first apply a model.")
+            return
+
+        out_dir = QFileDialog.getExistingDirectory(self, "Select Export Directory", self.plot_dir)
+        if not out_dir:
+            return
+
+        plot_type = self.plot_combo.currentText()
+        chart_type = self.chart_type_combo.currentText()
+        forecast_keys = self.get_selected_countries(self.forecasted_country_list) or list(self.forecast_results.keys())
+
+        keys_by_variable = {}
+        for forecast_key in forecast_keys:
+            variable = self.forecast_results[forecast_key].get('variable', self.variable_combo.currentText())
+            keys_by_variable.setdefault(variable, []).append(forecast_key)
+
+        specs = [([forecast_key], variable, plot_type, chart_type) for variable, keys in keys_by_variable.items() for forecast_key in keys]
+        specs += [(keys, variable, plot_type, "Stacked Bars") for variable, keys in keys_by_variable.items() if len(keys) > 1]
+
+        saved_paths = export_figures(specs, self.df, self.forecast_results, out_dir, self.start_year_spin.value(), self.end_year_spin.value(), self.forecast_until_year)
+
+        failed = [path for path in saved_paths if path.startswith("Error:")]
+        self.console.append(f"{len(saved_paths) - len(failed)} figures exported to {out_dir}")
+        for error in failed:
+            self.console.append(error)
+
     def filter_country_list(self):
         """
         Filters the country list based on the search input.
@@ -1018,7 +1856,7 @@ class MainWindow(QMainWindow):
         This method filters the items in the country list widget
         based on the text entered in the country search line edit.
         """
-        self.filter_list(self.country_search.text().lower(), self.country_list)
+        self.filter_list(self.country_search.text(), self.country_list)
 
     def filter_forecasted_country_list(self):
         """
@@ -1027,7 +1865,30 @@ class MainWindow(QMainWindow):
         This method filters the items in the forecasted country list widget
         based on the text entered in the forecasted country search line edit.
         """
-        self.filter_list(self.forecasted_country_search.text().lower(), self.forecasted_country_list)
+        self.filter_list(self.forecasted_country_search.text(), self.forecasted_country_list)
+
+    def create_search_timer(self, callback):
+        """
+        Creates the timer that debounces a search line edit.
+
+        Parameters
+        ----------
+        callback : callable
+            The filter method to call once the user stops typing.
+
+        Returns
+        -------
+        QTimer
+            The single shot timer, restarted on every keystroke.
+
+        This method creates a single shot timer so the list is filtered once per pause
+        in typing instead of once per keystroke.
+        """
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.setInterval(self.search_debounce_ms)
+        timer.timeout.connect(callback)
+        return timer
 
     def filter_list(self, filter_text, list_widget):
         """
@@ -1037,15 +1898,13 @@ class MainWindow(QMainWindow):
         ----------
         filter_text : str
             The text to filter the list items.
-        list_widget : QListWidget
+        list_widget : SearchListView
             The list widget to be filtered.
 
-        This method hides or shows items in the list widget
-        based on whether their text contains the filter text.
+        This method shows the items of the list widget matching the filter text, looked up
+        in the search index of the list instead of checking every item.
         """
-        for index in range(list_widget.count()):
-            item = list_widget.item(index)
-            item.setHidden(filter_text not in item.text().lower())
+        list_widget.set_filter(filter_text)
 
     def format_adf_results(self, adf_results):
         """
@@ -1083,7 +1942,7 @@ class MainWindow(QMainWindow):
 
         This method formats the SARIMAX model results as an HTML summary.
         """
-        return self.format_model_results(sarimax_results, "SARIMAX")
+        return self.format_model_results(sarimax_results, "SARIMAX", get_sarimax_summary)
 
     def format_arima_results(self, arima_results):
         """
@@ -1101,9 +1960,9 @@ class MainWindow(QMainWindow):
 
         This method formats the ARIMA model results as an HTML summary.
         """
-        return self.format_model_results(arima_results, "ARIMA")
+        return self.format_model_results(arima_results, "ARIMA", get_arima_summary)
 
-    def format_model_results(self, results, model_name):
+    def format_model_results(self, results, model_name, get_summary):
         """
         Formats the model results.
 
@@ -1112,24 +1971,29 @@ class MainWindow(QMainWindow):
         results : dict
             The model results.
         model_name : str
-            The name of the model (SARIMAX or ARIMA).
+            The name of the model (SARIMAX, ARIMA, AR-OLS or ETS).
+        get_summary : function
+            The function returning the model summary of a result, rendering it for lean results.
 
         Returns
         -------
         str
             The formatted model results in HTML.
 
-        This method formats the model results as an HTML summary,
-        including the model summary and any errors encountered during modeling.
+        This method formats the model results as a compact HTML table with the order and AIC
+        of each country, including any errors encountered during modeling. The full model
+        summaries are added to the results panel and only rendered when a row is expanded.
         """
-        formatted_results = ""
+        self.results_panel.add_results(results, model_name, get_summary)
+
+        rows = ""
         for country, result in results.items():
-            if 'model_object' in result:
-                summary_html = result['model_summary'].as_html()
-                formatted_results += f"<b>{model_name} results for {country}:</b><br>{summary_html}<br>"
+            if 'error' not in result:
+                rows += f"<tr><td>{country}</td><td>{result['order']}</td><td>{result['aic']:.3f}</td></tr>"
             else:
-                formatted_results += f"<b>Failed to model {country}:</b> {result['error']}<br>"
-        return formatted_results
+                rows += f"<tr><td>{country}</td><td colspan='2'>Failed to model: {result['error']}</td></tr>"
+        return (f"<b>{model_name} results</b> (open Window &gt; Results Panel for the full summaries):"
+                f"<table border='1' cellpadding='2'><tr><th>Country</th><th>Order</th><th>AIC</th></tr>{rows}</table>")
 
     def get_selected_countries(self, list_widget):
         """
@@ -1137,7 +2001,7 @@ class MainWindow(QMainWindow):
 
         Parameters
         ----------
-        list_widget : QListWidget
+        list_widget : SearchListView
             The list widget containing country items.
 
         Returns
@@ -1148,7 +2012,34 @@ class MainWindow(QMainWindow):
         This method retrieves the names of countries that are checked
         in the specified list widget.
         """
-        return [list_widget.item(index).text() for index in range(list_widget.count()) if list_widget.item(index).checkState() == Qt.Checked]
+        return list_widget.checked_items()
+
+    def screen_countries(self, selected_countries, variable):
+        """
+        Screens the series of the selected countries before fitting.
+
+        Parameters
+        ----------
+        selected_countries : list of str
+            The list of selected countries.
+        variable : str
+            The variable to screen.
+
+        Returns
+        -------
+        list of str
+            The countries whose series are worth modeling.
+
+        This method classifies the series of the selected countries over the selected year range
+        as constant, too short, mostly missing or valid in one pass, and appends the skipped
+        series and the reason of each to the console.
+        """
+        screen = screen_series(self.df, selected_countries, variable, self.start_year_spin.value(), self.end_year_spin.value())
+        valid_countries, skipped = split_screened(screen)
+        if not skipped.empty:
+            self.console.append(f"<b>Skipped {len(skipped)} series of {variable}:</b>")
+            self.console.append(skipped[['Country', 'Status', 'Reason']].to_html(index=False))
+        return valid_countries
 
     def clear_all(self):
         """
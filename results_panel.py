@@ -0,0 +1,92 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QTreeWidget, QTreeWidgetItem, QTextBrowser, QSplitter
+from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt
+import os
+
+class ResultsPanel(QWidget):
+
+    max_rows = 2000
+    model_attributes = {"SARIMAX": 'sarimax_results', "ARIMA": 'arima_results', "AR-OLS": 'ar_ols_results', "ETS": 'ets_results'}
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.entries = {}
+        self.next_entry_id = 0
+        self.expanded_item = None
+
+        self.setWindowTitle("Model Results")
+        self.setGeometry(100, 100, 700, 800)
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        icon_path = os.path.join(script_dir, "assets", "Logo_NBackground.png")
+        self.setWindowIcon(QIcon(icon_path))
+
+        layout = QVBoxLayout()
+
+        self.results_label = QLabel("Expand a row to show the model summary:", self)
+        layout.addWidget(self.results_label)
+
+        splitter = QSplitter(Qt.Vertical, self)
+
+        self.results_tree = QTreeWidget(self)
+        self.results_tree.setHeaderLabels(["Country", "Model", "Order", "AIC"])
+        self.results_tree.setUniformRowHeights(True)
+        self.results_tree.itemExpanded.connect(self.show_summary)
+        splitter.addWidget(self.results_tree)
+
+        self.summary_view = QTextBrowser(self)
+        splitter.addWidget(self.summary_view)
+
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+    def add_results(self, results, model_name, get_summary):
+
+        self.results_tree.setUpdatesEnabled(False)
+        for country, result in results.items():
+            if 'error' in result:
+                item = QTreeWidgetItem([country, model_name, "-", result['error']])
+            else:
+                order = f"{result['order']} {result['seasonal_order']}" if 'seasonal_order' in result else f"{result['order']}"
+                item = QTreeWidgetItem([country, model_name, order, f"{result['aic']:.3f}"])
+                item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+                item.setData(0, Qt.UserRole, self.next_entry_id)
+                self.entries[self.next_entry_id] = (model_name, country, self.get_fit_id(result), get_summary)
+                self.next_entry_id += 1
+            self.results_tree.addTopLevelItem(item)
+
+        while self.results_tree.topLevelItemCount() > self.max_rows:
+            item = self.results_tree.takeTopLevelItem(0)
+            self.entries.pop(item.data(0, Qt.UserRole), None)
+            if item is self.expanded_item:
+                self.expanded_item = None
+        self.results_tree.setUpdatesEnabled(True)
+
+    @staticmethod
+    def get_fit_id(result):
+
+        return (tuple(result['order']), tuple(result.get('seasonal_order', ())), result.get('variable'), result['aic'])
+
+    def show_summary(self, item):
+
+        entry = self.entries.get(item.data(0, Qt.UserRole))
+        if entry is None:
+            return
+        model_name, country, fit_id, get_summary = entry
+        result = (getattr(self.main_window, self.model_attributes[model_name]) or {}).get(country)
+        if result is None or 'error' in result or self.get_fit_id(result) != fit_id:
+            self.summary_view.setHtml(f"<b>{model_name} results for {country}:</b><br>This model was replaced or removed by a later run.")
+        else:
+            self.summary_view.setHtml(f"<b>{model_name} results for {country}:</b><br>{get_summary(result).as_html()}")
+
+        if self.expanded_item is not None and self.expanded_item is not item:
+            self.expanded_item.setExpanded(False)
+        self.expanded_item = item
+
+    def clear_results(self):
+
+        self.results_tree.clear()
+        self.entries.clear()
+        self.expanded_item = None
+        self.summary_view.clear()
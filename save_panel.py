@@ -1,6 +1,7 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QComboBox, QPushButton, QFileDialog
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QComboBox, QPushButton, QFileDialog, QCheckBox
 from PyQt5.QtGui import QIcon
 import os
+from export import file_formats
 
 class SavePanel(QWidget):
     def __init__(self, main_window):
@@ -27,9 +28,12 @@ class SavePanel(QWidget):
         layout.addWidget(self.format_label)
 
         self.format_combo = QComboBox(self)
-        self.format_combo.addItems(["Format 1 (Original)", "Format 2 (New)"])
+        self.format_combo.addItems(list(file_formats.keys()))
         layout.addWidget(self.format_combo)
 
+        self.all_forecasts_checkbox = QCheckBox("All forecasts (all variables)", self)
+        layout.addWidget(self.all_forecasts_checkbox)
+
         self.save_button = QPushButton("Save", self)
         self.save_button.clicked.connect(self.save_data)
         layout.addWidget(self.save_button)
@@ -39,7 +43,8 @@ class SavePanel(QWidget):
     def save_data(self):
         save_type = self.save_type_combo.currentText()
         format_type = self.format_combo.currentText()
-        save_path, _ = QFileDialog.getSaveFileName(self, "Save CSV File", self.main_window.extracted_dataset_dir, "CSV Files (*.csv);;All Files (*)")
+        all_forecasts = self.all_forecasts_checkbox.isChecked()
+        save_path, _ = QFileDialog.getSaveFileName(self, "Save Data File", self.main_window.extracted_dataset_dir, f"{file_formats[format_type]};;All Files (*)")
         if save_path:
-            self.main_window.save_forecast(save_type, format_type, save_path)
+            self.main_window.save_forecast(save_type, format_type, save_path, all_forecasts)
             self.close()
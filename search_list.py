@@ -0,0 +1,158 @@
+from PyQt5.QtWidgets import QListView
+from PyQt5.QtCore import Qt, QAbstractListModel, QAbstractProxyModel, QModelIndex, QVariant
+from bisect import bisect_left
+from search import SearchIndex
+
+class CheckableListModel(QAbstractListModel):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.checked = []
+
+    def rowCount(self, parent=QModelIndex()):
+
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+
+        if not index.isValid():
+            return QVariant()
+        if role == Qt.DisplayRole:
+            return self.names[index.row()]
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self.checked[index.row()] else Qt.Unchecked
+        return QVariant()
+
+    def setData(self, index, value, role=Qt.EditRole):
+
+        if role != Qt.CheckStateRole or not index.isValid():
+            return False
+        self.checked[index.row()] = value == Qt.Checked
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def set_names(self, names):
+
+        self.beginResetModel()
+        self.names = list(names)
+        self.checked = [False] * len(self.names)
+        self.endResetModel()
+
+class SearchFilterProxyModel(QAbstractProxyModel):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.search_index = SearchIndex()
+        self.filter_text = ""
+        self.rows = []
+
+    def setSourceModel(self, source_model):
+
+        super().setSourceModel(source_model)
+        source_model.modelReset.connect(self.update_rows)
+        source_model.dataChanged.connect(self.forward_data_changed)
+        self.update_rows()
+
+    def set_search_index(self, search_index):
+
+        self.search_index = search_index
+        self.update_rows()
+
+    def set_filter_text(self, filter_text):
+
+        self.filter_text = filter_text
+        self.update_rows()
+
+    def update_rows(self):
+
+        matches = self.search_index.search(self.filter_text)
+        self.beginResetModel()
+        self.rows = list(range(self.sourceModel().rowCount())) if matches is None else sorted(matches)
+        self.endResetModel()
+
+    def forward_data_changed(self, top_left, bottom_right, roles=[]):
+
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            proxy_index = self.mapFromSource(self.sourceModel().index(row))
+            if proxy_index.isValid():
+                self.dataChanged.emit(proxy_index, proxy_index, roles)
+
+    def index(self, row, column, parent=QModelIndex()):
+
+        if parent.isValid() or not 0 <= row < len(self.rows) or column != 0:
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+
+        return 1
+
+    def mapToSource(self, proxy_index):
+
+        if not proxy_index.isValid() or proxy_index.row() >= len(self.rows):
+            return QModelIndex()
+        return self.sourceModel().index(self.rows[proxy_index.row()])
+
+    def mapFromSource(self, source_index):
+
+        if not source_index.isValid():
+            return QModelIndex()
+        row = bisect_left(self.rows, source_index.row())
+        if row < len(self.rows) and self.rows[row] == source_index.row():
+            return self.index(row, 0)
+        return QModelIndex()
+
+class SearchListView(QListView):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.source_model = CheckableListModel(self)
+        self.proxy_model = SearchFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.source_model)
+        self.setModel(self.proxy_model)
+        self.setUniformItemSizes(True)
+
+    def set_items(self, names):
+
+        self.source_model.set_names(names)
+        self.proxy_model.set_search_index(SearchIndex(self.source_model.names))
+
+    def clear(self):
+
+        self.set_items([])
+
+    def count(self):
+
+        return len(self.source_model.names)
+
+    def item_names(self):
+
+        return list(self.source_model.names)
+
+    def checked_items(self):
+
+        return [name for name, checked in zip(self.source_model.names, self.source_model.checked) if checked]
+
+    def set_checked(self, names, checked=True):
+
+        names = set(names)
+        for row, name in enumerate(self.source_model.names):
+            if name in names:
+                self.source_model.setData(self.source_model.index(row), Qt.Checked if checked else Qt.Unchecked, Qt.CheckStateRole)
+
+    def set_filter(self, filter_text):
+
+        self.proxy_model.set_filter_text(filter_text)
@@ -42,7 +42,7 @@ class SidePanelWindow(QWidget):
         self.layout.addWidget(self.title_section1, 0, 1)
 
         self.model_combo = QComboBox()
-        self.model_combo.addItems(["SARIMAX", "ARIMA"])
+        self.model_combo.addItems(["SARIMAX", "ARIMA", "AR-OLS", "ETS"])
         self.model_combo.currentTextChanged.connect(self.update_model_parameters)
         self.layout.addWidget(self.model_combo, 1, 0, 1, 3)
 
@@ -63,7 +63,7 @@ class SidePanelWindow(QWidget):
 
         self.seasonal_period_label = QLabel("Seasonality :")
         self.layout.addWidget(self.seasonal_period_label, 5, 0)
-        self.seasonal_period_input = QLineEdit("12")
+        self.seasonal_period_input = QLineEdit("auto")
         self.layout.addWidget(self.seasonal_period_input, 5, 1, 1, 2)
 
         self.enable_seasonality_checkbox = QCheckBox("Enable Seasonality")
@@ -79,6 +79,7 @@ class SidePanelWindow(QWidget):
         self.layout.addWidget(self.replace_negative_forecast_checkbox, 8, 0, 1, 3)
 
         self.show_confidence_interval_checkbox = QCheckBox("Show Confidence Interval")
+        self.show_confidence_interval_checkbox.toggled.connect(self.main_window.toggle_confidence_interval)
         self.layout.addWidget(self.show_confidence_interval_checkbox, 9, 0, 1, 3)
 
         self.apply_button = QPushButton("Apply Settings")
@@ -177,15 +178,15 @@ class SidePanelWindow(QWidget):
         self.left_arrow_button.setVisible(True)
         self.right_arrow_button.setVisible(True)
         self.model_combo.setVisible(True)
-        self.p_range_label.setVisible(True)
-        self.p_range_input.setVisible(True)
-        self.d_range_label.setVisible(True)
-        self.d_range_input.setVisible(True)
-        self.q_range_label.setVisible(True)
-        self.q_range_input.setVisible(True)
-        self.seasonal_period_label.setVisible(self.model_combo.currentText() == "SARIMAX")
-        self.seasonal_period_input.setVisible(self.model_combo.currentText() == "SARIMAX")
-        self.enable_seasonality_checkbox.setVisible(self.model_combo.currentText() == "SARIMAX")
+        self.p_range_label.setVisible(self.model_combo.currentText() != "ETS")
+        self.p_range_input.setVisible(self.model_combo.currentText() != "ETS")
+        self.d_range_label.setVisible(self.model_combo.currentText() in ["SARIMAX", "ARIMA"])
+        self.d_range_input.setVisible(self.model_combo.currentText() in ["SARIMAX", "ARIMA"])
+        self.q_range_label.setVisible(self.model_combo.currentText() in ["SARIMAX", "ARIMA"])
+        self.q_range_input.setVisible(self.model_combo.currentText() in ["SARIMAX", "ARIMA"])
+        self.seasonal_period_label.setVisible(self.model_combo.currentText() in ["SARIMAX", "ETS"])
+        self.seasonal_period_input.setVisible(self.model_combo.currentText() in ["SARIMAX", "ETS"])
+        self.enable_seasonality_checkbox.setVisible(self.model_combo.currentText() in ["SARIMAX", "ETS"])
         self.forecast_until_label.setVisible(True)
         self.forecast_until_input.setVisible(True)
         self.replace_negative_forecast_checkbox.setVisible(True)
@@ -311,16 +312,17 @@ class SidePanelWindow(QWidget):
 
     def update_model_parameters(self, model_name):
 
-        is_sarimax = model_name == "SARIMAX"
-        self.p_range_label.setVisible(True)
-        self.p_range_input.setVisible(True)
-        self.d_range_label.setVisible(True)
-        self.d_range_input.setVisible(True)
-        self.q_range_label.setVisible(True)
-        self.q_range_input.setVisible(True)
-        self.seasonal_period_label.setVisible(is_sarimax)
-        self.seasonal_period_input.setVisible(is_sarimax)
-        self.enable_seasonality_checkbox.setVisible(is_sarimax)
+        is_arima_family = model_name in ["SARIMAX", "ARIMA"]
+        is_seasonal = model_name in ["SARIMAX", "ETS"]
+        self.p_range_label.setVisible(model_name != "ETS")
+        self.p_range_input.setVisible(model_name != "ETS")
+        self.d_range_label.setVisible(is_arima_family)
+        self.d_range_input.setVisible(is_arima_family)
+        self.q_range_label.setVisible(is_arima_family)
+        self.q_range_input.setVisible(is_arima_family)
+        self.seasonal_period_label.setVisible(is_seasonal)
+        self.seasonal_period_input.setVisible(is_seasonal)
+        self.enable_seasonality_checkbox.setVisible(is_seasonal)
         self.forecast_until_label.setVisible(True)
         self.forecast_until_input.setVisible(True)
         self.replace_negative_forecast_checkbox.setVisible(True)
@@ -332,13 +334,17 @@ class SidePanelWindow(QWidget):
             self.apply_sarimax()
         elif model_name == "ARIMA":
             self.apply_arima()
+        elif model_name == "AR-OLS":
+            self.apply_ar_ols()
+        elif model_name == "ETS":
+            self.apply_ets()
 
     def apply_sarimax(self):
 
         p_range = self.get_range(self.p_range_input.text(), [0, 2])
         d_range = self.get_range(self.d_range_input.text(), [0, 2])
         q_range = self.get_range(self.q_range_input.text(), [0, 2])
-        seasonal_period = int(self.seasonal_period_input.text()) if self.seasonal_period_input.text() else 11
+        seasonal_period = self.get_seasonal_period()
         enable_seasonality = self.enable_seasonality_checkbox.isChecked()
 
         forecast_until_year = int(self.forecast_until_input.text()) if self.forecast_until_input.text() else 2100
@@ -361,6 +367,29 @@ class SidePanelWindow(QWidget):
 
         self.main_window.run_arima(p_range, d_range, q_range)
 
+    def apply_ar_ols(self):
+
+        p_range = self.get_range(self.p_range_input.text(), [0, 2])
+
+        forecast_until_year = int(self.forecast_until_input.text()) if self.forecast_until_input.text() else 2100
+        self.main_window.forecast_until_year = forecast_until_year
+
+        self.main_window.replace_negative_forecast = self.replace_negative_forecast_checkbox.isChecked()
+
+        self.main_window.run_ar_ols(p_range)
+
+    def apply_ets(self):
+
+        seasonal_period = self.get_seasonal_period()
+        enable_seasonality = self.enable_seasonality_checkbox.isChecked()
+
+        forecast_until_year = int(self.forecast_until_input.text()) if self.forecast_until_input.text() else 2100
+        self.main_window.forecast_until_year = forecast_until_year
+
+        self.main_window.replace_negative_forecast = self.replace_negative_forecast_checkbox.isChecked()
+
+        self.main_window.run_ets(seasonal_period, enable_seasonality)
+
     def get_range(self, text, default):
 
         if text:
@@ -375,6 +404,13 @@ class SidePanelWindow(QWidget):
         else:
             return default
 
+    def get_seasonal_period(self):
+
+        try:
+            return int(self.seasonal_period_input.text())
+        except ValueError:
+            return None
+
     def apply_plot_settings(self):
 
         x_range = self.get_range(self.x_axis_input.text(), None)